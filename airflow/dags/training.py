@@ -16,7 +16,12 @@ with DAG(
 
     def training(**kwargs):
         from src.pipelines.training import TrainingPipeline
-        TrainingPipeline().begin()
+        # The feature store can be rebuilt on demand by triggering the DAG w/ config {"rebuild_feature_store": true}, and the 
+        # stages can be recomputed regardless of the stage cache w/ {"force": true}
+        dag_run_conf = kwargs["dag_run"].conf or {}
+        TrainingPipeline(
+            rebuild_feature_store=dag_run_conf.get("rebuild_feature_store", False),
+            force=dag_run_conf.get("force", False)).begin()
 
     def sync_artifact_to_s3_bucket(**kwargs):
         bucket_name = os.getenv("BUCKET_NAME")
@@ -0,0 +1,62 @@
+"""Compares the formats the feature store and the training and test sets can be written in, in terms of bytes on disk and parse
+time (i.e. the time `BasicUtils.read_dataframe` takes to read the whole dataset back as dataframe, and only a handful of its
+columns).
+
+    python -m benchmarks.dataframe_formats --path aps_failure_training_set1.csv
+"""
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from src.entities.config import BaseConfig, DataSourceConfig
+from src.utils.file_operations import BasicUtils
+
+
+def benchmark_format(df: pd.DataFrame, file_path: str, compression: str, n_runs: int) -> dict:
+    tic = time.perf_counter()
+    BasicUtils.write_dataframe(df, file_path=file_path, desc="benchmark", compression=compression)
+    write_s = time.perf_counter() - tic
+
+    read_s, projected_read_s = [], []
+    for _ in range(n_runs):
+        tic = time.perf_counter()
+        BasicUtils.read_dataframe(file_path, desc="benchmark")
+        read_s.append(time.perf_counter() - tic)
+        tic = time.perf_counter()
+        BasicUtils.read_dataframe(file_path, desc="benchmark", columns=list(df.columns[:10]))
+        projected_read_s.append(time.perf_counter() - tic)
+
+    return {
+        "format": os.path.splitext(file_path)[1][1:],
+        "compression": compression if not file_path.endswith(".csv") else None,
+        "size_mb": os.path.getsize(file_path) / 2**20,
+        "write_s": write_s,
+        "read_s (best)": min(read_s),
+        "read_10_cols_s (best)": min(projected_read_s),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--path", default=DataSourceConfig().raw_data_path)
+    parser.add_argument("--n_runs", type=int, default=3)
+    parsed_args = parser.parse_args()
+
+    target = BaseConfig().target
+    df = pd.read_csv(parsed_args.path, na_values="na")
+    df = df.astype({col: np.float64 for col in df.columns if col != target})
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for file_name, compression in [
+                ("sensors.csv", None),
+                ("sensors.parquet", "snappy"),
+                ("sensors.parquet", "zstd"),
+                ("sensors.feather", "lz4"),
+                ("sensors.feather", "zstd")]:
+            results.append(benchmark_format(
+                df, os.path.join(tmp_dir, compression or "", file_name), compression, parsed_args.n_runs))
+
+    print(pd.DataFrame(results).round(3).to_string(index=False))
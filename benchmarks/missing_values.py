@@ -0,0 +1,80 @@
+"""Compares the "impute" and "native" missing value modes end to end i.e. transformation, resampling (for the former only) and
+training, in terms of the memory of the training features (a dense array or a CSR matrix), the training time and the test F1
+score. The sensors missing more than `--missing_thresh` are dropped beforehand, as the validation does (pass 1 to keep them all).
+
+    python -m benchmarks.missing_values --path aps_failure_training_set1.csv [--missing_thresh .3]
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.metrics import f1_score
+from sklearn.model_selection import train_test_split
+from src.components.data_transformation import DataTransformation
+from src.components.model_training import ModelTraining
+from src.entities.config import (
+    BaseConfig, DataIngestionConfig, DataSourceConfig, DataTransformationConfig, DataValidationConfig)
+from src.entities.schema import SensorSchema
+from src.utils.file_operations import BasicUtils
+
+
+def get_nbytes(X) -> int:
+    return X.data.nbytes + X.indices.nbytes + X.indptr.nbytes if sp.issparse(X) else X.nbytes
+
+
+def benchmark_mode(path: str, missing_value_mode: str, missing_thresh: float) -> dict:
+    target = BaseConfig().target
+    data_ingestion_config = DataIngestionConfig()
+    data_transformation_config = DataTransformationConfig()
+
+    df = SensorSchema.from_header(path, target=target, csv_engine="pyarrow").read_csv(path)
+    missing_ratios = df.isna().mean()
+    df = df.drop(columns=missing_ratios[missing_ratios > missing_thresh].index)
+    training_set, test_set = train_test_split(
+        df, test_size=data_ingestion_config.test_size, stratify=df[target], random_state=data_ingestion_config.random_state)
+    X_train, y_train = BasicUtils.get_features_and_labels(training_set, target=[target], desc="Training set")
+    X_test, y_test = BasicUtils.get_features_and_labels(test_set, target=[target], desc="Test set")
+
+    tic = time.perf_counter()
+    transformer = DataTransformation.get_transformer(
+        missing_value_mode=missing_value_mode,
+        sparse_density_thresh=data_transformation_config.sparse_density_thresh).fit(X_train)
+    target_enc = DataTransformation.get_target_encoder().fit(y_train)
+    X_train_arr, y_train_arr = transformer.transform(X_train), target_enc.transform(y_train).ravel()
+    scale_pos_weight = None
+    if missing_value_mode == "native":
+        n_pos = int(np.count_nonzero(y_train_arr))
+        scale_pos_weight = (len(y_train_arr) - n_pos) / n_pos
+    else:
+        from imblearn.combine import SMOTETomek
+        X_train_arr, y_train_arr = SMOTETomek(sampling_strategy="auto", random_state=42).fit_resample(X_train_arr, y_train_arr)
+    transformation_s = time.perf_counter() - tic
+
+    tic = time.perf_counter()
+    model = ModelTraining(data_transformation_artifact=None).train_model(
+        X_train_arr, y_train_arr, scale_pos_weight=scale_pos_weight)
+    training_s = time.perf_counter() - tic
+    f1_test = f1_score(target_enc.transform(y_test).ravel(), model.predict(transformer.transform(X_test)))
+
+    return {
+        "missing_value_mode": missing_value_mode,
+        "n_features": X_train.shape[1],
+        "density": float(X_train.notna().to_numpy().mean()),
+        "training_features": type(X_train_arr).__name__,
+        "training_features_mb": get_nbytes(X_train_arr) / 2**20,
+        "n_training_rows": X_train_arr.shape[0],
+        "transformation_s": transformation_s,
+        "training_s": training_s,
+        "f1_test": f1_test,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--path", default=DataSourceConfig().raw_data_path)
+    parser.add_argument("--missing_thresh", type=float, default=DataValidationConfig().missing_thresh)
+    parsed_args = parser.parse_args()
+
+    results = [benchmark_mode(parsed_args.path, mode, parsed_args.missing_thresh) for mode in ["impute", "native"]]
+    print(pd.DataFrame(results).round(4).to_string(index=False))
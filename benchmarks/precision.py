@@ -0,0 +1,66 @@
+"""Compares the float64 and float32 precision modes end to end i.e. parsing, transformation, resampling and training, in terms of
+memory (of the parsed frame, of the resampled training array and the peak traced along the way), time and the test F1 score,
+which shouldn't budge.
+
+    python -m benchmarks.precision --path aps_failure_training_set1.csv
+"""
+import argparse
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from imblearn.combine import SMOTETomek
+from sklearn.metrics import f1_score
+from sklearn.model_selection import train_test_split
+from src.components.data_transformation import DataTransformation
+from src.components.model_training import ModelTraining
+from src.entities.config import BaseConfig, DataIngestionConfig, DataSourceConfig
+from src.entities.schema import SensorSchema
+from src.utils.file_operations import BasicUtils
+
+
+def benchmark_precision(path: str, precision: str) -> dict:
+    target = BaseConfig().target
+    data_ingestion_config = DataIngestionConfig()
+    tracemalloc.start()
+    tic = time.perf_counter()
+
+    schema = SensorSchema.from_header(path, target=target, float_dtype=precision, csv_engine="pyarrow")
+    df = schema.read_csv(path)
+    parsed_mb = df.memory_usage(deep=True).sum() / 2**20
+    training_set, test_set = train_test_split(
+        df, test_size=data_ingestion_config.test_size, random_state=data_ingestion_config.random_state)
+    X_train, y_train = BasicUtils.get_features_and_labels(training_set, target=[target], desc="Training set")
+    X_test, y_test = BasicUtils.get_features_and_labels(test_set, target=[target], desc="Test set")
+
+    transformer = DataTransformation.get_transformer().fit(X_train)
+    target_enc = DataTransformation.get_target_encoder().fit(y_train)
+    X_train_res, y_train_res = SMOTETomek(sampling_strategy="auto", random_state=42).fit_resample(
+        transformer.transform(X_train), target_enc.transform(y_train))
+    # Features and labels are kept apart, as they're saved by `DataTransformation`
+    X_train_res = np.ascontiguousarray(X_train_res, dtype=precision)
+    y_train_res = np.ascontiguousarray(y_train_res.ravel(), dtype="int64")
+
+    model = ModelTraining(data_transformation_artifact=None).train_model(X_train_res, y_train_res)
+    f1_test = f1_score(target_enc.transform(y_test).ravel(), model.predict(transformer.transform(X_test)))
+
+    elapsed = time.perf_counter() - tic
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "precision": precision,
+        "parsed_mb": parsed_mb,
+        "training_arrays_mb": (X_train_res.nbytes + y_train_res.nbytes) / 2**20,
+        "peak_traced_mb": peak / 2**20,
+        "elapsed_s": elapsed,
+        "f1_test": f1_test,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--path", default=DataSourceConfig().raw_data_path)
+    parsed_args = parser.parse_args()
+
+    results = [benchmark_precision(parsed_args.path, precision) for precision in ["float64", "float32"]]
+    print(pd.DataFrame(results).round(4).to_string(index=False))
@@ -0,0 +1,57 @@
+"""Compares the serialization backends (and compression codecs) of `BasicUtils.save_object`/`load_object` on the real artifacts
+i.e. the latest transformer, target encoder and model of the Model Registry (or the objects at the given paths), in terms of
+save and load latency and the size on disk.
+
+    python -m benchmarks.serialization [--paths saved_models/0/model/model.pkl ...]
+"""
+import argparse
+import os
+import tempfile
+import time
+import pandas as pd
+from src.CONFIG import ModelRegistryConfig
+from src.utils.serialization import ObjectSerializer
+
+
+def benchmark_backend(obj: object, file_path: str, backend: str, compression: str, n_runs: int) -> dict:
+    save_s, load_s = [], []
+    for _ in range(n_runs):
+        tic = time.perf_counter()
+        ObjectSerializer.dump(obj, file_path, backend=backend, compression=compression)
+        save_s.append(time.perf_counter() - tic)
+        tic = time.perf_counter()
+        ObjectSerializer.load(file_path)
+        load_s.append(time.perf_counter() - tic)
+    return {
+        "backend": backend,
+        "compression": compression,
+        "size_kb": os.path.getsize(file_path) / 2**10,
+        "save_ms (best)": min(save_s) * 1e3,
+        "load_ms (best)": min(load_s) * 1e3,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--paths", nargs="*")
+    parser.add_argument("--n_runs", type=int, default=5)
+    parsed_args = parser.parse_args()
+
+    model_registry_config = ModelRegistryConfig()
+    paths = parsed_args.paths or [
+        model_registry_config.get_latest_transformer_path(),
+        model_registry_config.get_latest_target_encoder_path(),
+        model_registry_config.get_latest_model_path()]
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for path in paths:
+            obj = ObjectSerializer.load(path)
+            backends = ["dill", "joblib"] + (["xgboost"] if hasattr(obj, "save_model") else [])
+            for backend in backends:
+                for compression in [None, "lz4", "zstd"]:
+                    result = benchmark_backend(
+                        obj, os.path.join(tmp_dir, "obj.bin"), backend, compression, parsed_args.n_runs)
+                    results.append(dict(artifact=type(obj).__name__, **result))
+
+    print(pd.DataFrame(results).round(3).to_string(index=False))
@@ -0,0 +1,149 @@
+"""Compares the row-per-document layout and the bucketed columnar layout of the sensors collection, in terms of bytes on disk
+and ingest time (i.e. the time `dBOperations.getDataAsDataFrame` takes to read the whole collection back as dataframe).
+
+Requires `MONGO_DB_URL` to point at a MongoDB deployment; the data gets dumped into a separate benchmark database which is 
+dropped afterwards. With `--offline`, no deployment's needed: the documents of each layout are BSON-encoded in memory instead,
+the size on disk being estimated by compressing the BSON in 32 KB pages with snappy (WiredTiger's default block compressor),
+and the ingest time being just the client's share of it (decoding the BSON and filling the dataframe), sans the server and the
+network. The server-side cast needs the server, thus is left out offline.
+
+    python -m benchmarks.storage_layout --path aps_failure_training_set1.csv [--offline]
+"""
+import argparse
+import os
+import time
+from dataclasses import replace
+import bson
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from data_dump import DumpDataToMongoDB
+from src.entities.config import DataSourceConfig
+from src.utils.bucket_layout import BucketCodec
+from src.utils.db_operations import dBOperations
+from src.utils.mongo_client import MongoClientManager
+from src.utils.row_hash import RowHasher
+
+BENCHMARK_DB = "sensors-streaming-data-benchmark"
+PAGE_SIZE = 32 * 2**10
+
+
+def benchmark_layout(data_source_config: DataSourceConfig, path: str, n_runs: int) -> dict:
+    dump_data = DumpDataToMongoDB()
+    dump_data.data_source_config = data_source_config
+    tic = time.perf_counter()
+    dump_data.dumpData(path=path, resume=False)
+    load_s = time.perf_counter() - tic
+
+    db_operations = dBOperations()
+    db_operations.data_source_config = data_source_config
+    ingest_s = []
+    for _ in range(n_runs):
+        tic = time.perf_counter()
+        df = db_operations.getDataAsDataFrame()
+        ingest_s.append(time.perf_counter() - tic)
+
+    coll_stats = db_operations.database.command(
+        "collStats", data_source_config.get_collection_name())
+    return {
+        "layout": f"{data_source_config.storage_layout} ({data_source_config.bucket_dtype})"
+        if data_source_config.storage_layout == "bucket" else data_source_config.storage_layout,
+        "documents": coll_stats["count"],
+        "rows": df.shape[0],
+        "data_size_mb": coll_stats["size"] / 2**20,
+        "storage_size_mb": coll_stats["storageSize"] / 2**20,
+        "load_s": load_s,
+        "ingest_s (best)": min(ingest_s),
+    }
+
+
+def benchmark_layout_offline(data_source_config: DataSourceConfig, path: str, n_runs: int) -> dict:
+    dump_data = DumpDataToMongoDB()
+    dump_data.data_source_config = data_source_config
+    db_operations = dBOperations()
+    db_operations.data_source_config = data_source_config
+    is_bucket = data_source_config.storage_layout == "bucket"
+    tic = time.perf_counter()
+    stored, fetched, n_docs, n_rows, columns = [], [], 0, 0, None
+    for chunk in dump_data.iterChunks(path):
+        columns = list(chunk.columns)
+        row_hashes = RowHasher.compute(chunk, target=dump_data.target, dtype=dump_data.getHashDtype())
+        if is_bucket:
+            docs = BucketCodec.encode(chunk, target=dump_data.target, bucket_size=data_source_config.bucket_size,
+                                      dtype=data_source_config.bucket_dtype)
+        else:
+            docs = dump_data.toRecords(chunk, row_hashes)
+        # As fetched i.e. sans the hashes, which the projection leaves out
+        fetched.append(b"".join(map(bson.encode, docs)))
+        if is_bucket:
+            for i, doc in enumerate(docs):
+                doc["row_hashes"] = row_hashes[i*data_source_config.bucket_size:(i+1)*data_source_config.bucket_size].tolist()
+        stored.append(b"".join(bson.encode(dict(doc, _id=bson.ObjectId())) for doc in docs))
+        n_docs, n_rows = n_docs + len(docs), n_rows + chunk.shape[0]
+    encode_s = time.perf_counter() - tic
+    stored = b"".join(stored)
+    storage_size = sum(len(pa.compress(stored[i:i+PAGE_SIZE], codec="snappy", asbytes=True))
+                       for i in range(0, len(stored), PAGE_SIZE))
+
+    float_cols = [col for col in columns if col != dump_data.target]
+    ingest_s = []
+    for _ in range(n_runs):
+        tic = time.perf_counter()
+        float_arr = np.full((n_rows, len(float_cols)), np.nan, dtype=db_operations.precision, order="F")
+        target_arr = np.empty(n_rows, dtype=object)
+        if is_bucket:
+            chunks = (BucketCodec.decode(doc, columns, dump_data.target) for payload in fetched
+                      for doc in bson.decode_all(payload))
+        else:
+            chunks = (db_operations._toColumnArrays(bson.decode_all(payload), columns) for payload in fetched)
+        n_filled, overflow = db_operations._fillRows(chunks, float_cols, float_arr, target_arr, start=0, stop=n_rows)
+        df = db_operations._toDataFrame(columns, float_arr, target_arr, [(0, n_filled)], overflow)
+        ingest_s.append(time.perf_counter() - tic)
+    return {
+        "layout": f"{data_source_config.storage_layout} ({data_source_config.bucket_dtype})"
+        if is_bucket else data_source_config.storage_layout,
+        "documents": n_docs,
+        "rows": df.shape[0],
+        "data_size_mb": len(stored) / 2**20,
+        "storage_size_mb (est.)": storage_size / 2**20,
+        "encode_s": encode_s,
+        "client_ingest_s (best)": min(ingest_s),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--path", default=DataSourceConfig().raw_data_path)
+    parser.add_argument("--bucket_size", type=int, default=1000)
+    parser.add_argument("--n_runs", type=int, default=3)
+    parser.add_argument("--offline", action="store_true",
+                        help="encode the documents in memory instead of dumping them into a MongoDB deployment")
+    parsed_args = parser.parse_args()
+
+    base_config = replace(DataSourceConfig(), database_name=BENCHMARK_DB, load_checkpoint_path=".benchmark_checkpoint.yaml",
+                          bucket_size=parsed_args.bucket_size)
+    results = []
+    if parsed_args.offline:
+        for layout_config in [
+                replace(base_config, storage_layout="row", server_side_cast=False),
+                replace(base_config, storage_layout="bucket", bucket_dtype="<f8"),
+                replace(base_config, storage_layout="bucket", bucket_dtype="<f4")]:
+            results.append(benchmark_layout_offline(layout_config, parsed_args.path, parsed_args.n_runs))
+    else:
+        try:
+            for layout_config in [
+                    replace(base_config, storage_layout="row", server_side_cast=False),
+                    replace(base_config, storage_layout="row", server_side_cast=True),
+                    replace(base_config, storage_layout="bucket", bucket_dtype="<f8"),
+                    replace(base_config, storage_layout="bucket", bucket_dtype="<f4")]:
+                MongoClientManager.get_client()[BENCHMARK_DB].drop_collection(
+                    layout_config.get_collection_name())
+                results.append(benchmark_layout(
+                    layout_config, parsed_args.path, parsed_args.n_runs))
+                results[-1]["server_side_cast"] = layout_config.server_side_cast if layout_config.storage_layout == "row" else None
+        finally:
+            MongoClientManager.get_client().drop_database(BENCHMARK_DB)
+            if os.path.exists(base_config.load_checkpoint_path):
+                os.remove(base_config.load_checkpoint_path)
+
+    print(pd.DataFrame(results).round(3).to_string(index=False))
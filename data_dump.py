@@ -1,18 +1,31 @@
-import pymongo
 import pandas as pd
+import numpy as np
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 from src.CONFIG import Config
-from src.entities.config import DataSourceConfig
+from src.utils.mongo_client import MongoClientManager
+from src.entities.config import DataSourceConfig, BaseConfig
+from src.utils.bucket_layout import BucketCodec
+from src.utils.row_hash import RowHasher
 from src.logger import lg
-import json
 import os
+import time
+import yaml
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
 from dataclasses import dataclass
 
+DUPLICATE_KEY_ERROR = 11000
+
 
 @dataclass
 class DumpDataToMongoDB:
     lg.info(
         f'Entered the "{os.path.basename(__file__)[:-3]}.DumpDataToMongoDB" class')
-    data_source_config: DataSourceConfig = DataSourceConfig()
+    data_source_config = DataSourceConfig()
+    target = BaseConfig().target
     client: str = None
     database: str = None
     collection: str = None
@@ -22,7 +35,7 @@ class DumpDataToMongoDB:
             # Connection URL
             connection_url = Config().mongodb_url
             lg.info("Establishing connection to MongoDB..")
-            self.client = pymongo.MongoClient(connection_url)
+            self.client = MongoClientManager.get_client(connection_url)
         except Exception as e:
             lg.exception(e)
         else:
@@ -45,37 +58,387 @@ class DumpDataToMongoDB:
         try:
             self.createOrSelectDB()
             lg.info("creating the collection..")
-            self.collection = self.database[self.data_source_config.collection_name]
+            self.collection = self.database[self.data_source_config.get_collection_name()]
 
         except Exception as e:
             lg.exception(e)
         else:
             lg.info(
-                f'"{self.data_source_config.collection_name}" collection in the database "{self.data_source_config.database_name}" created successfully!')
+                f'"{self.data_source_config.get_collection_name()}" collection in the database "{self.data_source_config.database_name}" created successfully!')
+
+    def readCheckpoint(self) -> Dict:
+        """Returns the dump checkpoint i.e. the number of rows committed per CSV file (keyed by its absolute path)."""
+        if not os.path.exists(self.data_source_config.load_checkpoint_path):
+            return {}
+        with open(self.data_source_config.load_checkpoint_path, "r") as f:
+            return yaml.safe_load(f) or {}
+
+    def writeCheckpoint(self, checkpoint: Dict):
+        """Persists the dump checkpoint, atomically, so that a crash never leaves a half-written one behind."""
+        tmp_path = f"{self.data_source_config.load_checkpoint_path}.tmp"
+        with open(tmp_path, "w") as f:
+            yaml.dump(checkpoint, f)
+        os.replace(tmp_path, self.data_source_config.load_checkpoint_path)
+
+    def getHashField(self) -> str:
+        """Returns the field holding the rows' content hashes, as per the configured storage layout."""
+        return "row_hashes" if self.data_source_config.storage_layout == "bucket" else "row_hash"
+
+    def getHashDtype(self) -> str:
+        """Returns the precision the sensors are hashed at i.e. the one they're stored at, as per the configured storage layout."""
+        return self.data_source_config.bucket_dtype if self.data_source_config.storage_layout == "bucket" else "float64"
+
+    def createHashIndex(self):
+        """Creates the unique index on the rows' content hashes (if not already there), by which the duplicate rows get rejected.
+        The index is partial, so that the documents dumped before the hashes came into being don't get in the way of it."""
+        hash_field = self.getHashField()
+        lg.info(f'making sure the unique index on "{hash_field}" does exist..')
+        self.collection.create_index(
+            hash_field, unique=True, partialFilterExpression={hash_field: {"$exists": True}})
+
+    def iterChunks(self, file_path: str, skip_rows: int = 0) -> Iterator[pd.DataFrame]:
+        """Streams the CSV file in chunks of `load_chunk_size` rows, with the missing sensor values as NaN.
+
+        Args:
+            file_path (str): CSV file to be streamed.
+            skip_rows (int, optional): Number of leading data rows to be skipped. Defaults to 0.
+
+        Yields:
+            Iterator[pd.DataFrame]: Chunks of the CSV file.
+        """
+        yield from pd.read_csv(
+            file_path, chunksize=self.data_source_config.load_chunk_size,
+            skiprows=range(1, skip_rows + 1), na_values=["na"], keep_default_na=False)
+
+    def toRecords(self, chunk: pd.DataFrame, row_hashes: np.ndarray) -> List[Dict]:
+        """Builds the row layout's documents directly from the chunk's column arrays, along with each row's content hash. Missing 
+        sensor values are kept as "na", as in the raw data.
+
+        Args:
+            chunk (pd.DataFrame): Chunk of the CSV file.
+            row_hashes (np.ndarray): Content hash of each row of the chunk.
+
+        Returns:
+            List[Dict]: Documents of the chunk.
+        """
+        columns = list(chunk.columns) + ["row_hash"]
+        values = []
+        for col in chunk.columns:
+            col_values = chunk[col].tolist()
+            if chunk[col].dtype.kind == "f":
+                col_values = [val if val == val else "na" for val in col_values]
+            values.append(col_values)
+        values.append(row_hashes.tolist())
+        return [dict(zip(columns, row)) for row in zip(*values)]
+
+    def insertIgnoringDuplicates(self, docs: List[Dict]) -> Tuple[int, List[int]]:
+        """Inserts the documents via an unordered `insert_many`, ignoring the ones rejected as duplicates by the unique index.
+
+        Args:
+            docs (List[Dict]): Documents to be inserted.
+
+        Returns:
+            Tuple[int, List[int]]: Number of documents inserted and indices of the ones rejected as duplicates.
+        """
+        try:
+            return len(self.collection.insert_many(docs, ordered=False).inserted_ids), []
+        except BulkWriteError as bwe:
+            write_errors = bwe.details["writeErrors"]
+            if any(err["code"] != DUPLICATE_KEY_ERROR for err in write_errors):
+                raise bwe
+            return bwe.details["nInserted"], [err["index"] for err in write_errors]
+
+    def getExistingHashes(self, row_hashes: np.ndarray) -> np.ndarray:
+        """Returns those of the given content hashes that are already there in the (bucket layout's) collection."""
+        existing = set()
+        for bucket in self.collection.find({"row_hashes": {"$in": row_hashes.tolist()}}, projection={"row_hashes": True}):
+            existing.update(bucket["row_hashes"])
+        return np.fromiter(existing, dtype=np.int64, count=len(existing))
+
+    def writeBuckets(self, chunk: pd.DataFrame, row_hashes: np.ndarray, attempts: int = 3) -> int:
+        """Writes the chunk's rows that aren't already there, as bucket documents. Should a bucket get rejected due to a row 
+        written concurrently, its rows are filtered and written again.
+
+        Args:
+            chunk (pd.DataFrame): Chunk of the CSV file.
+            row_hashes (np.ndarray): Content hash of each row of the chunk.
+            attempts (int, optional): Number of attempts left. Defaults to 3.
+
+        Returns:
+            int: Number of rows inserted.
+        """
+        is_new = ~np.isin(row_hashes, self.getExistingHashes(row_hashes))
+        chunk, row_hashes = chunk[is_new], row_hashes[is_new]
+        if chunk.shape[0] == 0:
+            return 0
+        bucket_size = self.data_source_config.bucket_size
+        buckets = BucketCodec.encode(
+            chunk, target=self.target, bucket_size=bucket_size, dtype=self.data_source_config.bucket_dtype)
+        for i, bucket in enumerate(buckets):
+            bucket["row_hashes"] = row_hashes[i*bucket_size:(i+1)*bucket_size].tolist()
+        _, rejected = self.insertIgnoringDuplicates(buckets)
+        n_inserted = chunk.shape[0]
+        if len(rejected) > 0:
+            rows = np.concatenate([np.arange(i*bucket_size, min((i+1)*bucket_size, chunk.shape[0])) for i in rejected])
+            n_inserted -= len(rows)
+            if attempts > 1:
+                n_inserted += self.writeBuckets(chunk.iloc[rows], row_hashes[rows], attempts - 1)
+            else:
+                lg.warning(f"gave up on {len(rows)} rows after repeated duplicate key errors!")
+        return n_inserted
+
+    def writeChunk(self, chunk: pd.DataFrame) -> int:
+        """Writes the chunk into the collection as per the configured storage layout, skipping the rows already there (and the ones 
+        repeated within the chunk itself), so that dumping the very same data again and again is idempotent.
+
+        Args:
+            chunk (pd.DataFrame): Chunk of the CSV file.
+
+        Returns:
+            int: Number of rows inserted.
+        """
+        row_hashes = RowHasher.compute(chunk, target=self.target, dtype=self.getHashDtype())
+        is_first = ~pd.Series(row_hashes).duplicated().to_numpy()
+        chunk, row_hashes = chunk[is_first], row_hashes[is_first]
+        if self.data_source_config.storage_layout == "bucket":
+            return self.writeBuckets(chunk, row_hashes)
+        n_inserted, _ = self.insertIgnoringDuplicates(self.toRecords(chunk, row_hashes))
+        return n_inserted
+
+    def dumpFile(self, file_path: str, executor: ThreadPoolExecutor, resume: bool = True) -> int:
+        """Dumps a single CSV file into the collection, chunk by chunk, via unordered `insert_many` batches issued by the pool of 
+        writers. The checkpoint only ever moves past the chunks that have been committed in order, so that on failure the dump 
+        can resume from the last committed chunk (the rows of the chunks committed past it get skipped as duplicates).
+
+        Args:
+            file_path (str): CSV file to be dumped.
+            executor (ThreadPoolExecutor): Pool of concurrent writers.
+            resume (bool, optional): Whether to resume from the checkpoint. Defaults to True.
+
+        Returns:
+            int: Number of rows dumped.
+        """
+        file_path = os.path.abspath(file_path)
+        file_stat = os.stat(file_path)
+        checkpoint = self.readCheckpoint()
+        file_checkpoint = checkpoint.get(file_path, {})
+        # A checkpoint of a file that's been modified since, can't be trusted
+        if not resume or file_checkpoint.get("size") != file_stat.st_size or file_checkpoint.get("mtime") != file_stat.st_mtime:
+            file_checkpoint = {"size": file_stat.st_size, "mtime": file_stat.st_mtime,
+                               "rows_committed": 0, "completed": False}
+        if file_checkpoint["completed"]:
+            lg.info(f'"{file_path}" has already been dumped, skipping it..')
+            return 0
+        if file_checkpoint["rows_committed"] > 0:
+            lg.info(
+                f'resuming the dump of "{file_path}" from row {file_checkpoint["rows_committed"]}..')
+
+        n_inserted = 0
+
+        def commit(pending: deque):
+            nonlocal n_inserted
+            future, n_rows = pending.popleft()
+            n_inserted += future.result()
+            file_checkpoint["rows_committed"] += n_rows
+            checkpoint[file_path] = file_checkpoint
+            self.writeCheckpoint(checkpoint)
+
+        tic = time.perf_counter()
+        n_read = 0
+        pending = deque()
+        try:
+            for chunk in self.iterChunks(file_path, skip_rows=file_checkpoint["rows_committed"]):
+                pending.append((executor.submit(self.writeChunk, chunk), chunk.shape[0]))
+                n_read += chunk.shape[0]
+                # Bounding the number of chunks in flight, so as to keep the memory flat
+                while len(pending) >= 2*self.data_source_config.load_writers:
+                    commit(pending)
+            while len(pending) > 0:
+                commit(pending)
+        finally:
+            # Not letting the chunks still in flight outlive a failure
+            for future, _ in pending:
+                future.cancel()
+
+        file_checkpoint["completed"] = True
+        checkpoint[file_path] = file_checkpoint
+        self.writeCheckpoint(checkpoint)
+        elapsed = time.perf_counter() - tic
+        lg.info(
+            f'dumped {n_read} rows from "{file_path}" in {elapsed:.2f}s ({n_read/max(elapsed, 1e-9):.0f} rows/sec), {n_inserted} of which were new')
+        return n_read
+
+    def backfillHashes(self, rehash: bool = False) -> int:
+        """Computes and sets the content hashes of the documents that don't have them, batch by batch in the order of `_id`.
+
+        Args:
+            rehash (bool, optional): Whether to recompute the hashes of all the documents instead, as is due after the hash
+                function has changed. The unique index gets dropped beforehand, since the duplicates would clash on it midway. 
+                Defaults to False.
+
+        Returns:
+            int: Number of documents backfilled.
+        """
+        hash_field = self.getHashField()
+        if rehash:
+            for index in list(self.collection.list_indexes()):
+                if list(index["key"]) == [hash_field]:
+                    lg.info(f'dropping the unique index on "{hash_field}" for the hashes to be recomputed..')
+                    self.collection.drop_index(index["name"])
+        n_backfilled, last_id = 0, None
+        while True:
+            query = {} if rehash else {hash_field: {"$exists": False}}
+            if last_id is not None:
+                query["_id"] = {"$gt": last_id}
+            docs = list(self.collection.find(query).sort("_id", 1).limit(self.data_source_config.load_chunk_size))
+            if len(docs) == 0:
+                break
+            if self.data_source_config.storage_layout == "bucket":
+                hashes = [RowHasher.compute(pd.DataFrame(BucketCodec.decode(doc, doc["columns"], self.target)),
+                                            target=self.target, dtype=self.getHashDtype()).tolist() for doc in docs]
+            else:
+                hashes = RowHasher.compute(
+                    pd.DataFrame(docs).drop(columns=["_id", hash_field], errors="ignore"), target=self.target).tolist()
+            self.collection.bulk_write([UpdateOne({"_id": doc["_id"]}, {"$set": {hash_field: doc_hash}})
+                                        for doc, doc_hash in zip(docs, hashes)], ordered=False)
+            n_backfilled += len(docs)
+            last_id = docs[-1]["_id"]
+        return n_backfilled
+
+    def dedupeRows(self) -> int:
+        """Deletes the duplicate rows of the row layout's collection, keeping the earliest (by `_id`) of each, by way of a
+        batched aggregation over the content hashes.
+
+        Returns:
+            int: Number of duplicate rows deleted.
+        """
+        pipeline = [
+            {"$group": {"_id": "$row_hash", "keep": {"$min": "$_id"}, "count": {"$sum": 1}}},
+            {"$match": {"count": {"$gt": 1}}}]
+        n_deleted, batch = 0, []
+        cursor = self.collection.aggregate(
+            pipeline, allowDiskUse=True, batchSize=self.data_source_config.load_chunk_size)
+        for group in cursor:
+            batch.append(group)
+            if len(batch) == self.data_source_config.load_chunk_size:
+                n_deleted += self.collection.delete_many({
+                    "row_hash": {"$in": [group["_id"] for group in batch]},
+                    "_id": {"$nin": [group["keep"] for group in batch]}}).deleted_count
+                batch = []
+        if len(batch) > 0:
+            n_deleted += self.collection.delete_many({
+                "row_hash": {"$in": [group["_id"] for group in batch]},
+                "_id": {"$nin": [group["keep"] for group in batch]}}).deleted_count
+        return n_deleted
+
+    def dedupeBuckets(self) -> int:
+        """Deletes the duplicate rows of the bucket layout's collection, keeping the earliest (by bucket `_id` and position) of 
+        each, by rewriting the buckets holding the rest of them.
+
+        Returns:
+            int: Number of duplicate rows deleted.
+        """
+        pipeline = [
+            {"$project": {"row_hashes": True}},
+            {"$unwind": {"path": "$row_hashes", "includeArrayIndex": "pos"}},
+            {"$group": {"_id": "$row_hashes", "count": {"$sum": 1},
+                        "occurrences": {"$push": {"bucket": "$_id", "pos": "$pos"}}}},
+            {"$match": {"count": {"$gt": 1}}}]
+        rows_to_drop = {}
+        cursor = self.collection.aggregate(
+            pipeline, allowDiskUse=True, batchSize=self.data_source_config.load_chunk_size)
+        for group in cursor:
+            occurrences = sorted(group["occurrences"], key=lambda occ: (occ["bucket"], occ["pos"]))
+            for occ in occurrences[1:]:
+                rows_to_drop.setdefault(occ["bucket"], set()).add(occ["pos"])
+
+        n_deleted = 0
+        for bucket_id, positions in rows_to_drop.items():
+            bucket = self.collection.find_one({"_id": bucket_id})
+            keep = np.setdiff1d(np.arange(bucket["n_rows"]), np.fromiter(positions, dtype=np.int64))
+            n_deleted += bucket["n_rows"] - len(keep)
+            if len(keep) == 0:
+                self.collection.delete_one({"_id": bucket_id})
+                continue
+            df = pd.DataFrame(BucketCodec.decode(bucket, bucket["columns"], self.target)).iloc[keep]
+            new_bucket = BucketCodec.encode(
+                df, target=self.target, bucket_size=len(keep), dtype=bucket["dtype"])[0]
+            new_bucket["row_hashes"] = [bucket["row_hashes"][pos] for pos in keep]
+            self.collection.replace_one({"_id": bucket_id}, new_bucket)
+        return n_deleted
+
+    def dedupeCollection(self, rehash: bool = False):
+        """Dedupes the existing collection in place: backfills the content hashes of the documents dumped before the hashes came
+        into being, deletes the duplicate rows and makes sure of the unique index, so that no duplicates get in ever again.
+
+        Args:
+            rehash (bool, optional): Whether to recompute the hashes of all the documents, not just the missing ones. Defaults to 
+                False.
+        """
+        try:
+            self.createCollection()
+            lg.info("backfilling the missing content hashes..")
+            n_backfilled = self.backfillHashes(rehash=rehash)
+            lg.info(f"content hashes of {n_backfilled} documents backfilled!")
+            lg.info("deleting the duplicate rows..")
+            if self.data_source_config.storage_layout == "bucket":
+                n_deleted = self.dedupeBuckets()
+            else:
+                n_deleted = self.dedupeRows()
+            self.createHashIndex()
+        except Exception as e:
+            lg.exception(e)
+            raise e
+        else:
+            lg.info(
+                f'{n_deleted} duplicate rows deleted from "{self.data_source_config.get_collection_name()}" successfully!')
+
+    def dumpData(self, path: Optional[str] = None, resume: bool = True):
+        """Dumps the CSV file (or all the CSV files of the directory) at `path` into the collection.
 
-    def dumpData(self):
+        Args:
+            path (Optional[str], optional): CSV file or a directory of CSV files. Defaults to `DataSourceConfig.raw_data_path`.
+            resume (bool, optional): Whether to resume the dump from the last committed chunk of each file. Defaults to True.
+        """
         try:
+            path = path or self.data_source_config.raw_data_path
             self.createCollection()
-            lg.info("fetching data from the raw data path..")
-            df = pd.read_csv(self.data_source_config.raw_data_path)
-            lg.info(f"shape of the data: {df.shape}")
-            lg.info("data fetched..")
-            # Converting the .csv into "dumpable into MongoDB" format --json
-            df.reset_index(drop=True, inplace=True)
-            all_records = list(json.loads(df.T.to_json()).values())
+            self.createHashIndex()
+            if os.path.isdir(path):
+                file_paths = sorted(os.path.join(path, file) for file in os.listdir(path) if file.endswith(".csv"))
+            else:
+                file_paths = [path]
+            lg.info(f"CSV files to be dumped: {file_paths}")
 
-            # Inserting into the Collection
-            self.collection.insert_many(all_records)
+            tic = time.perf_counter()
+            n_dumped = 0
+            with ThreadPoolExecutor(max_workers=self.data_source_config.load_writers) as executor:
+                for file_path in file_paths:
+                    n_dumped += self.dumpFile(file_path, executor, resume=resume)
+            elapsed = time.perf_counter() - tic
+            MongoClientManager.log_pool_stats(stage="bulk loading")
 
         except Exception as e:
             lg.exception(e)
+            raise e
         else:
             lg.info(
-                f'successfully dumped all data from "{self.data_source_config.raw_data_path}" into database "{self.data_source_config.database_name}" in MongoDB!')
+                f'successfully dumped {n_dumped} rows from "{path}" into database "{self.data_source_config.database_name}" in MongoDB in {elapsed:.2f}s ({n_dumped/max(elapsed, 1e-9):.0f} rows/sec)!')
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--path", default=DataSourceConfig().raw_data_path)
+    parser.add_argument("--no_resume", action="store_true")
+    parser.add_argument("--dedupe", action="store_true",
+                        help="dedupe the existing collection in place instead of dumping any data")
+    parser.add_argument("--rehash", action="store_true",
+                        help="recompute the content hashes of all the documents while deduping, not just the missing ones")
+    parsed_args = parser.parse_args()
     # Creating an object of class `DumpDataToMongoDB` to dump data to MongoDB
     dump_data = DumpDataToMongoDB()
-    # dumping the data
-    dump_data.dumpData()
+    if parsed_args.dedupe:
+        dump_data.dedupeCollection(rehash=parsed_args.rehash)
+    else:
+        # dumping the data
+        dump_data.dumpData(path=parsed_args.path, resume=not parsed_args.no_resume)
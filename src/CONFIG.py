@@ -3,7 +3,7 @@ from dotenv import load_dotenv
 from src.logger import lg
 from typing import Optional
 from dataclasses import dataclass
-from src.entities.config import MODEL_FILE, TRANSFORMER, TARGET_ENCODER
+from src.entities.config import MODEL_FILE, TRANSFORMER, TARGET_ENCODER, REFERENCE_PROFILE
 
 
 @dataclass
@@ -28,11 +28,13 @@ class ModelRegistryConfig:
         transformer_dir (str, optional): Transformer's dir name inside the model registry. Defaults to "transformer".
         target_encoder_dir (str, optional): Target Encoder's dir name inside the model registry. Defaults to "encoder".
         model_dir (str, optional): Model dir's name inside the model registry. Defaults to "model".
+        profile_dir (str, optional): Reference profile's (of the data the model was trained off) dir name inside the model 
+        registry. Defaults to "profile".
     """
 
     def __init__(
             self, model_registry: str = "saved_models", transformer_dir: str = "transformer",
-            target_encoder_dir: str = "encoder", model_dir: str = "model") -> None:
+            target_encoder_dir: str = "encoder", model_dir: str = "model", profile_dir: str = "profile") -> None:
 
         self.model_registry = model_registry
         # Making sure the Model Registry does exist
@@ -41,6 +43,7 @@ class ModelRegistryConfig:
         self.transformer_dir = transformer_dir
         self.target_encoder_dir = target_encoder_dir
         self.model_dir = model_dir
+        self.profile_dir = profile_dir
         ...
 
     def get_latest_dir_path(self) -> Optional[str]:
@@ -135,6 +138,28 @@ class ModelRegistryConfig:
             lg.exception(e)
             raise e
 
+    def get_latest_profile_path(self) -> str:
+        """Returns the path of the `latest reference profile` of the Model Registry.
+
+        Raises:
+            e: Raises relevant exception should any sort of error pops up while returning the latest reference profile path.
+
+        Returns:
+            str: Latest Reference Profile path of the Model Registry.
+        """
+        try:
+            latest_dir = self.get_latest_dir_path()
+            lg.info("Getting the `latest Reference Profile path` from the Model Registry..")
+            if latest_dir is None:
+                lg.exception(
+                    "Even the dir doesn't exist and you are expecting a reference profile, shame!")
+
+            return os.path.join(latest_dir, self.profile_dir, REFERENCE_PROFILE)
+            ...
+        except Exception as e:
+            lg.exception(e)
+            raise e
+
     def get_latest_dir_path_to_save(self) -> str:
         """Returns the latest dir where the latest models and relevant artifacts shall be stored.
 
@@ -215,3 +240,21 @@ class ModelRegistryConfig:
             lg.exception(e)
             raise e
 
+    def save_latest_profile_at(self) -> str:
+        """Path in the Model Registry to save the latest Reference Profile at i.e. next to the latest Model.
+
+        Raises:
+            e: Raises relevant exception should any sort of error pops up while returning the latest reference profile path (for
+            saving newer reference profile).
+
+        Returns:
+            str: Path where the latest Reference Profile is to be stored at.
+        """
+        try:
+            latest_dir = self.get_latest_dir_path()
+            lg.info("Configuring the path where the `latest Reference Profile` is to be stored..")
+            return os.path.join(latest_dir, self.profile_dir, REFERENCE_PROFILE)
+            ...
+        except Exception as e:
+            lg.exception(e)
+            raise e
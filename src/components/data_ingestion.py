@@ -1,11 +1,18 @@
 from src.utils.db_operations import dBOperations
+from src.utils.mongo_client import MongoClientManager
 from src.logger import lg
 import pandas as pd
 import numpy as np
 import os
+import shutil
 from dataclasses import dataclass
-from src.entities.config import DataIngestionConfig
+from src.entities.config import DataIngestionConfig, SnapshotCacheConfig, BaseConfig
 from src.entities.artifact import DataIngestionArtifact
+from src.utils.file_operations import BasicUtils
+from src.utils.snapshot_cache import SnapshotCache
+from src.utils.stage_cache import StageCache
+from bson import ObjectId
+from typing import Optional
 from sklearn.model_selection import train_test_split
 
 
@@ -13,11 +20,238 @@ from sklearn.model_selection import train_test_split
 class DataIngestion:
     """Shall be used for obtaining and importing data from the desired dB in a form of feature store file.
     Data is also being split into train and test subsets herein this stage only.
+
+    Args:
+        rebuild_feature_store (bool, optional): Whether the feature store is to be rebuilt from the entire collection instead 
+        of only appending the newer documents to it. Defaults to False.
+        export_csv (bool, optional): Whether the feature store and the training and test sets are to be exported as CSV files 
+        too, apart from the configured `export_csv`. Defaults to False.
+
+    Note: In the "index" `split_mode`, the artifact's training and test file paths are the feature store itself, the rows of the 
+    sets being selected off it via their index paths. The feature store's only ever appended to (the newer parts going last), so
+    the indices of a run stay valid unless the feature store gets rebuilt.
     """
     lg.info(
         f'Entered the "{os.path.basename(__file__)[:-3]}.DataIngestion" class')
 
     data_ingestion_config = DataIngestionConfig()
+    snapshot_cache_config = SnapshotCacheConfig()
+    target = BaseConfig().target
+    precision = BaseConfig().precision
+    rebuild_feature_store: bool = False
+    export_csv: bool = False
+
+    def export_as_csv(self, df: pd.DataFrame, file_path: str, desc: str) -> None:
+        """Exports the dataframe as a CSV file next to the said columnar file, should it be asked to.
+
+        Raises:
+            e: Raises relevant exception should any sort of error pops up while exporting the dataframe.
+
+        Args:
+            df (pd.DataFrame): Dataframe that is to be exported.
+            file_path (str): Location of the columnar file the dataframe's been written at.
+            desc (str): Description of the dataframe.
+        """
+        try:
+            if self.export_csv or self.data_ingestion_config.export_csv:
+                BasicUtils.write_dataframe(
+                    df, file_path=os.path.splitext(file_path)[0] + ".csv", desc=f"{desc} (CSV export)")
+            ...
+        except Exception as e:
+            lg.exception(e)
+            raise e
+
+    def get_watermark(self) -> Optional[ObjectId]:
+        """Returns the persisted watermark i.e. the `_id` of the latest document that's been ingested into the feature store.
+
+        Raises:
+            e: Raises relevant exception should any sort of error pops up while reading the watermark.
+
+        Returns:
+            Optional[ObjectId]: The watermark, None if there's none or if the feature store itself is missing.
+        """
+        try:
+            if not os.path.exists(self.data_ingestion_config.feature_store_file_path):
+                lg.info("there's no feature store as of now, so no watermark either!")
+                return None
+            watermark = BasicUtils.read_yaml_file(
+                file_path=self.data_ingestion_config.watermark_file_path, desc="Watermark")
+            if watermark is None:
+                return None
+            return ObjectId(watermark["last_id"])
+            ...
+        except Exception as e:
+            lg.exception(e)
+            raise e
+
+    def get_recent_ids(self) -> np.ndarray:
+        """Returns the `_id`s (as sorted hex strings) of the latest `watermark_lookback_docs` documents that have been ingested,
+        empty if there are none persisted."""
+        if not os.path.exists(self.data_ingestion_config.recent_ids_file_path):
+            lg.warning("no `_id`s of the recently ingested documents found, the ones committed out of order can't be looked for!")
+            return np.empty(0, dtype="U24")
+        return np.load(self.data_ingestion_config.recent_ids_file_path)
+
+    def update_feature_store(self) -> None:
+        """Brings the persistent feature store up to date with the collection, by fetching only those documents that are newer 
+        than the watermark and appending them to the feature store. The feature store gets built from scratch if there's no 
+        watermark or if it's been asked to be rebuilt, in which case a fresh local snapshot of the collection is read instead, should
+        there be one.
+
+        Note: ObjectIds are compared as in they're generated, and concurrent writers may well commit a smaller `_id` after a 
+        greater one's been read. Hence the `_id`s of the latest `watermark_lookback_docs` documents ingested are kept, and the 
+        documents in between them that ain't among them get fetched too, in the very same query as the newer ones.
+
+        Raises:
+            e: Raises relevant exception should any sort of error pops up while updating the feature store.
+        """
+        try:
+            db_operations = dBOperations()
+            watermark = None if self.rebuild_feature_store else self.get_watermark()
+            # Pinning the upper bound so that the documents inserted while reading don't get past the watermark unread
+            fingerprint = None
+            if watermark is None and self.snapshot_cache_config.use_snapshot_cache:
+                # The whole collection's gotta be read, which a fresh local snapshot can stand in for
+                fingerprint = db_operations.getFingerprint(
+                    with_hash=self.snapshot_cache_config.validate_with_hash)
+                latest_id = None if fingerprint["max_id"] is None else ObjectId(fingerprint["max_id"])
+            else:
+                latest_id = db_operations.getLatestId()
+
+            if latest_id is None:
+                lg.warning("Looks like the collection is empty, nothing to ingest!")
+                return
+            elif watermark is not None and latest_id <= watermark:
+                lg.info(
+                    f"No newer documents since the watermark \"{watermark}\", feature store is already up to date!")
+                return
+            elif watermark is None:
+                lg.info('Building the "sensors" feature store from scratch..')
+                query = {"_id": {"$lte": latest_id}}
+            else:
+                recent_ids = self.get_recent_ids()
+                lg.info(
+                    f"fetching the documents newer than the watermark \"{watermark}\" (generated at {watermark.generation_time}), "
+                    f"along with the ones committed out of order among the latest {len(recent_ids)} ingested..")
+                if len(recent_ids) == 0:
+                    query = {"_id": {"$gt": watermark, "$lte": latest_id}}
+                else:
+                    query = {"_id": {"$gte": ObjectId(recent_ids[0]), "$lte": latest_id,
+                                     "$nin": [ObjectId(recent_id) for recent_id in recent_ids]}}
+
+            df = None
+            if fingerprint is not None:
+                snapshot_cache = SnapshotCache(
+                    collection_key=f"{db_operations.data_source_config.database_name}.{db_operations.data_source_config.get_collection_name()}")
+                df = snapshot_cache.load(fingerprint)
+                if df is not None and "_id" not in df.columns:
+                    lg.info("snapshot was taken sans the `_id`s, gotta read the database instead..")
+                    df = None
+            if df is None:
+                df = db_operations.getDataAsDataFrame(query=query, with_ids=True)
+                if fingerprint is not None:
+                    snapshot_cache.save(df, fingerprint)
+            # "na" values already come as NaN in the float columns, thus no need of replacing them
+            lg.info(f"{df.shape[0]} documents fetched!")
+            # The `_id`s (hex strings, which sort as the ObjectIds do) ain't a feature, they only go into the recent ones
+            ids = df.pop("_id").to_numpy(dtype="U24")
+            # A snapshot taken in another precision ain't already in the configured one
+            df = BasicUtils.configure_float_columns(
+                df, exclude_columns=[self.target], desc='"sensors"', dtype=self.precision)
+
+            if watermark is None:
+                # Building from scratch, the older parts (if any) are to go
+                if os.path.exists(self.data_ingestion_config.feature_store_file_path):
+                    shutil.rmtree(self.data_ingestion_config.feature_store_file_path)
+                rows_ingested = df.shape[0]
+            else:
+                last_watermark = BasicUtils.read_yaml_file(
+                    file_path=self.data_ingestion_config.watermark_file_path, desc="Watermark")
+                rows_ingested = last_watermark["rows_ingested"] + df.shape[0]
+            if df.shape[0] == 0:
+                lg.info("No newer rows to be appended, feature store is already up to date!")
+            else:
+                # The newer rows get lined up with the feature store's columns and dtypes
+                BasicUtils.append_parquet_part(
+                    df, dataset_dir=self.data_ingestion_config.feature_store_file_path, desc='"sensors" feature store',
+                    compression=self.data_ingestion_config.compression)
+                lg.info('"sensors" feature store updated successfully!')
+
+            # Only the fetched `_id`s go into the recent ones, since the documents committed meanwhile ain't in the feature store
+            recent_ids = ids if watermark is None else np.r_[self.get_recent_ids(), ids]
+            recent_ids = np.unique(recent_ids)[-self.data_ingestion_config.watermark_lookback_docs:]
+            np.save(self.data_ingestion_config.recent_ids_file_path, recent_ids)
+            lg.info(f"`_id`s of the latest {len(recent_ids)} documents ingested saved!")
+
+            # Moving the watermark only once the feature store's been written
+            BasicUtils.write_yaml_file(
+                file_path=self.data_ingestion_config.watermark_file_path,
+                data={
+                    "last_id": str(latest_id),
+                    "last_id_generated_at": latest_id.generation_time.isoformat(),
+                    "rows_ingested": int(rows_ingested)
+                },
+                desc="Watermark")
+            ...
+        except Exception as e:
+            lg.exception(e)
+            raise e
+
+    def split_feature_store(self) -> None:
+        """Reads the "sensors" feature store and splits it into the training and test subsets (stratified on the target), saving 
+        either only their row indices or, as per the `split_mode`, the subsets as a whole to their respective dirs (exporting them as CSV files too, should it be asked to).
+
+        Raises:
+            e: Raises relevant exception should any sort of error pops up while splitting the feature store.
+        """
+        try:
+            lg.info('reading the "sensors" feature store as pandas dataframe..')
+            df = BasicUtils.read_dataframe(
+                self.data_ingestion_config.feature_store_file_path, desc='"sensors" feature store')
+            self.export_as_csv(
+                df, file_path=self.data_ingestion_config.feature_store_file_path, desc='"sensors" feature store')
+
+            ###################################### TRAINING-TEST SPLIT #########################################
+            lg.info('Splitting the data into training and test subsets..')
+            training_index, test_index = train_test_split(
+                np.arange(df.shape[0]), test_size=self.data_ingestion_config.test_size, stratify=df[self.target],
+                random_state=self.data_ingestion_config.random_state)
+            lg.info("data split into test and training subsets successfully!")
+
+            lg.info("Saving the row indices of the test and training subsets..")
+            BasicUtils.save_numpy_array(
+                self.data_ingestion_config.test_index_path, arr=test_index, desc="Test set row indices")
+            BasicUtils.save_numpy_array(
+                self.data_ingestion_config.training_index_path, arr=training_index, desc="Training set row indices")
+            # Fingerprint of the feature store as of the split, so that the readers can tell should it get rebuilt underneath the
+            # indices (the appends being fine, as they only add rows past the indexed ones)
+            for index_path in [self.data_ingestion_config.test_index_path, self.data_ingestion_config.training_index_path]:
+                BasicUtils.save_index_source(index_path, file_path=self.data_ingestion_config.feature_store_file_path)
+            if self.data_ingestion_config.split_mode == "index" and not (
+                    self.export_csv or self.data_ingestion_config.export_csv):
+                lg.info("test and training subsets are to be selected off the feature store, no need of writing them!")
+                return
+
+            training_set = df.iloc[training_index]
+            test_set = df.iloc[test_index]
+            if self.data_ingestion_config.split_mode == "files":
+                # Saving the test and train set to their respective dirs
+                lg.info("Saving the test and training subsets to their respective dirs..")
+                BasicUtils.write_dataframe(
+                    test_set, file_path=self.data_ingestion_config.test_file_path, desc="Test set",
+                    compression=self.data_ingestion_config.compression)
+                BasicUtils.write_dataframe(
+                    training_set, file_path=self.data_ingestion_config.training_file_path, desc="Training set",
+                    compression=self.data_ingestion_config.compression)
+            self.export_as_csv(
+                test_set, file_path=self.data_ingestion_config.test_file_path, desc="Test set")
+            self.export_as_csv(
+                training_set, file_path=self.data_ingestion_config.training_file_path, desc="Training set")
+            lg.info("test and training subsets saved succesfully!")
+            ...
+        except Exception as e:
+            lg.exception(e)
+            raise e
 
     def initiate(self) -> DataIngestionArtifact:
         """Initiates the Data Ingestion stage of the training piepeline.
@@ -31,46 +265,47 @@ class DataIngestion:
         try:
             lg.info(f"\n{'='*27} DATA INGESTION {'='*40}")
 
-            ################################# Readying the "sensors" dataframe #################################
-            lg.info('Exporting the "sensors" data as pandas dataframe..')
-            df: pd.DataFrame = dBOperations().getDataAsDataFrame()
-            lg.info("dataframe fetched!")
-            # Replacing "na" values with np.NaN in dataframe
-            df.replace(to_replace="na", value=np.NaN, inplace=True)
-            # Making sure the dir where dataframe is to be stored does exist
-            feature_store_dir = os.path.dirname(
-                self.data_ingestion_config.feature_store_file_path)
-            os.makedirs(feature_store_dir, exist_ok=True)
-            # Saving the dataframe to the feature_store_path
-            df.to_csv(
-                path_or_buf=self.data_ingestion_config.feature_store_file_path, index=None)
-            lg.info('"sensors" dataframe exported successfully!')
+            ############################## Updating the "sensors" feature store ################################
+            self.update_feature_store()
+            MongoClientManager.log_pool_stats(stage="data ingestion")
+            if not os.path.exists(self.data_ingestion_config.feature_store_file_path):
+                raise Exception(
+                    "Neither the collection has got any data nor is there any feature store to ingest from!")
 
-            ###################################### TRAINING-TEST SPLIT #########################################
-            lg.info('Splitting the data into training and test subsets..')
-            training_set, test_set = train_test_split(
-                df, test_size=self.data_ingestion_config.test_size, random_state=self.data_ingestion_config.random_state)
-            lg.info("data split into test and training subsets successfully!")
-            # Making sure the test and training dirs do exist
-            test_dir = os.path.dirname(
-                self.data_ingestion_config.test_file_path)
-            training_dir = os.path.dirname(
-                self.data_ingestion_config.training_file_path)
-            os.makedirs(test_dir, exist_ok=True)
-            os.makedirs(training_dir, exist_ok=True)
-            # Saving the test and train set to their respective dirs
-            lg.info("Saving the test and training subsets to their respective dirs..")
-            test_set.to_csv(
-                path_or_buf=self.data_ingestion_config.test_file_path, index=None)
-            training_set.to_csv(
-                path_or_buf=self.data_ingestion_config.training_file_path, index=None)
-            lg.info("test and training subsets saved succesfully!")
+            ########### Reusing the cached split, should neither the feature store nor the config change ##########
+            index_mode = self.data_ingestion_config.split_mode == "index"
+            split_outputs = {
+                "training_index": self.data_ingestion_config.training_index_path,
+                "test_index": self.data_ingestion_config.test_index_path}
+            split_outputs.update({
+                f"{name}_source": BasicUtils.get_index_source_path(index_path) for name, index_path in list(split_outputs.items())})
+            subset_paths = {
+                "training_set": self.data_ingestion_config.training_file_path,
+                "test_set": self.data_ingestion_config.test_file_path}
+            if not index_mode:
+                split_outputs.update(subset_paths)
+            export_csv = self.export_csv or self.data_ingestion_config.export_csv
+            if export_csv:
+                split_outputs.update({
+                    f"{name}_csv": os.path.splitext(file_path)[0] + ".csv" for name, file_path in list(subset_paths.items()) + [
+                        ("feature_store", self.data_ingestion_config.feature_store_file_path)]})
+            stage_key = StageCache.get_key(
+                "data_ingestion", input_paths=[self.data_ingestion_config.feature_store_file_path],
+                params=dict(StageCache.get_params(self.data_ingestion_config), export_csv=export_csv))
+            if StageCache.restore("data_ingestion", stage_key, outputs=split_outputs) is None:
+                self.split_feature_store()
+                StageCache.save("data_ingestion", stage_key, outputs=split_outputs)
             
             #################################### Saving Artifacts Config #######################################
+            # Should the split be saved as indices, the training and test sets are to be selected off the feature store
             data_ingestion_artifact = DataIngestionArtifact(
                 feature_store_file=self.data_ingestion_config.feature_store_file_path,
-                training_file_path=self.data_ingestion_config.training_file_path,
-                test_file_path=self.data_ingestion_config.test_file_path
+                training_file_path=(self.data_ingestion_config.feature_store_file_path if index_mode
+                                    else self.data_ingestion_config.training_file_path),
+                test_file_path=(self.data_ingestion_config.feature_store_file_path if index_mode
+                                else self.data_ingestion_config.test_file_path),
+                training_index_path=self.data_ingestion_config.training_index_path if index_mode else None,
+                test_index_path=self.data_ingestion_config.test_index_path if index_mode else None
             )
             lg.info(f"Data Ingestion Artifact: {data_ingestion_artifact}")
             lg.info("DATA INGESTION completed!")
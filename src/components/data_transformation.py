@@ -3,8 +3,10 @@ import numpy as np
 import os
 from src.logger import lg
 from src.utils.file_operations import BasicUtils
+from src.utils.stage_cache import StageCache
+from src.utils.missing_values import MissingAsSparse
 from src.entities.config import DataTransformationConfig, BaseConfig
-from src.entities.artifact import DataIngestionArtifact, DataTransformationArtifact
+from src.entities.artifact import DataIngestionArtifact, DataValidationArtifact, DataTransformationArtifact
 from sklearn.pipeline import Pipeline
 from sklearn.impute import SimpleImputer
 from sklearn.preprocessing import RobustScaler, OneHotEncoder
@@ -20,18 +22,29 @@ class DataTransformation:
     Args:
         data_ingestion_artifact (DataIngestionArtifact): Takes in a `DataIngestionArtifact` object as pre-requisite to 
         trigger the Data Transformation stage.
+        data_validation_artifact (DataValidationArtifact): Takes in a `DataValidationArtifact` object for the features selected
+        during the Data Validation stage, the only ones that are to be read and transformed.
     """
     lg.info(
         f'Entered the "{os.path.basename(__file__)[:-3]}.DataTransformation" class')
 
     data_ingestion_artifact: DataIngestionArtifact
+    data_validation_artifact: DataValidationArtifact
     data_transformation_config = DataTransformationConfig()
     target = BaseConfig().target
+    precision = BaseConfig().precision
 
     @classmethod
-    def get_transformer(cls) -> Pipeline:
+    def get_transformer(cls, missing_value_mode: str = "impute", sparse_density_thresh: float = .5) -> Pipeline:
         """Returns a `Custom Pipeline` for numerical attributes of the said dataset. Pipeline contains 
-        `SimpleImputer` and `RobustScaler` to transform the features of the very same dataset.
+        `SimpleImputer` and `RobustScaler` to transform the features of the very same dataset or, in the "native" missing value
+        mode, the `RobustScaler` (sans centering, so that the zeros stay zeros) followed by `MissingAsSparse`, which keeps the
+        missing values as NaN (or as the implicit entries of a CSR matrix) for XGBoost to handle them natively.
+
+        Args:
+            missing_value_mode (str, optional): "impute" or "native". Defaults to "impute".
+            sparse_density_thresh (float, optional): Density below which the "native" mode's features are stored as a CSR 
+            matrix. Defaults to .5.
 
         Raises:
             e: Raises relevant exception should any sort of error pops up while fetching the said `transformer pipeline`.
@@ -41,6 +54,10 @@ class DataTransformation:
         """
         try:
             ################################# Pipeline for Numerical Atts #####################################
+            if missing_value_mode == "native":
+                return Pipeline(
+                    steps=[("Robust Scaler", RobustScaler(with_centering=False)),
+                           ("Sparsifier", MissingAsSparse(density_thresh=sparse_density_thresh))])
             simple_imputer = SimpleImputer(strategy="constant", fill_value=0)
             robust_scaler = RobustScaler()
             transformer = Pipeline(
@@ -72,26 +89,31 @@ class DataTransformation:
             lg.exception(e)
             raise e
 
-    def initiate(self) -> DataTransformationArtifact:
-        """Initiates the Data Transformation stage of the training pipeline and returns the configurations of relevant artifacts
-        (being used in the process) and transformed datasets (being generated in the process).
+    def transform(self) -> None:
+        """Fits the transformer and the target encoder to the training set, transforms the training and test sets (resampling
+        the training instances) and saves the fitted objects and the transformed arrays.
 
         Raises:
-            e: Raises relevant exception should any sort of error pops up in the Data Transformation stage.
-
-        Returns:
-            DataTransformationArtifact: Contains configurations of `transformer pipeline`, `target encoder` and transformed 
-            training and test arrays. 
+            e: Raises relevant exception should any sort of error pops up while transforming the datasets.
         """
         try:
-            lg.info(f"\n{'='*27} DATA TRANSFORMATION {'='*40}")
-
             ############################# Fetch the Training and Test datasets ################################
+            # Only the selected features are read, so the dropped sensors never make it into the transformer
+            selected_features = BasicUtils.read_yaml_file(
+                file_path=self.data_validation_artifact.selected_features_file_path, desc="Selected Features")["features"]
             lg.info("fetching the training and test sets for transformation..")
-            training_set = pd.read_csv(
-                self.data_ingestion_artifact.training_file_path)
-            test_set = pd.read_csv(self.data_ingestion_artifact.test_file_path)
+            training_set = BasicUtils.read_dataframe(
+                self.data_ingestion_artifact.training_file_path, desc="Training set",
+                columns=selected_features + [self.target], index_path=self.data_ingestion_artifact.training_index_path)
+            test_set = BasicUtils.read_dataframe(
+                self.data_ingestion_artifact.test_file_path, desc="Test set",
+                columns=selected_features + [self.target], index_path=self.data_ingestion_artifact.test_index_path)
             lg.info("training and test sets fetched successfully!")
+            # The features are kept in the configured precision all the way through (a no-op if they already are)
+            training_set = BasicUtils.configure_float_columns(
+                training_set, exclude_columns=[self.target], desc="Training set", dtype=self.precision)
+            test_set = BasicUtils.configure_float_columns(
+                test_set, exclude_columns=[self.target], desc="Test set", dtype=self.precision)
 
             ################ Fetch the Features and Labels from the Training and Test sets #####################
             X_train, y_train = BasicUtils.get_features_and_labels(
@@ -103,7 +125,9 @@ class DataTransformation:
             # fetch the transformer and fit to the training set
             lg.info("fetching the transformer..")
             lg.info("fitting the transformer to the Training set's features..")
-            transformer = DataTransformation.get_transformer()
+            transformer = DataTransformation.get_transformer(
+                missing_value_mode=self.data_transformation_config.missing_value_mode,
+                sparse_density_thresh=self.data_transformation_config.sparse_density_thresh)
             transformer.fit(X_train)
             lg.info("Transformer fitted to the \"Training features\" successfully!")
             # fetch the Encoder and fit to the Target column
@@ -138,45 +162,98 @@ class DataTransformation:
                 obj_desc="target encoder")
 
             ############################### Resampling of Training Instances ##################################
-            lg.info(
-                "Resampling the training instances as our target attribute is highly imbalanced..")
-            lg.info(
-                f"Before Resampling, shape of the `training set`: {training_set.shape}")
-            lg.info('Resampling via SMOTETomek using sampling_strategy="auto"..')
-            smt_tomek = SMOTETomek(sampling_strategy="auto")
-            X_train_res, y_train_res = smt_tomek.fit_resample(
-                X_train_transformed, y_train_encoded)
-
-            lg.info("..resampling of training instances is done successfully!")
-
-            ############################# Configure Training and Test arrays ##################################
-            training_arr_res = np.c_[X_train_res, y_train_res]
-            lg.info(
-                f"After Resampling, shape of the `training set`: {training_arr_res.shape}")
-            test_arr_res = np.c_[X_test_transformed, y_test_encoded]
-            lg.info(
-                f"Configured the training and test arrays successfully!")
-
-            ################################ Save Training and Test arrays ####################################
-            # Saving the Training Array
+            if self.data_transformation_config.missing_value_mode == "native":
+                # SMOTETomek can't interpolate the missing values, so the imbalance's gotta be made up for while training
+                # (via `scale_pos_weight`) instead
+                lg.info(
+                    f'missing values are kept as they are ({"CSR matrix" if transformer[-1].sparse_ else "dense array"}, '
+                    f'{transformer[-1].density_:.2%} dense), so the training instances ain\'t resampled!')
+                X_train_res, y_train_res = X_train_transformed.astype(self.precision, copy=False), y_train_encoded
+            else:
+                lg.info(
+                    "Resampling the training instances as our target attribute is highly imbalanced..")
+                lg.info(
+                    f"Before Resampling, shape of the `training set`: {training_set.shape}")
+                lg.info('Resampling via SMOTETomek using sampling_strategy="auto"..')
+                smt_tomek = SMOTETomek(sampling_strategy="auto")
+                X_train_res, y_train_res = smt_tomek.fit_resample(
+                    X_train_transformed, y_train_encoded)
+                X_train_res = X_train_res.astype(self.precision, copy=False)
+
+                lg.info("..resampling of training instances is done successfully!")
+
+                lg.info(
+                    f"After Resampling, shape of the `training set`: {X_train_res.shape[0], X_train_res.shape[1] + 1}")
+
+            ############################# Save Training and Test arrays #######################################
+            # Features and labels are saved as separate contiguous arrays, so that they can be memory-mapped as they are
+            # (sans concatenation here and slicing copies there)
             BasicUtils.save_numpy_array(
-                file_path=self.data_transformation_config.transformed_training_file_path,
-                arr=training_arr_res,
-                desc="Training"
+                file_path=self.data_transformation_config.transformed_training_features_path,
+                arr=X_train_res,
+                desc="Training features"
             )
-            # Saving the Test Array
             BasicUtils.save_numpy_array(
-                file_path=self.data_transformation_config.transformed_test_file_path,
-                arr=test_arr_res,
-                desc="Test"
+                file_path=self.data_transformation_config.transformed_training_labels_path,
+                arr=np.ravel(y_train_res),
+                desc="Training labels"
             )
+            BasicUtils.save_numpy_array(
+                file_path=self.data_transformation_config.transformed_test_features_path,
+                arr=X_test_transformed,
+                desc="Test features"
+            )
+            BasicUtils.save_numpy_array(
+                file_path=self.data_transformation_config.transformed_test_labels_path,
+                arr=np.ravel(y_test_encoded),
+                desc="Test labels"
+            )
+            ...
+        except Exception as e:
+            lg.exception(e)
+            raise e
+
+    def initiate(self) -> DataTransformationArtifact:
+        """Initiates the Data Transformation stage of the training pipeline and returns the configurations of relevant artifacts
+        (being used in the process) and transformed datasets (being generated in the process).
+
+        Raises:
+            e: Raises relevant exception should any sort of error pops up in the Data Transformation stage.
+
+        Returns:
+            DataTransformationArtifact: Contains configurations of `transformer pipeline`, `target encoder` and transformed 
+            training and test arrays. 
+        """
+        try:
+            lg.info(f"\n{'='*27} DATA TRANSFORMATION {'='*40}")
+
+            ########## Reusing the cached outputs, should neither the datasets nor the config change ###########
+            transformation_outputs = {
+                "transformer": self.data_transformation_config.transformer_path,
+                "target_encoder": self.data_transformation_config.target_encoder_path,
+                "training_features": self.data_transformation_config.transformed_training_features_path,
+                "training_labels": self.data_transformation_config.transformed_training_labels_path,
+                "test_features": self.data_transformation_config.transformed_test_features_path,
+                "test_labels": self.data_transformation_config.transformed_test_labels_path}
+            stage_key = StageCache.get_key(
+                "data_transformation", input_paths=[
+                    self.data_ingestion_artifact.training_file_path, self.data_ingestion_artifact.test_file_path,
+                    self.data_ingestion_artifact.training_index_path, self.data_ingestion_artifact.test_index_path,
+                    self.data_validation_artifact.selected_features_file_path],
+                params=dict(StageCache.get_params(self.data_transformation_config), precision=self.precision))
+            if StageCache.restore("data_transformation", stage_key, outputs=transformation_outputs) is None:
+                self.transform()
+                StageCache.save("data_transformation", stage_key, outputs=transformation_outputs)
 
             ##################################### Save Artifacts Config #######################################
             transformation_artifact = DataTransformationArtifact(
                 transformer_path=self.data_transformation_config.transformer_path,
                 target_encoder_path=self.data_transformation_config.target_encoder_path,
-                transformed_training_file_path=self.data_transformation_config.transformed_training_file_path,
-                transformed_test_file_path=self.data_transformation_config.transformed_test_file_path
+                transformed_training_features_path=self.data_transformation_config.transformed_training_features_path,
+                transformed_training_labels_path=self.data_transformation_config.transformed_training_labels_path,
+                transformed_test_features_path=self.data_transformation_config.transformed_test_features_path,
+                transformed_test_labels_path=self.data_transformation_config.transformed_test_labels_path,
+                resampled=self.data_transformation_config.missing_value_mode != "native"
             )
             lg.info(f"Transformation Artifact: {transformation_artifact}")
             lg.info("Data Transformation completed!")
@@ -2,12 +2,17 @@ import pandas as pd
 import numpy as np
 import os
 from src.logger import lg
-from scipy.stats import ks_2samp
-from typing import Optional
-from dataclasses import dataclass
-from src.entities.config import DataValidationConfig
+from typing import Dict, List, Optional, Union
+from dataclasses import dataclass, field
+from src.entities.config import DataValidationConfig, SchemaConfig, BaseConfig
+from src.entities.schema import SensorSchema
+from src.entities.profile import ReferenceProfile
 from src.entities.artifact import DataValidationArtifact, DataIngestionArtifact
 from src.utils.file_operations import BasicUtils
+from src.utils.stage_cache import StageCache
+from src.utils.drift import DriftEngine
+from src.utils.sketch import DataFrameSketch
+from src.utils.artifact_store import ArtifactStore
 
 
 @dataclass
@@ -24,25 +29,33 @@ class DataValidation:
 
     data_ingestion_artifact: DataIngestionArtifact
     data_validation_config =  DataValidationConfig()
-    validation_report = dict()
-
-    def drop_redundant_columns(self, df: pd.DataFrame, missing_thresh: float, report_key: str) -> Optional[pd.DataFrame]:
+    schema_config = SchemaConfig()
+    target = BaseConfig().target
+    precision = BaseConfig().precision
+    # Per instance, lest the reports and the bin counts of one run leak into those of another
+    validation_report: Dict = field(default_factory=dict)
+    bin_counts: Dict[str, Dict[str, np.ndarray]] = field(default_factory=dict)
+
+    def drop_redundant_columns(self, df: Union[pd.DataFrame, DataFrameSketch], missing_thresh: float, 
+                               report_key: str) -> Optional[Union[pd.DataFrame, DataFrameSketch]]:
         """Drops the columns having missing values more than the said threshold.
 
         Args:
-            df (pd.DataFrame): Accepts the dataframe whose columns have to be dropped.
+            df (Union[pd.DataFrame, DataFrameSketch]): Accepts the dataframe (or the sketch of the one that's been streamed) 
+            whose columns have to be dropped.
             missing_thresh (float): Percentage criterion to drop a column.
 
         Raises:
             e: Raises relevant exception should any sort of error pops up while dropping the redundant columns.
 
         Returns:
-            Optional[pd.DataFrame]: Dataframe after getting its redundant columns droppeds.
+            Optional[Union[pd.DataFrame, DataFrameSketch]]: Dataframe (or sketch) after getting its redundant columns droppeds.
         """
         try:
             lg.info(
                 f"Dropping columns having missing values more than {missing_thresh*100}%..")
-            cols_missing_ratios = df.isna().sum().div(df.shape[0])
+            cols_missing_ratios = pd.Series(df.missing_ratios, dtype="float64") if isinstance(
+                df, DataFrameSketch) else df.isna().sum().div(df.shape[0])
             cols_to_drop = list(
                 cols_missing_ratios[cols_missing_ratios > missing_thresh].index)
 
@@ -52,8 +65,12 @@ class DataValidation:
                 lg.info(f"Columns to be dropped: {cols_to_drop}")
                 self.validation_report[report_key] = cols_to_drop
 
-            # Dropping redundant columns
-            df.drop(cols_to_drop, axis=1, inplace=True)
+            if isinstance(df, DataFrameSketch):
+                # The dropped columns' sketches are just let be
+                df.columns = [col for col in df.columns if col not in cols_to_drop]
+            else:
+                # Dropping redundant columns (not in place, as the very dataframe might be handed over to the later stages too)
+                df = df.drop(cols_to_drop, axis=1)
 
             if len(df.columns) == 0:
                 lg.info(
@@ -65,12 +82,12 @@ class DataValidation:
             lg.exception(e)
             raise e
 
-    def required_columns_check(self, base_df: pd.DataFrame, current_df: pd.DataFrame, report_key: str) -> bool:
+    def required_columns_check(self, base_cols: List[str], current_df: pd.DataFrame, report_key: str) -> bool:
         """Performs check for columns taking reference from the MDM (Master Data Management).
 
         Args:
-            base_df (pd.DataFrame): Reference dataframe.
-            current_df (pd.DataFrame): Present dataframe on which check has to be performed having `base_df` as reference.
+            base_cols (List[str]): Reference columns i.e. the base data's ones that weren't dropped.
+            current_df (pd.DataFrame): Present dataframe on which check has to be performed having `base_cols` as reference.
             report_key (str): Key name for holding dropped columns in the validation report.
 
         Raises:
@@ -83,7 +100,6 @@ class DataValidation:
             lg.info(
                 "Validating columns taking the reference from the MDM (Master Data Management)..")
 
-            base_cols = base_df.columns
             current_cols = current_df.columns
 
             missing_cols = []
@@ -101,14 +117,17 @@ class DataValidation:
             lg.exception(e)
             raise e
 
-    def data_drift_check(self, base_df: pd.DataFrame, current_df: pd.DataFrame, current_df_desc: str, report_key: str) -> None:
+    def data_drift_check(self, profile: ReferenceProfile, base_cols: List[str], current_df: Union[pd.DataFrame, DataFrameSketch],
+                         current_df_desc: str, report_key: str) -> None:
         """Performs "data drift" check by validating whether the distributions of both base and present dataframes 
         are drawn from a single distribution by assuming Null Hypothesis as in they are indeed drawn from the same 
         distribution.
 
         Args:
-            base_df (pd.DataFrame): Reference Dataframe
-            current_df_desc (pd.DataFrame): Dataframe on which data drift check has to be done.
+            profile (ReferenceProfile): Reference profile of the base data.
+            base_cols (List[str]): Base columns that are to be checked.
+            current_df (Union[pd.DataFrame, DataFrameSketch]): Dataframe (or the sketch of the one that's been streamed, in which
+            case the KS statistics are approximate) on which data drift check has to be done.
             current_desc (str): Description of the said `Current Dataframe`.
             report_key (str): Key name for holding missing columns in the validation report.
 
@@ -116,48 +135,69 @@ class DataValidation:
             e: Raises relevant exception should any sort of error pops up while performing `Data Drift check`.
         """
         try:
-            ############################ Configuring Columns' datatypes #######################################
-            base_df = BasicUtils.configure_float_columns(
-                base_df, exclude_columns=["class"], desc="Base")
-            current_df = BasicUtils.configure_float_columns(
-                current_df, exclude_columns=["class"], desc=current_df_desc)
-
+            # Columns' datatypes are already configured at the read time, as per the sensor schema
             drift_report = {}
 
             ##################### Separating Numerical and Categorical Columns ################################
-            base_num_cols, base_cat_cols = BasicUtils.get_numerical_and_categorical_attributes(
-                base_df, desc="Base")
+            base_num_cols = [col for col in base_cols if col in profile.samples]
+            base_cat_cols = [col for col in base_cols if col in profile.categories]
 
             ########################### DRIFT CHECK for Numerical Columns #####################################
             lg.info(
                 'Performing "Data Drift Check" for "Numerical Columns" by validating if the distributions of both base dataframe and present dataframe are drawn from a single distribution..'
             )
             lg.info('Null Hypothesis: Base datframe\'s distribution and current dataframe\'s distribution are drawn from a single distribution.')
-            for col in base_num_cols:
-                base_dist, current_dist = base_df[col], current_df[col]
-                kstest_result = ks_2samp(base_dist, current_dist)
-
-                lg.info(
-                    f'Null Hypothesis: "{col}" from the `Base dataframe` and "{col}" from the `{current_df_desc} dataframe` are drawn from the same distribution.')
-                if kstest_result.pvalue > .05:
-                    lg.info("Null hypothesis is to be accepted!")
-                    drift_report[col] = {
-                        "pvalue": float(kstest_result.pvalue),
-                        "same_distribution": True
-                    }
+            # All the columns are KS tested at once (in blocks over a pool of processes) against the profile's sorted samples, the 
+            # missing values being left out
+            # The mode each column's verdict comes from is recorded along with it
+            base = {col: profile.samples[col] for col in base_num_cols}
+            if isinstance(current_df, DataFrameSketch):
+                drift_report.update({
+                    col: {**res, "mode": "streaming"} for col, res in DriftEngine.ks_test_sketches(
+                        base=base, base_counts=profile.counts, sketches=current_df.sketches).items()})
+            elif (self.data_validation_config.validation_mode == "sampled"
+                  and current_df.shape[0] > self.data_validation_config.sample_size):
+                sample_df = self.get_stratified_sample(current_df, self.data_validation_config.sample_size)
+                drift_report.update({
+                    col: {**res, "mode": "sampled"} for col, res in DriftEngine.ks_test(
+                        base=base, current={col: sample_df[col].to_numpy(dtype="float64", na_value=np.nan) for col in base},
+                        base_sorted=True, base_counts=profile.counts).items()})
+                # Verdicts of the columns whose sampled p-values ain't decisive either way are left to the whole data
+                low, high = self.data_validation_config.uncertainty_band
+                uncertain_cols = [col for col in base if low <= drift_report[col]["pvalue"] <= high]
+                lg.info(f"{len(uncertain_cols)} columns' sampled p-values fall inside {(low, high)}, re-testing them exactly..")
+                if len(uncertain_cols) > 0:
+                    drift_report.update({
+                        col: {**res, "mode": "exact"} for col, res in DriftEngine.ks_test(
+                            base={col: base[col] for col in uncertain_cols},
+                            current={col: current_df[col].to_numpy(dtype="float64", na_value=np.nan) for col in uncertain_cols},
+                            base_sorted=True, base_counts=profile.counts).items()})
+            else:
+                drift_report.update({
+                    col: {**res, "mode": "exact"} for col, res in DriftEngine.ks_test(
+                        base=base, current={col: current_df[col].to_numpy(dtype="float64", na_value=np.nan) for col in base},
+                        base_sorted=True, base_counts=profile.counts).items()})
+            # PSI and JS divergence off the histograms over the profile's bin edges, the current data being binned whole (or 
+            # having been binned chunk by chunk, while being sketched)
+            if len(base_num_cols) > 0:
+                if isinstance(current_df, DataFrameSketch):
+                    current_counts = np.stack([
+                        current_df.bin_counts.get(col, np.zeros(profile.n_bins, dtype="int64")) for col in base_num_cols])
                 else:
-
-                    lg.info("Null hypothesis is to be rejected!")
-                    drift_report[col] = {
-                        "pvalue": float(kstest_result.pvalue),
-                        "same_distribution": False
-                    }
+                    current_counts = profile.get_bin_counts(current_df, base_num_cols)
+                base_counts = np.stack([profile.histograms[col] for col in base_num_cols])
+                for col, res in DriftEngine.histogram_drift(base_num_cols, base_counts, current_counts).items():
+                    drift_report[col].update(res)
+                self.bin_counts[current_df_desc.lower()] = dict(zip(base_num_cols, current_counts))
+            lg.info(f'"Data Drift Check" for the "Numerical Columns" of the `{current_df_desc} dataframe` done!')
 
             ########################## DRIFT CHECK for Categorical Columns ####################################
             lg.info(
                 'Performing "Data Drift Check" for "Categorical Columns" by validating whether the categories present inside both of the dataframe\'s categorical columns are same..')
             for col in base_cat_cols:
-                if list(base_df[col].value_counts().index).sort() == list(current_df[col].value_counts().index).sort():
+                current_categories = current_df.categories[col] if isinstance(current_df, DataFrameSketch) else set(
+                    map(str, current_df[col].dropna().unique()))
+                if set(profile.categories[col]) == current_categories:
                     drift_report[col] = {
                         "same_categories": True
                     }
@@ -173,38 +213,171 @@ class DataValidation:
             lg.exception(e)
             raise e
 
-    def initiate(self) -> DataValidationArtifact:
-        """Initiates the Data Validation stage of the training pipeline and generates a validation report accordingly.
+    def get_stratified_sample(self, df: pd.DataFrame, sample_size: int) -> pd.DataFrame:
+        """Draws a sample of (about) the said size from the dataframe, stratified by the target, so that the minority class 
+        stays represented as it is in the whole data.
+
+        Args:
+            df (pd.DataFrame): Dataframe the sample's to be drawn from.
+            sample_size (int): Number of rows to be sampled.
 
         Raises:
-            e: Raises relevant exception should any kind of error pops up during validating the data.
+            e: Raises relevant exception should any sort of error pops up while sampling the dataframe.
 
         Returns:
-            DataValidationArtifact: Contains configuration of consequently generated `Validation Report`.
+            pd.DataFrame: Sampled dataframe.
         """
         try:
-            lg.info(f"\n{'='*27} DATA VALIDATION {'='*40}")
+            frac = min(1., sample_size / df.shape[0])
+            if self.target not in df.columns:
+                return df.sample(frac=frac, random_state=42)
+            sample_df = df.groupby(self.target, group_keys=False, observed=True).sample(frac=frac, random_state=42)
+            lg.info(f"drew a stratified sample of {sample_df.shape[0]} rows out of {df.shape[0]}!")
+            return sample_df
+            ...
+        except Exception as e:
+            lg.exception(e)
+            raise e
 
-            lg.info("fetching Base dataframe..")
-            base_df = pd.read_csv(self.data_validation_config.base_file_path)
-            # Replace na vals with np.NaN
-            base_df.replace({"na": np.NaN}, inplace=True)
+    def get_reference_profile(self) -> ReferenceProfile:
+        """Returns the reference profile of the base data, building it (and saving it for the later runs) only should there be
+        none or should the base file have changed since it was built.
+
+        Raises:
+            e: Raises relevant exception should any sort of error pops up while fetching the reference profile.
+
+        Returns:
+            ReferenceProfile: Reference profile of the base data.
+        """
+        try:
+            profile_path = self.data_validation_config.reference_profile_path
+            source = ReferenceProfile.get_source_stat(self.data_validation_config.base_file_path)
+            profile = ArtifactStore.get(profile_path)
+            if profile is None and os.path.exists(profile_path):
+                profile = ReferenceProfile.load(profile_path)
+            if profile is not None and profile.source == source and profile.n_bins == self.data_validation_config.n_bins:
+                ArtifactStore.put(profile_path, profile)
+                return profile
+
+            lg.info("there's no reference profile of the base data as of now (or the base data's or the bins have changed), gotta build one..")
+            # "na" values are read as NaN and the sensors as floats, as per the sensor schema derived from the base data
+            schema = SensorSchema.from_header(
+                self.schema_config.base_file_path, target=self.target, float_dtype=self.precision,
+                csv_engine=self.schema_config.csv_engine)
+            base_df = BasicUtils.read_dataframe(
+                self.data_validation_config.base_file_path, desc="Base", schema=schema)
+            profile = ReferenceProfile.from_dataframe(
+                base_df, max_samples=self.data_validation_config.profile_max_samples,
+                n_bins=self.data_validation_config.n_bins, source=source)
+            profile.save(profile_path)
+            ArtifactStore.put(profile_path, profile)
+            return profile
+            ...
+        except Exception as e:
+            lg.exception(e)
+            raise e
+
+    def get_current_data(self, file_path: str, index_path: Optional[str], desc: str,
+                         profile: ReferenceProfile) -> Union[pd.DataFrame, DataFrameSketch]:
+        """Returns the said dataset as dataframe or, in the "streaming" validation mode, its sketch, as in the dataset's read in
+        chunks (so that it needn't ever be held in the memory whole).
+
+        Args:
+            file_path (str): Location of the dataset.
+            index_path (Optional[str]): Location of its row indices, if any.
+            desc (str): Description of the dataset.
+            profile (ReferenceProfile): Reference profile of the base data, whose bin edges the dataset's binned over whilst 
+            being sketched.
+
+        Raises:
+            e: Raises relevant exception should any sort of error pops up while reading the dataset.
+
+        Returns:
+            Union[pd.DataFrame, DataFrameSketch]: Dataframe or its sketch.
+        """
+        try:
+            if self.data_validation_config.validation_mode != "streaming":
+                return BasicUtils.read_dataframe(file_path, desc=desc, index_path=index_path)
+            sketch = DataFrameSketch(k=self.data_validation_config.sketch_k, seed=42, profile=profile)
+            for chunk in BasicUtils.iter_dataframe_chunks(
+                    file_path, desc=desc, chunk_size=self.data_validation_config.chunk_size, index_path=index_path):
+                sketch.update(chunk)
+            lg.info(f'"{desc}" dataset of {sketch.n_rows} rows sketched!')
+            return sketch
+            ...
+        except Exception as e:
+            lg.exception(e)
+            raise e
+
+    def save_bin_counts(self, profile: ReferenceProfile) -> None:
+        """Saves the bin counts of the current datasets (the ones that've been drift checked) along with the base ones and the 
+        bin edges, as a compressed `.npz` archive, so that the drift trends across the runs can be had off these alone.
+
+        Args:
+            profile (ReferenceProfile): Reference profile of the base data.
+
+        Raises:
+            e: Raises relevant exception should any sort of error pops up while saving the bin counts.
+        """
+        try:
+            file_path = self.data_validation_config.bin_counts_file_path
+            lg.info(f'Saving the bin counts at "{file_path}"..')
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            base_cols = [col for col in profile.numerical_columns if col in profile.histograms]
+            if len(base_cols) > 0:
+                # The current counts are of the base columns that weren't dropped, the rest being zeros
+                empty_counts = np.zeros(profile.n_bins, dtype="int64")
+                base_counts = np.stack([profile.histograms[col] for col in base_cols])
+                current_counts = {
+                    desc: np.stack([counts.get(col, empty_counts) for col in base_cols])
+                    for desc, counts in self.bin_counts.items()}
+            else:
+                lg.warning("there ain't any numerical histograms in the reference profile, so the bin counts are gonna be empty!")
+                base_counts = np.zeros((0, profile.n_bins), dtype="int64")
+                current_counts = {desc: base_counts for desc in self.bin_counts}
+            with open(file_path, "wb") as f:
+                np.savez_compressed(
+                    f, columns=np.array(base_cols, dtype=str), bin_edges=profile.get_bin_edges(base_cols), base=base_counts,
+                    **current_counts)
+            lg.info("bin counts saved successfully!")
+            ...
+        except Exception as e:
+            lg.exception(e)
+            raise e
+
+    def validate(self) -> None:
+        """Validates the training and test datasets taking the base data (i.e. its reference profile) as reference, and dumps the 
+        validation report along with the selected features (i.e. the training set's ones that weren't dropped) into yaml files.
+
+        Raises:
+            e: Raises relevant exception should any kind of error pops up during validating the data.
+        """
+        try:
+            # The base data's stood in for by its reference profile, sans reading it whatsoever
+            profile = self.get_reference_profile()
 
             #################################### DROPPING COLUMNS #############################################
-            base_df = self.drop_redundant_columns(
-                base_df, missing_thresh=self.data_validation_config.missing_thresh,
-                report_key="dropped_columns_from_base_data")
+            base_cols_to_drop = [
+                col for col in profile.columns
+                if profile.missing_ratios[col] > self.data_validation_config.missing_thresh]
+            if len(base_cols_to_drop) > 0:
+                lg.info(f"Columns to be dropped from the base data: {base_cols_to_drop}")
+                self.validation_report["dropped_columns_from_base_data"] = base_cols_to_drop
+            base_cols = [col for col in profile.columns if col not in base_cols_to_drop]
 
             lg.info("fetching Training dataframe..")
-            train_df = pd.read_csv(
-                self.data_ingestion_artifact.training_file_path)
+            train_df = self.get_current_data(
+                self.data_ingestion_artifact.training_file_path, index_path=self.data_ingestion_artifact.training_index_path,
+                desc="Training", profile=profile)
             lg.info("..Training dataframe loaded successfully!")
             lg.info("dropping redundant columns from the training data..")
             train_df = self.drop_redundant_columns(
                 train_df, missing_thresh=self.data_validation_config.missing_thresh,
                 report_key="dropped_columns_from_training_data")
             lg. info("fetching Test dataframe..")
-            test_df = pd.read_csv(self.data_ingestion_artifact.test_file_path)
+            test_df = self.get_current_data(
+                self.data_ingestion_artifact.test_file_path, index_path=self.data_ingestion_artifact.test_index_path, desc="Test",
+                profile=profile)
             lg.info("..Test dataframe loaded successfully!")
             lg.info("dropping redundant columns from the test data..")
             test_df = self.drop_redundant_columns(
@@ -214,22 +387,34 @@ class DataValidation:
             ################################ REQUIRED COLUMNS CHECK ###########################################
             lg.info('"Required Columns Check" for the training dataset..')
             train_columns_status = self.required_columns_check(
-                base_df, train_df, "missing_columns_in_training_data")
+                base_cols, train_df, "missing_columns_in_training_data")
             lg.info('"Required Columns Check" for the test dataset..')
             test_columns_status = self.required_columns_check(
-                base_df, test_df, "missing_columns_in_test_data")
+                base_cols, test_df, "missing_columns_in_test_data")
             # If the "Required Column Check" for the given dataset passes then only,
             # "Data Drift Check" can be performed.
             if train_columns_status:
                 lg.info(
                     "Since all required columns are there in the training set, now going for the \"Data Drift Check\"..")
                 self.data_drift_check(
-                    base_df, train_df, current_df_desc="Training", report_key="data_drift_within_training_data")
+                    profile, base_cols, train_df, current_df_desc="Training", report_key="data_drift_within_training_data")
             if test_columns_status:
                 lg.info(
                     "Since all required columns are there in the test set, now going for the \"Data Drift Check\"..")
                 self.data_drift_check(
-                    base_df, test_df, current_df_desc="Test", report_key="data_drift_within_test_data")
+                    profile, base_cols, test_df, current_df_desc="Test", report_key="data_drift_within_test_data")
+
+            ################################## BIN COUNTS ######################################################
+            self.save_bin_counts(profile)
+
+            ############################### SELECTED FEATURES ##################################################
+            # The training set's features that weren't dropped are the ones the transformer's gonna be fitted on
+            selected_features = [col for col in train_df.columns if col != self.target]
+            lg.info(f"{len(selected_features)} features selected, the later stages are to read only these!")
+            BasicUtils.write_yaml_file(
+                file_path=self.data_validation_config.selected_features_file_path,
+                data={"target": self.target, "features": selected_features},
+                desc="Selected Features")
 
             ###################### Dumping VALIDATION REPORT into a YAML file #################################
             lg.info("Dumping Validation Report inside yaml file..")
@@ -237,10 +422,46 @@ class DataValidation:
                 file_path=self.data_validation_config.report_file_path,
                 data=self.validation_report,
                 desc="Validation Report")
+            ...
+        except Exception as e:
+            lg.exception(e)
+            raise e
+
+    def initiate(self) -> DataValidationArtifact:
+        """Initiates the Data Validation stage of the training pipeline and generates a validation report accordingly.
+
+        Raises:
+            e: Raises relevant exception should any kind of error pops up during validating the data.
+
+        Returns:
+            DataValidationArtifact: Contains configuration of consequently generated `Validation Report` and `Selected Features`.
+        """
+        try:
+            lg.info(f"\n{'='*27} DATA VALIDATION {'='*40}")
+
+            ############ Reusing the cached report, should neither the datasets nor the config change ############
+            # The reference profile stands in for the base data, so it's gotta be up to date beforehand
+            self.get_reference_profile()
+            report_outputs = {
+                "report": self.data_validation_config.report_file_path,
+                "selected_features": self.data_validation_config.selected_features_file_path,
+                "bin_counts": self.data_validation_config.bin_counts_file_path}
+            stage_key = StageCache.get_key(
+                "data_validation", input_paths=[
+                    self.data_validation_config.reference_profile_path, self.data_ingestion_artifact.training_file_path,
+                    self.data_ingestion_artifact.test_file_path, self.data_ingestion_artifact.training_index_path,
+                    self.data_ingestion_artifact.test_index_path],
+                params=dict(StageCache.get_params(self.data_validation_config), precision=self.precision))
+            if StageCache.restore("data_validation", stage_key, outputs=report_outputs) is None:
+                self.validate()
+                StageCache.save("data_validation", stage_key, outputs=report_outputs)
 
             ################################ Saving Artifacts Config ##########################################
             data_validation_artifact = DataValidationArtifact(
-                report_file_path=self.data_validation_config.report_file_path
+                report_file_path=self.data_validation_config.report_file_path,
+                selected_features_file_path=self.data_validation_config.selected_features_file_path,
+                bin_counts_file_path=self.data_validation_config.bin_counts_file_path,
+                reference_profile_path=self.data_validation_config.reference_profile_path
             )
             lg.info(f"Validation Artifact: {data_validation_artifact}")
             return data_validation_artifact
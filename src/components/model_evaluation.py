@@ -31,6 +31,7 @@ class ModelEvaluation:
     model_eval_config = config.ModelEvaluationConfig()
     model_registry_config = ModelRegistryConfig()
     target = config.BaseConfig().target
+    precision = config.BaseConfig().precision
 
     def initiate(self) -> artifact.ModelEvaluationArtifact:
         """Initiates the Model Evaluation stage of the training pipline in which it's determined that whether the currently delpoyed
@@ -85,15 +86,17 @@ class ModelEvaluation:
                 lg.info("Now, loading the latest model and respective Arftifacts..")
                 latest_model = BasicUtils.load_object(
                     self.model_training_artifact.model_path, obj_desc="latest Model")
-                latest_transformer = BasicUtils.load_object(
-                    self.data_transformation_artifact.transformer_path, obj_desc="latest Transformer")
-                latest_target_encoder = BasicUtils.load_object(
-                    self.data_transformation_artifact.target_encoder_path, obj_desc="latest Target Encoder")
 
                 ################################ Load the test dataframe ######################################
                 lg.info("loading the test dataset from the `data ingestion artifact`..")
                 # fetch the test dataframe
-                test_df = pd.read_csv(self.data_ingestion_artifact.test_file_path)
+                # only the features the older Transformer's been fitted on (along with the target) are read
+                older_features = list(older_transformer.feature_names_in_)
+                test_df = BasicUtils.read_dataframe(
+                    self.data_ingestion_artifact.test_file_path, desc="Test", columns=older_features + [self.target],
+                    index_path=self.data_ingestion_artifact.test_index_path)
+                test_df = BasicUtils.configure_float_columns(
+                    test_df, exclude_columns=[self.target], desc="Test", dtype=self.precision)
                 # now fetch features and label separately
                 X_test, y_test = BasicUtils.get_features_and_labels(df=test_df, target=[self.target], desc="Test")
 
@@ -113,10 +116,12 @@ class ModelEvaluation:
                 lg.info(f"Older Model's performance: {older_model_score}")
 
                 ######################### Evaluating the latest Model's performance ###########################
-                # Transform the test features via the latest Transformer
-                X_test_arr = latest_transformer.transform(X_test)
-                # Encode the Categories to numerical dtype via the latest Target Encoder
-                y_true =latest_target_encoder.transform(y_test)
+                # The test set's already been transformed via the latest Transformer and Target Encoder, so the saved arrays 
+                # are just memory-mapped
+                X_test_arr = BasicUtils.load_numpy_array(
+                    self.data_transformation_artifact.transformed_test_features_path, desc="Test features", mmap_mode="r")
+                y_true = BasicUtils.load_numpy_array(
+                    self.data_transformation_artifact.transformed_test_labels_path, desc="Test labels", mmap_mode="r")
                 lg.info("Evaluating the performance of the `latest model`..")
                 lg.info(
                     "Making predictions on the test dataset using the `latest model`..")
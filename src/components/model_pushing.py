@@ -2,8 +2,10 @@ from src.entities.config import ModelPushingConfig
 import os
 from src.utils.file_operations import BasicUtils
 from src.logger import lg
-from src.entities.artifact import ModelPushingArtifact, ModelTrainingArtifact, DataTransformationArtifact
+from src.entities.artifact import ModelPushingArtifact, ModelTrainingArtifact, DataTransformationArtifact, DataValidationArtifact
+from src.entities.profile import ReferenceProfile
 from src.CONFIG import ModelRegistryConfig
+from typing import Optional
 from dataclasses import dataclass
 
 
@@ -17,12 +19,16 @@ class ModelPushing:
         config of artifacts that were built during the Data Transformation stage.
         model_training_artifact (ModelTrainingArtifact): Takes in a `ModelTrainingArtifact` object for accessing the config of the
         model that was built during the Model Training stage.
+        data_validation_artifact (Optional[DataValidationArtifact], optional): Takes in a `DataValidationArtifact` object for
+        accessing the reference profile the data was validated against, which is pushed along with the model, so that the 
+        inputs can be monitored for drift at the scoring time. Defaults to None.
     """
     lg.info(
         f'Entered the "{os.path.basename(__file__)[:-3]}.ModelPushing" class')
 
     data_transformation_artifact: DataTransformationArtifact
     model_training_artifact: ModelTrainingArtifact
+    data_validation_artifact: Optional[DataValidationArtifact] = None
 
     model_pushing_config = ModelPushingConfig()
     model_registry_config = ModelRegistryConfig()
@@ -50,6 +56,10 @@ class ModelPushing:
             # Load the latest model from the ModelTraining's artifacts
             model = BasicUtils.load_object(
                 file_path=self.model_training_artifact.model_path, obj_desc="trained Model")
+            # Load the reference profile the data was validated against, if any
+            profile = None
+            if self.data_validation_artifact is not None and self.data_validation_artifact.reference_profile_path is not None:
+                profile = ReferenceProfile.load(self.data_validation_artifact.reference_profile_path)
 
             ############################# Save them as `Model Pushing` Artifacts ###############################
             lg.info(
@@ -69,6 +79,9 @@ class ModelPushing:
                 file_path=self.model_pushing_config.to_be_pushed_model_path,
                 obj=model,
                 obj_desc="trained Model")
+            # Save the Reference Profile
+            if profile is not None:
+                profile.save(self.model_pushing_config.to_be_pushed_profile_path)
             lg.info('`Model Pushing` stage\'s artifacts saved succesfully!')
 
             ############################# Save them to `Model Registry` dir ####################################
@@ -86,6 +99,9 @@ class ModelPushing:
             latest_model_dir = self.model_registry_config.save_latest_model_at()
             BasicUtils.save_object(
                 file_path=latest_model_dir, obj=model, obj_desc="trained Model")
+            # Save the Reference Profile, next to the Model
+            if profile is not None:
+                profile.save(self.model_registry_config.save_latest_profile_at())
 
             ################################# Save Artifacts Config ###########################################
             model_pushing_artifact = ModelPushingArtifact(
@@ -4,10 +4,11 @@ import numpy as np
 from src.entities.config import ModelTrainingConfig
 from src.entities.artifact import ModelTrainingArtifact, DataTransformationArtifact
 from src.utils.file_operations import BasicUtils
+from src.utils.stage_cache import StageCache
 from xgboost import XGBClassifier
 from sklearn.model_selection import GridSearchCV
 from sklearn.metrics import f1_score
-from typing import Dict
+from typing import Dict, Optional
 from dataclasses import dataclass
 
 
@@ -66,12 +67,15 @@ class ModelTraining:
             lg.exception(e)
             raise e
 
-    def train_model(self, X: np.array, y: np.array) -> XGBClassifier:
+    def train_model(self, X: np.array, y: np.array, scale_pos_weight: Optional[float] = None) -> XGBClassifier:
         """Trains the XGBClassifier on the provided features and target.
 
         Args:
-            X (np.array): Features on which the XGBClassifer has to be trained.
+            X (np.array): Features on which the XGBClassifer has to be trained (a dense array or a CSR matrix, missing values 
+            being handled natively either way).
             y (np.array): Target for the given features.
+            scale_pos_weight (Optional[float], optional): Weight of the positive class, to make up for the imbalance should the
+            training instances not be resampled. Defaults to None.
 
         Raises:
             e: Raises relevant exception should any sort of error pops up while training the said model.
@@ -97,6 +101,9 @@ class ModelTraining:
                 'random_state': 42
             }
             lg.info(f"best_params we got via GridSearchCV: {best_params}")
+            if scale_pos_weight is not None:
+                lg.info(f"weighing the positive class by {scale_pos_weight:.2f}, as the training instances ain't resampled..")
+                best_params["scale_pos_weight"] = scale_pos_weight
             lg.info("building the best XGBClassifier using the fetched best params..")
             best_mod = XGBClassifier(**best_params)
             lg.info(
@@ -110,39 +117,44 @@ class ModelTraining:
             lg.exception(e)
             raise e
 
-    def initiate(self) -> ModelTrainingArtifact:
-        """Triggers the Model Building stage of the training pipeline and returns the configurations of the model built and its 
-        performance measures, as in contained by the `ModelTrainingArtifact`.
+    def train(self) -> Dict:
+        """Trains the model on the transformed training arrays, evaluates it on both the training and test arrays and saves it.
 
         Raises:
-            e: Raises relevant exception should any sort of error pops in the Model Building stage.
+            e: Raises relevant exception should any sort of error pops up while training the model.
 
         Returns:
-            ModelTrainingArtifact: Contains the built model's config and its performance measures.
+            Dict: F1 scores of the trained model on the training and test sets.
         """
         try:
-            lg.info(f"\n{'='*27} MODEL TRAINING {'='*40}")
-
-            ############################# Fetch the Training and Test arrays ##################################
-            lg.info("fetching the transformed training and test arrays..")
-            training_arr = BasicUtils.load_numpy_array(
-                file_path=self.data_transformation_artifact.transformed_training_file_path,
-                desc="Training")
-            test_arr = BasicUtils.load_numpy_array(
-                file_path=self.data_transformation_artifact.transformed_test_file_path,
-                desc="Test")
-            lg.info("transformed training and test arrays fetched successfully..")
-
-            ############################## Separate Features and Label out ####################################
-            lg.info(
-                "separating the independent features and dependent target out from training and test arrays..")
-            X_train, y_train = training_arr[:, :-1], training_arr[:, -1]
+            ################### Memory-map the Training and Test features and labels ##########################
+            # They're paged in as and when read, and there's no copy of them in the RAM up front. Fitting does read the training
+            # features whole though: XGBoost ("hist") sketches and quantizes them into its own QuantileDMatrix (~0.75x of the
+            # float64 array's size, measured on 400k x 170), and GridSearchCV copies every fold's rows out of them. Only predicting
+            # (XGBoost's in-place prediction) works off the memory-mapped arrays as they are.
+            lg.info("memory-mapping the transformed training and test arrays..")
+            X_train = BasicUtils.load_numpy_array(
+                file_path=self.data_transformation_artifact.transformed_training_features_path,
+                desc="Training features", mmap_mode="r")
+            y_train = BasicUtils.load_numpy_array(
+                file_path=self.data_transformation_artifact.transformed_training_labels_path,
+                desc="Training labels", mmap_mode="r")
             lg.info("training features and target label fetched!")
-            X_test, y_test = test_arr[:, :-1], test_arr[:, -1]
+            X_test = BasicUtils.load_numpy_array(
+                file_path=self.data_transformation_artifact.transformed_test_features_path,
+                desc="Test features", mmap_mode="r")
+            y_test = BasicUtils.load_numpy_array(
+                file_path=self.data_transformation_artifact.transformed_test_labels_path,
+                desc="Test labels", mmap_mode="r")
             lg.info("test features and target label fetched!")
 
             ######################################## Train the Model ##########################################
-            mod = self.train_model(X_train, y_train)
+            # Should the training instances not be resampled, the positives are weighed by the imbalance ratio instead
+            scale_pos_weight = None
+            if not self.data_transformation_artifact.resampled:
+                n_pos = int(np.count_nonzero(y_train))
+                scale_pos_weight = (len(y_train) - n_pos) / max(n_pos, 1)
+            mod = self.train_model(X_train, y_train, scale_pos_weight=scale_pos_weight)
 
             ################################# Compute Performance Metric ######################################
             lg.info(
@@ -185,11 +197,44 @@ class ModelTraining:
                 file_path=self.model_training_config.model_path, obj=mod,
                 obj_desc="Trained Model (XGBClassifier)")
 
+            return {"f1_training_score": float(f1_training_score), "f1_test_score": float(f1_test_score)}
+            ...
+        except Exception as e:
+            lg.exception(e)
+            raise e
+
+    def initiate(self) -> ModelTrainingArtifact:
+        """Triggers the Model Building stage of the training pipeline and returns the configurations of the model built and its 
+        performance measures, as in contained by the `ModelTrainingArtifact`.
+
+        Raises:
+            e: Raises relevant exception should any sort of error pops in the Model Building stage.
+
+        Returns:
+            ModelTrainingArtifact: Contains the built model's config and its performance measures.
+        """
+        try:
+            lg.info(f"\n{'='*27} MODEL TRAINING {'='*40}")
+
+            ########### Reusing the cached model, should neither the arrays nor the config change ##############
+            training_outputs = {"model": self.model_training_config.model_path}
+            stage_key = StageCache.get_key(
+                "model_training", input_paths=[
+                    self.data_transformation_artifact.transformed_training_features_path,
+                    self.data_transformation_artifact.transformed_training_labels_path,
+                    self.data_transformation_artifact.transformed_test_features_path,
+                    self.data_transformation_artifact.transformed_test_labels_path],
+                params=StageCache.get_params(self.model_training_config))
+            scores = StageCache.restore("model_training", stage_key, outputs=training_outputs)
+            if scores is None:
+                scores = self.train()
+                StageCache.save("model_training", stage_key, outputs=training_outputs, extras=scores)
+
             #################################### Save Artifacts Config ########################################
             model_training_artifact = ModelTrainingArtifact(
                 model_path=self.model_training_config.model_path,
-                f1_training_score=f1_training_score,
-                f1_test_score=f1_test_score
+                f1_training_score=scores["f1_training_score"],
+                f1_test_score=scores["f1_test_score"]
             )
             lg.info(f"Model Training Artifact: {model_training_artifact}")
             lg.info(f"Model Training completed!")
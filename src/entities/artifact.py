@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import Optional
 
 
 @dataclass
@@ -6,19 +7,29 @@ class DataIngestionArtifact:
     feature_store_file: str
     training_file_path: str
     test_file_path: str
+    # Row indices within the said files (the feature store, should the split be saved as indices), None if they're whole
+    training_index_path: Optional[str] = None
+    test_index_path: Optional[str] = None
 
 
 @dataclass
 class DataValidationArtifact:
     report_file_path: str
+    selected_features_file_path: str
+    bin_counts_file_path: Optional[str] = None
+    reference_profile_path: Optional[str] = None
 
 
 @dataclass
 class DataTransformationArtifact:
     transformer_path: str
     target_encoder_path: str
-    transformed_training_file_path: str
-    transformed_test_file_path: str
+    transformed_training_features_path: str
+    transformed_training_labels_path: str
+    transformed_test_features_path: str
+    transformed_test_labels_path: str
+    # Whether the training instances have been resampled, the imbalance being left to the model otherwise
+    resampled: bool = True
 
 
 @dataclass
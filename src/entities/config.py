@@ -1,22 +1,27 @@
 import os
 from src.logger import lg
 from datetime import datetime
-from dataclasses import dataclass
+from typing import Dict, Optional
+from dataclasses import dataclass, field
 
 
 RAW_DATA_FILE = "aps_failure_training_set1.csv"
-FEATURE_STORE_FILE = "sensors.csv"
-TRAINING_FILE = "training_set.csv"
-TEST_FILE = "test_set.csv"
+FEATURE_STORE_FILE = "sensors.parquet"
+TRAINING_FILE = "training_set.parquet"
+TEST_FILE = "test_set.parquet"
 TRANSFORMER = "transformer.pkl"
 TARGET_ENCODER = "target_encoder.pkl"
 MODEL_FILE = "model.pkl"
+REFERENCE_PROFILE = "reference_profile.npz"
 
 
 @dataclass
 class BaseConfig:
     project: str = "APS-fault-detection"
     target: str = "class"
+    # Precision of the sensors i.e. "float32" or "float64", all the way from parsing through the saved arrays to the model's 
+    # input (XGBoost works in float32 anyways)
+    precision: str = "float64"
 
 
 @dataclass
@@ -24,6 +29,100 @@ class DataSourceConfig:
     database_name: str = "sensors-streaming-data"
     collection_name: str = "APS_sensors"
     raw_data_path: str = os.path.join(os.getcwd(), RAW_DATA_FILE)
+    # Number of documents to be fetched from MongoDB per round-trip (and per chunk)
+    batch_size: int = 10000
+    # Number of `_id` range partitions of the collection to be read in parallel (1 means a single cursor)
+    read_partitions: int = 1
+    # Whether "na" normalization and float casting of the sensors are to be pushed to MongoDB via an aggregation pipeline
+    server_side_cast: bool = True
+    # Storage layout of the sensors data, either "row" (a document per row) or "bucket" (a document per `bucket_size` rows, 
+    # with each sensor packed as a `bucket_dtype` binary array, the missing values being NaN)
+    storage_layout: str = "row"
+    bucket_collection_name: str = "APS_sensors_buckets"
+    bucket_size: int = 1000
+    bucket_dtype: str = "<f8"
+    # Number of CSV rows per chunk (and per `insert_many` batch) while dumping the data into MongoDB
+    load_chunk_size: int = 10000
+    # Number of concurrent `insert_many` writers while dumping the data into MongoDB
+    load_writers: int = 4
+    # Keeps track of the rows committed per CSV file, so that a failed dump can resume from there
+    load_checkpoint_path: str = os.path.join(
+        os.getcwd(), ".data_dump_checkpoint.yaml")
+
+    def get_collection_name(self) -> str:
+        """Returns the name of the collection as per the configured storage layout."""
+        return self.bucket_collection_name if self.storage_layout == "bucket" else self.collection_name
+
+
+@dataclass
+class SchemaConfig:
+    # The sensor schema (columns and their dtypes) gets derived from the header of the base data
+    base_file_path: str = os.path.join(os.getcwd(), RAW_DATA_FILE)
+    # Engine of `pd.read_csv`, "pyarrow" being the multithreaded one (None for the pandas' default)
+    csv_engine: Optional[str] = "pyarrow"
+
+
+@dataclass
+class MongoClientConfig:
+    # Connection pool sizing, enough to serve the parallel partitions' readers and the bulk loader's writers
+    max_pool_size: int = 32
+    min_pool_size: int = 0
+    max_idle_time_ms: int = 5*60*1000
+    # Max time a thread may wait for a connection from the pool
+    wait_queue_timeout_ms: int = 60*1000
+    connect_timeout_ms: int = 20*1000
+    server_selection_timeout_ms: int = 30*1000
+    socket_timeout_ms: Optional[int] = None
+
+
+@dataclass
+class SnapshotCacheConfig:
+    use_snapshot_cache: bool = True
+    # Local columnar snapshots of the collections, keyed by their names
+    snapshot_dir: str = os.path.join(os.getcwd(), ".snapshots")
+    # Whether the snapshot's to be validated by the collection's hash (via `dbHash`) too, apart from its count and max `_id`
+    validate_with_hash: bool = False
+
+
+@dataclass
+class StageCacheConfig:
+    use_stage_cache: bool = True
+    # Content-addressed cache entries of the stages' outputs, keyed by the digests of their inputs and config
+    cache_dir: str = os.path.join(os.getcwd(), ".stage_cache")
+    # Eviction policy i.e. entries unused for longer than `max_age_days` go, and then the least recently used ones till the
+    # cache's total size is within `max_size_mb`
+    max_size_mb: int = 4096
+    max_age_days: int = 30
+
+
+@dataclass
+class SerializationConfig:
+    # Serialization backend i.e. "joblib", "dill" or "xgboost" (native UBJSON) per object type (by its class name or any of its
+    # base classes'), the rest going by `default_backend`
+    backends: Dict[str, str] = field(default_factory=lambda: {"XGBModel": "xgboost"})
+    default_backend: str = "joblib"
+    # Compression codec of the serialized objects i.e. "zstd", "lz4" or None (only uncompressed joblib objects get their numpy 
+    # buffers memory-mapped on load). The fitted artifacts are small enough for the codec to cost well under a ms either way, 
+    # "zstd" shrinking the model's file ~8x (see `benchmarks.serialization`)
+    compression: Optional[str] = None
+
+
+@dataclass
+class DriftConfig:
+    # Significance level of the KS test i.e. a column's deemed drifted should its p-value be no more than this
+    pvalue_thresh: float = .05
+    # Columns are tested in blocks, fanned out over a pool of processes (in the very process should there be just one block or
+    # one worker)
+    n_workers: int = min(4, os.cpu_count() or 1)
+    block_size: int = 32
+    # Exact p-values are computed only when both the samples have at most these many values, asymptotic ones otherwise
+    exact_max_n: int = 1000
+    # Proportion the empty bins are floored to, for the PSI (which is a log ratio) to stay finite
+    psi_eps: float = 1e-4
+    # A column's deemed drifted (at the scoring time) should its PSI exceed this (.2 being the customary "significant shift") or
+    # should its missing ratio shift off the base one by more than this
+    psi_thresh: float = .2
+    missing_ratio_shift_thresh: float = .1
 
 
 @dataclass
@@ -43,14 +142,43 @@ class DataIngestionConfig:
             self.data_ingestion_dir = os.path.join(
                 training_pipeline_config.artifact_dir, "data_ingestion")
 
+            # Feature store persists across runs and only the newer documents get appended to it (as the newer parts of its 
+            # parquet dataset)
+            self.feature_store_dir = os.path.join(os.getcwd(), "feature_store")
             self.feature_store_file_path = os.path.join(
-                self.data_ingestion_dir, FEATURE_STORE_FILE)
+                self.feature_store_dir, FEATURE_STORE_FILE)
+            # Watermark i.e. the `_id` of the latest document that has been ingested into the feature store
+            self.watermark_file_path = os.path.join(
+                self.feature_store_dir, "watermark.yaml")
+            # Concurrent writers can commit a document with a smaller `_id` after a greater one's been read, at most as many as 
+            # they can have in flight at once (`load_writers` batches of `load_chunk_size` rows, for `data_dump.py`). Hence the 
+            # `_id`s of the latest `watermark_lookback_docs` documents ingested are kept in `recent_ids_file_path`, and the next 
+            # run fetches the ones in between them that ain't among them, besides the ones newer than the watermark. Documents 
+            # committed even later than that still get missed.
+            data_source_config = DataSourceConfig()
+            docs_per_chunk = data_source_config.load_chunk_size
+            if data_source_config.storage_layout == "bucket":
+                docs_per_chunk = -(-data_source_config.load_chunk_size // data_source_config.bucket_size)
+            self.watermark_lookback_docs = data_source_config.load_writers * docs_per_chunk
+            self.recent_ids_file_path = os.path.join(
+                self.feature_store_dir, "recent_ids.npy")
             self.training_file_path = os.path.join(
                 self.data_ingestion_dir, TRAINING_FILE)
             self.test_file_path = os.path.join(
                 self.data_ingestion_dir, TEST_FILE)
             self.test_size = 0.2
             self.random_state = 42
+            # Compression codec of the feature store and the training and test sets
+            self.compression = "zstd"
+            # Whether the feature store and the training and test sets are to be exported as CSV files too (next to them)
+            self.export_csv = False
+            # How the feature store is to be split i.e. "index" (only the row indices of the training and test sets get saved, 
+            # their rows being selected off the feature store as and when read) or "files" (both sets get written as a whole)
+            self.split_mode = "index"
+            # Row indices of the training and test sets (stratified on the target) within the feature store
+            split_dir = os.path.join(self.data_ingestion_dir, "split")
+            self.training_index_path = os.path.join(split_dir, "training_index.npy")
+            self.test_index_path = os.path.join(split_dir, "test_index.npy")
         except Exception as e:
             lg.exception(e)
             raise e
@@ -64,9 +192,36 @@ class DataValidationConfig:
                 training_pipeline_config.artifact_dir, "data_validation")
 
             self.base_file_path = os.path.join(os.getcwd(), RAW_DATA_FILE)
+            # Compact profile of the base data (missing ratios, sorted samples of at most `profile_max_samples` values per sensor
+            # and category sets), built once and rebuilt only should the base file change, the validation being done against it
+            self.reference_profile_path = os.path.join(os.getcwd(), "reference_profile", "base_profile.npz")
+            self.profile_max_samples = 10000
+            # Number of bins (over the base data's quantiles, stored in the reference profile) of the histograms the PSI and the
+            # JS divergence are computed off
+            self.n_bins = 10
             self.missing_thresh = .3
+            # How the training and test sets are to be validated i.e. "exact" (read whole) or "streaming" (read in chunks of
+            # `chunk_size` rows, each column being summarized as a KLL sketch of capacity `sketch_k`, so that the memory stays 
+            # constant in the number of rows, the KS statistics being approximate, within their reported error bounds, and the 
+            # verdicts being inconclusive where the bounds straddle the critical statistics; the larger the chunks (or `sketch_k`),
+            # the tighter the bounds) or 
+            # "sampled" (KS tested on a stratified sample of at most `sample_size` rows, the columns whose sampled p-values fall
+            # inside `uncertainty_band` being re-tested on the whole data)
+            self.validation_mode = "exact"
+            self.chunk_size = 100000
+            self.sketch_k = 200
+            self.sample_size = 20000
+            self.uncertainty_band = (.001, .2)
             self.report_file_path = os.path.join(
                 self.data_validation_dir, "report.yaml")
+            # Bin counts of the training and test sets (along with the base ones and the bin edges), kept per run so that the drift
+            # trends across the runs can be had sans re-reading the old data
+            self.bin_counts_file_path = os.path.join(
+                self.data_validation_dir, "bin_counts.npz")
+            # Features that made it through the validation (i.e. sans the ones missing more than `missing_thresh`), the only 
+            # ones the later stages are to read and fit on
+            self.selected_features_file_path = os.path.join(
+                self.data_validation_dir, "selected_features.yaml")
         except Exception as e:
             lg.exception(e)
             raise e
@@ -85,12 +240,24 @@ class DataTransformationConfig:
             # Target Encoder path
             self.target_encoder_path = os.path.join(
                 self.data_transformation_dir, "encoder", TARGET_ENCODER)
-            # Transformed Training set path
-            self.transformed_training_file_path = os.path.join(
-                self.data_transformation_dir, TRAINING_FILE.replace(".csv", ".npz"))
-            # Transformed Test set path
-            self.transformed_test_file_path = os.path.join(
-                self.data_transformation_dir, TEST_FILE.replace(".csv", ".npz"))
+            # Transformed Training set's features and labels paths (stored separately, so as to be memory-mapped as they are)
+            training_dir = os.path.join(
+                self.data_transformation_dir, os.path.splitext(TRAINING_FILE)[0])
+            self.transformed_training_features_path = os.path.join(training_dir, "X.npy")
+            self.transformed_training_labels_path = os.path.join(training_dir, "y.npy")
+            # Transformed Test set's features and labels paths
+            test_dir = os.path.join(
+                self.data_transformation_dir, os.path.splitext(TEST_FILE)[0])
+            self.transformed_test_features_path = os.path.join(test_dir, "X.npy")
+            self.transformed_test_labels_path = os.path.join(test_dir, "y.npy")
+            # How the missing values are to be handled i.e. "impute" (imputed with 0 and the training instances resampled via 
+            # SMOTETomek) or "native" (kept as NaN for XGBoost to handle natively, the imbalance being made up for via 
+            # `scale_pos_weight` instead of resampling)
+            self.missing_value_mode = "impute"
+            # In the "native" mode, the features are stored as a CSR matrix (the missing values being its implicit entries) 
+            # should the fraction of the non-missing values be below this, which, with the sensors missing more than the 
+            # validation's `missing_thresh` (.3) being dropped, they never are as of now
+            self.sparse_density_thresh = .5
         except Exception as e:
             lg.exception(e)
             raise e
@@ -136,6 +303,8 @@ class ModelPushingConfig:
                 self.model_pushing_dir, TRANSFORMER)
             self.to_be_pushed_target_encoder_path = os.path.join(
                 self.model_pushing_dir, TARGET_ENCODER)
+            self.to_be_pushed_profile_path = os.path.join(
+                self.model_pushing_dir, REFERENCE_PROFILE)
         except Exception as e:
             lg.exception(e)
             raise e
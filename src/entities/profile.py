@@ -0,0 +1,192 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+from src.logger import lg
+from typing import Dict, List, Optional
+from dataclasses import dataclass, field
+
+
+@dataclass
+class ReferenceProfile:
+    """Shall be used as the compact stand-in for the base data i.e. all that the validation compares the current data against,
+    so that the base data needn't be read (let alone parsed and casted) on every run.
+
+    Each numerical column is kept as its sorted sample of at most `max_samples` evenly spaced order statistics (a quantile
+    sketch, whose ECDF is within 1/`max_samples` of the whole column's), along with the count of its non-missing values. The
+    categorical columns are kept as their sets of categories.
+
+    Each numerical column also gets its bin edges (the column's deciles, by default), shared by all the data that's to be 
+    compared against the base data, along with its histogram over them, so that the histogram-based drift metrics (PSI, 
+    Jensen-Shannon) only ever need the current data's bin counts.
+
+    Args:
+        columns (List[str]): Names of all the columns of the base data.
+        n_rows (int): Number of rows of the base data.
+        missing_ratios (Dict[str, float]): Fraction of the missing values of each column.
+        samples (Dict[str, np.ndarray]): Sorted sample (sans NaNs) of each numerical column.
+        counts (Dict[str, int]): Number of the non-missing values of each numerical column.
+        categories (Dict[str, List[str]]): Sorted categories of each categorical column.
+        n_bins (int, optional): Number of bins of the histograms. Defaults to 10.
+        bin_edges (Dict[str, np.ndarray], optional): Inner bin edges (as in, sans the infinite ones) of each numerical column, 
+        at most `n_bins` - 1 of them. Defaults to {}.
+        histograms (Dict[str, np.ndarray]): Counts of the non-missing values of each numerical column per bin, `n_bins` long. 
+        Defaults to {}.
+        source (Dict, optional): Size and mtime of the base file the profile's been built from. Defaults to {}.
+    """
+    columns: List[str]
+    n_rows: int
+    missing_ratios: Dict[str, float]
+    samples: Dict[str, np.ndarray]
+    counts: Dict[str, int]
+    categories: Dict[str, List[str]]
+    n_bins: int = 10
+    bin_edges: Dict[str, np.ndarray] = field(default_factory=dict)
+    histograms: Dict[str, np.ndarray] = field(default_factory=dict)
+    source: Dict = field(default_factory=dict)
+
+    @property
+    def numerical_columns(self) -> List[str]:
+        """Names of the numerical columns."""
+        return [col for col in self.columns if col in self.samples]
+
+    def get_bin_edges(self, columns: List[str]) -> np.ndarray:
+        """Returns the inner bin edges of the said numerical columns as a matrix of shape (len(columns), `n_bins` - 1), the 
+        columns having fewer edges (as in, fewer distinct quantiles) being padded with infinities i.e. with bins no value can 
+        fall in."""
+        bin_edges = np.full((len(columns), self.n_bins - 1), np.inf)
+        for i, col in enumerate(columns):
+            bin_edges[i, :len(self.bin_edges[col])] = self.bin_edges[col]
+        return bin_edges
+
+    def get_bin_counts(self, df: pd.DataFrame, columns: Optional[List[str]] = None) -> np.ndarray:
+        """Bins all the said numerical columns of the dataframe over the profile's bin edges at once, as in each edge's 
+        compared against the whole (rows by columns) matrix in one go, the missing values being left out.
+
+        Args:
+            df (pd.DataFrame): Dataframe whose columns are to be binned.
+            columns (Optional[List[str]], optional): Numerical columns to be binned, all the profile's ones if None. Defaults to None.
+
+        Returns:
+            np.ndarray: Counts of each column's values per bin, of shape (len(columns), `n_bins`).
+        """
+        columns = self.numerical_columns if columns is None else columns
+        X = df[columns].to_numpy(dtype="float64", na_value=np.nan)
+        bin_edges = self.get_bin_edges(columns)
+        # Bin (i.e. the number of edges below) of each value, offset by its column's, so that a single `bincount` does it all
+        bins = np.repeat(np.arange(len(columns), dtype="int64")[None, :] * self.n_bins, X.shape[0], axis=0)
+        for j in range(self.n_bins - 1):
+            bins += X > bin_edges[:, j]
+        return np.bincount(bins[~np.isnan(X)], minlength=len(columns) * self.n_bins).reshape(len(columns), self.n_bins)
+
+    @classmethod
+    def get_source_stat(cls, file_path: str) -> Dict:
+        """Returns the size and the mtime of the said file, which the profile's deemed stale upon a change of."""
+        stat = os.stat(file_path)
+        return {"path": os.path.abspath(file_path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, max_samples: int = 10000, n_bins: int = 10,
+                       source: Optional[Dict] = None) -> "ReferenceProfile":
+        """Builds the profile of the said dataframe.
+
+        Args:
+            df (pd.DataFrame): Base dataframe, with its columns already typed.
+            max_samples (int, optional): Maximum size of each numerical column's sorted sample. Defaults to 10000.
+            n_bins (int, optional): Number of bins of each numerical column's histogram. Defaults to 10.
+            source (Optional[Dict], optional): Stat of the base file (via `get_source_stat`). Defaults to None.
+
+        Raises:
+            e: Throws relevant exception if any error pops up while profiling the dataframe.
+
+        Returns:
+            ReferenceProfile: Profile of the dataframe.
+        """
+        try:
+            lg.info(f"profiling the base dataframe of shape {df.shape}..")
+            samples, counts, categories, bin_edges = {}, {}, {}, {}
+            for col in df.columns:
+                if not pd.api.types.is_numeric_dtype(df[col]):
+                    categories[col] = sorted(map(str, df[col].dropna().unique()))
+                    continue
+                values = np.sort(df[col].to_numpy(dtype="float64", na_value=np.nan))
+                # NaNs are sorted last
+                values = values[:len(values) - np.count_nonzero(np.isnan(values))]
+                counts[col] = len(values)
+                # Quantiles of the whole column (the ties collapsing into a single edge)
+                bin_edges[col] = np.unique(np.quantile(values, np.linspace(0, 1, n_bins + 1)[1:-1])) if len(
+                    values) else np.empty(0)
+                if len(values) > max_samples:
+                    values = values[np.linspace(0, len(values) - 1, max_samples).round().astype("int64")]
+                samples[col] = values
+            missing_ratios = df.isna().mean().astype(float).to_dict() if df.shape[0] else dict.fromkeys(df.columns, 1.)
+            profile = cls(
+                columns=list(df.columns), n_rows=df.shape[0], missing_ratios=missing_ratios, samples=samples, counts=counts,
+                categories=categories, n_bins=n_bins, bin_edges=bin_edges, source=source or {})
+            profile.histograms = dict(zip(profile.numerical_columns, profile.get_bin_counts(df)))
+            lg.info(f"profiled {len(samples)} numerical and {len(categories)} categorical columns!")
+            return profile
+            ...
+        except Exception as e:
+            lg.exception(e)
+            raise e
+
+    def save(self, file_path: str) -> None:
+        """Saves the profile as a compressed `.npz` archive, the sorted samples being its arrays and the rest being its JSON
+        metadata.
+
+        Args:
+            file_path (str): Location where the profile is to be saved.
+
+        Raises:
+            e: Throws relevant exception if any error pops up while saving the profile.
+        """
+        try:
+            lg.info(f'Saving the reference profile at "{file_path}"..')
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            meta = {
+                "columns": self.columns, "n_rows": self.n_rows, "missing_ratios": self.missing_ratios, "counts": self.counts,
+                "categories": self.categories, "n_bins": self.n_bins, "source": self.source}
+            arrays = {f"sample_{i}": self.samples[col] for i, col in enumerate(self.numerical_columns)}
+            arrays.update({f"bin_edges_{i}": self.bin_edges[col] for i, col in enumerate(self.numerical_columns)})
+            arrays.update({f"histogram_{i}": self.histograms[col] for i, col in enumerate(self.numerical_columns)})
+            with open(file_path, "wb") as f:
+                np.savez_compressed(f, meta=np.frombuffer(json.dumps(meta).encode(), dtype="uint8"), **arrays)
+            lg.info("reference profile saved successfully!")
+            ...
+        except Exception as e:
+            lg.exception(e)
+            raise e
+
+    @classmethod
+    def load(cls, file_path: str) -> "ReferenceProfile":
+        """Loads the profile saved at the said location.
+
+        Args:
+            file_path (str): Location of the profile.
+
+        Raises:
+            e: Throws relevant exception if any error pops up while loading the profile.
+
+        Returns:
+            ReferenceProfile: Loaded profile.
+        """
+        try:
+            lg.info(f'loading the reference profile from "{file_path}"..')
+            with np.load(file_path) as archive:
+                meta = json.loads(archive["meta"].tobytes())
+                numerical_columns = [col for col in meta["columns"] if col in meta["counts"]]
+                samples = {col: archive[f"sample_{i}"] for i, col in enumerate(numerical_columns)}
+                # Profiles saved before the histograms came along have none
+                bin_edges = {
+                    col: archive[f"bin_edges_{i}"] for i, col in enumerate(numerical_columns) if f"bin_edges_{i}" in archive}
+                histograms = {
+                    col: archive[f"histogram_{i}"] for i, col in enumerate(numerical_columns) if f"histogram_{i}" in archive}
+            return cls(
+                columns=meta["columns"], n_rows=meta["n_rows"], missing_ratios=meta["missing_ratios"], samples=samples,
+                counts=meta["counts"], categories=meta["categories"], n_bins=meta.get("n_bins", 0), bin_edges=bin_edges,
+                histograms=histograms, source=meta["source"])
+            ...
+        except Exception as e:
+            lg.exception(e)
+            raise e
@@ -0,0 +1,99 @@
+import pandas as pd
+from src.logger import lg
+from typing import Dict, Iterator, List, Optional
+from dataclasses import dataclass, field
+
+
+@dataclass
+class SensorSchema:
+    """Shall be used for parsing the sensors data in a single typed pass, with the "na" values turned into NaN right at the read
+    time, and thus no object-dtype intermediate or post-hoc `replace` and `astype` whatsoever.
+
+    Args:
+        columns (List[str]): Names of all the columns, sensors and the target.
+        target (str): Target column name, the only non-float column.
+        float_dtype (str, optional): Dtype of the sensor columns. Defaults to "float64".
+        csv_engine (Optional[str], optional): Engine of `pd.read_csv`, "pyarrow" being the multithreaded one. Defaults to None
+        i.e. the pandas' default.
+        text_columns (List[str], optional): Columns that are only carried along and thus kept as plain strings, instead of being
+        parsed as sensors. Defaults to an empty list.
+    """
+    columns: List[str]
+    target: str
+    float_dtype: str = "float64"
+    csv_engine: Optional[str] = None
+    text_columns: List[str] = field(default_factory=list)
+
+    @property
+    def feature_columns(self) -> List[str]:
+        """Names of the sensor columns."""
+        return [col for col in self.columns if col != self.target and col not in self.text_columns]
+
+    def get_dtypes(self) -> Dict[str, object]:
+        """Returns the dtype of each column, the target being kept as object, the text columns as strings and the sensors as
+        `float_dtype`."""
+        return {col: object if col == self.target else str if col in self.text_columns else self.float_dtype
+                for col in self.columns}
+
+    @classmethod
+    def from_header(cls, file_path: str, target: str, float_dtype: str = "float64", csv_engine: Optional[str] = None) -> "SensorSchema":
+        """Derives the schema from the header of the said CSV file, every column but the target being a sensor.
+
+        Args:
+            file_path (str): CSV file whose header's to be read.
+            target (str): Target column name.
+            float_dtype (str, optional): Dtype of the sensor columns. Defaults to "float64".
+            csv_engine (Optional[str], optional): Engine of `pd.read_csv`. Defaults to None.
+
+        Raises:
+            e: Throws relevant exception if any error pops up while reading the header.
+
+        Returns:
+            SensorSchema: Schema of the sensors data.
+        """
+        try:
+            lg.info(f'deriving the sensor schema from the header of "{file_path}"..')
+            columns = list(pd.read_csv(file_path, nrows=0).columns)
+            lg.info(f"sensor schema derived with {len(columns)} columns, sensors being {float_dtype}!")
+            return cls(columns=columns, target=target, float_dtype=float_dtype, csv_engine=csv_engine)
+            ...
+        except Exception as e:
+            lg.exception(e)
+            raise e
+
+    def read_csv(self, file_path: str, columns: Optional[List] = None) -> pd.DataFrame:
+        """Parses the said CSV file as per the schema, "na" values being read as NaN.
+
+        Args:
+            file_path (str): CSV file to be read.
+            columns (Optional[List], optional): Columns that are to be read, all of them if None. Defaults to None.
+
+        Raises:
+            e: Throws relevant exception if any error pops up while parsing the CSV file.
+
+        Returns:
+            pd.DataFrame: Typed dataframe.
+        """
+        try:
+            return pd.read_csv(
+                file_path, dtype=self.get_dtypes(), na_values=["na"], usecols=columns, engine=self.csv_engine)
+            ...
+        except Exception as e:
+            lg.exception(e)
+            raise e
+
+    def iter_csv(self, file_path: str, chunksize: int, columns: Optional[List] = None) -> Iterator[pd.DataFrame]:
+        """Parses the said CSV file as per the schema in chunks of `chunksize` rows (via the pandas' C engine, as the pyarrow one
+        can't chunk), "na" values being read as NaN.
+
+        Args:
+            file_path (str): CSV file to be read.
+            chunksize (int): Number of rows per chunk.
+            columns (Optional[List], optional): Columns that are to be read, all of them if None. Defaults to None.
+
+        Yields:
+            Iterator[pd.DataFrame]: Typed chunks of the dataframe.
+        """
+        with pd.read_csv(
+                file_path, dtype=self.get_dtypes(), na_values=["na"], usecols=columns, chunksize=chunksize) as reader:
+            yield from reader
@@ -1,14 +1,22 @@
 import os
-import pandas as pd
 import numpy as np
+import pandas as pd
 import argparse
 from src.logger import lg
 from src.CONFIG import ModelRegistryConfig
+from src.entities.config import SchemaConfig, BaseConfig, DriftConfig
+from src.entities.schema import SensorSchema
+from src.entities.profile import ReferenceProfile
 from src.utils.file_operations import BasicUtils
+from src.utils.drift import DriftEngine
+from src.utils.sketch import HistogramSketch
+from typing import Dict
 from datetime import datetime
 from dataclasses import dataclass
 
 PREDICTION_DIR = "predictions"
+# Input file's read, transformed and scored in chunks of these many rows
+CHUNK_SIZE = 100000
 
 
 @dataclass
@@ -24,6 +32,10 @@ class BatchPredictionPipeline:
 
     input_file_path: str
     model_registry_config = ModelRegistryConfig()
+    schema_config = SchemaConfig()
+    drift_config = DriftConfig()
+    target = BaseConfig().target
+    precision = BaseConfig().precision
 
     def get_predicition_file_path(self) -> str:
         """Returns the file path where the Predictions file is to be stored. And generates a new one in regard 
@@ -50,6 +62,48 @@ class BatchPredictionPipeline:
         else:
             return prediction_file_path
 
+    def get_drift_summary(self, sketch: HistogramSketch) -> Dict:
+        """Returns the compact drift summary of the input file i.e. the PSI and JS divergence of each monitored sensor's 
+        histogram off the reference profile's, along with its missing ratio's shift, only the drifted sensors being listed.
+
+        Args:
+            sketch (HistogramSketch): Histograms and missing counts of the input file's sensors, gathered while scoring it.
+
+        Raises:
+            e: Throws exception should any error or exception pops up while summarizing the drift.
+
+        Returns:
+            Dict: Drift summary of the input file.
+        """
+        try:
+            profile = sketch.profile
+            base_counts = np.stack([profile.histograms[col] for col in sketch.columns]) if sketch.columns else np.zeros(
+                (0, profile.n_bins), dtype="int64")
+            metrics = DriftEngine.histogram_drift(sketch.columns, base_counts, sketch.bin_counts)
+            missing_ratios = sketch.missing_ratios
+            drifted_cols = {}
+            for col, res in metrics.items():
+                missing_ratio_shift = missing_ratios[col] - profile.missing_ratios[col]
+                if res["psi"] > self.drift_config.psi_thresh or abs(
+                        missing_ratio_shift) > self.drift_config.missing_ratio_shift_thresh:
+                    drifted_cols[col] = {
+                        "psi": round(res["psi"], 4), "js_divergence": round(res["js_divergence"], 4),
+                        "missing_ratio": round(missing_ratios[col], 4),
+                        "base_missing_ratio": round(profile.missing_ratios[col], 4)}
+            psis = [res["psi"] for res in metrics.values() if not np.isnan(res["psi"])]
+            lg.info(f"{len(drifted_cols)} of {len(sketch.columns)} sensors of the input drifted: {list(drifted_cols)}")
+            return {
+                "input_file": self.input_file_path,
+                "n_rows": sketch.n_rows,
+                "n_sensors_monitored": len(sketch.columns),
+                "max_psi": round(max(psis), 4) if psis else None,
+                "n_drifted_sensors": len(drifted_cols),
+                "drifted_sensors": drifted_cols}
+            ...
+        except Exception as e:
+            lg.exception(e)
+            raise e
+
     def initiate(self) -> str:
         """Triggers the prediction pipeline flow, making predictions for the input batch file and returns the 
         prepared prediction file.
@@ -61,38 +115,20 @@ class BatchPredictionPipeline:
             str: Location of the prepared prediction file.
         """
         try:
-            ############## Read the dataset from the given path on which prediction is to be done ##############
-            lg.info(
-                f"fetching the data from the input file at \"{self.input_file_path}\"")
-            input_df = pd.read_csv(self.input_file_path)
-            lg.info("data fetched as Dataframe successfully!")
-            lg.info(f"Shape of the data fetched: {input_df.shape}")
-            # Replace all `na` values with np.NaN
-            input_df.replace({"na": np.NaN}, inplace=True)
-
-            ######################## Load the Transformer and Transform the input data #########################
+            ############### Load the Transformer, for the features that were used in training ##################
             # Load the Transformer from the Model Registry
             lg.info("loading the \"Transformer\" from the Model Registry..")
             transformer = BasicUtils.load_object(
                 file_path=self.model_registry_config.get_latest_transformer_path(), obj_desc="Transformer")
-            lg.info("transforming the input data..")
-            # first and foremost fetch the features that were used in training
+            # first and foremost fetch the features that were used in training i.e. the ones selected during the validation,
+            # so that only these are parsed as sensors, the dropped ones being just carried along to the prediction file
             input_features = list(transformer.feature_names_in_)
-            # transform the input features from the input file and compose the consequent array
-            input_arr = transformer.transform(input_df[input_features])
-            lg.info(f"Input data transformed successfully!")
 
-            ############################## Load the Model and Make Predictions #################################
-            # Load the Model
+            ############################## Load the Model, and the Target Encoder ##############################
             lg.info(
                 "loading the latestly \"trained model\" from the Model Registry, for making predictions..")
             model = BasicUtils.load_object(
                 file_path=self.model_registry_config.get_latest_model_path(), obj_desc="latestly trained Model")
-            lg.info("Making predictions..")
-            preds = model.predict(input_arr).reshape(-1, 1)
-            lg.info("Predictions made successfully!")
-
-            ##################### Load the Encoder and Inverse-transform the Predictions #######################
             # Grab the `OneHot Encoder` to inverse-transform predictions
             lg.info(
                 "fetching the `OneHot Encoder` from the Model registry to inverse transform the predcitions..")
@@ -100,19 +136,50 @@ class BatchPredictionPipeline:
                 file_path=self.model_registry_config.get_latest_target_encoder_path(), obj_desc="Target Encoder")
             lg.info(
                 f"fitted OneHot Encoder: {target_enc} fetched successfully!")
-            # Inverse transform the predictions
-            lg.info("Inverse-transforming the predictions..")
-            cat_preds = target_enc.inverse_transform(preds)
-            lg.info("predictions transformed successfully!")
-
-            ##################### Configure the Predicitons and Save the Predictions file ######################
-            # Configure the Categorical Predictions into the dataframe
-            input_df["prediction"] = cat_preds
-            # Save the Prediction file
+
+            ###################### Load the Reference Profile, for monitoring the input drift ##################
+            # The data the model was trained off is profiled next to it (the models pushed before that ain't though)
+            profile_path = self.model_registry_config.get_latest_profile_path()
+            sketch = None
+            if os.path.exists(profile_path):
+                sketch = HistogramSketch(ReferenceProfile.load(profile_path), columns=input_features)
+            else:
+                lg.warning("there's no reference profile next to the model, so the input drift ain't gonna be monitored!")
+
+            ######### Read the input file in chunks, monitor, transform and score each, save predictions #######
+            lg.info(
+                f"fetching the data from the input file at \"{self.input_file_path}\"")
+            # "na" values are read as NaN and the sensors as floats, as per the sensor schema derived from the input's header, the
+            # columns that ain't features being read as plain strings
+            schema = SensorSchema.from_header(
+                self.input_file_path, target=self.target, float_dtype=self.precision,
+                csv_engine=self.schema_config.csv_engine)
+            schema.text_columns = [col for col in schema.feature_columns if col not in input_features]
             prediction_file_path = self.get_predicition_file_path()
-            lg.info("Readying the prediction file..")
-            input_df.to_csv(
-                path_or_buf=self.get_predicition_file_path(), index=None)
+            n_rows = 0
+            for input_df in BasicUtils.iter_dataframe_chunks(
+                    self.input_file_path, desc="Input", chunk_size=CHUNK_SIZE, schema=schema):
+                # Histograms and missing counts of the chunk, sans another pass over the input file
+                if sketch is not None:
+                    sketch.update(input_df[input_features])
+                # transform the input features and make predictions
+                input_arr = transformer.transform(input_df[input_features])
+                preds = model.predict(input_arr).reshape(-1, 1)
+                # Inverse transform the predictions and configure them into the dataframe (concatenated, as the parsed chunks 
+                # come with a block per column, which pandas warns about getting inserted into)
+                input_df = pd.concat([input_df, pd.DataFrame(
+                    {"prediction": target_enc.inverse_transform(preds).ravel()}, index=input_df.index)], axis=1)
+                # Save (append to) the Prediction file
+                input_df.to_csv(
+                    path_or_buf=prediction_file_path, index=None, mode="w" if n_rows == 0 else "a", header=n_rows == 0)
+                n_rows += input_df.shape[0]
+            lg.info(f"Predictions made for {n_rows} rows successfully!")
+
+            ################################ Save the Drift Summary ############################################
+            if sketch is not None:
+                BasicUtils.write_yaml_file(
+                    file_path=f"{os.path.splitext(prediction_file_path)[0]}__drift_summary.yaml",
+                    data=self.get_drift_summary(sketch), desc="Input Drift Summary")
             ...
         except Exception as e:
             lg.exception(e)
@@ -1,20 +1,38 @@
 from src.logger import lg
 from dataclasses import dataclass
 import os
+import argparse
 from src.components.data_ingestion import DataIngestion
 from src.components.data_validation import DataValidation
 from src.components.data_transformation import DataTransformation
 from src.components.model_training import ModelTraining
 from src.components.model_evaluation import ModelEvaluation
 from src.components.model_pushing import ModelPushing
+from src.utils.artifact_store import ArtifactStore
+from src.utils.stage_cache import StageCache
+from src.entities.config import StageCacheConfig
 
 
 @dataclass
 class TrainingPipeline:
-    """Shall be used for triggering the Training pipeline."""
+    """Shall be used for triggering the Training pipeline.
+
+    Args:
+        rebuild_feature_store (bool, optional): Whether the feature store is to be rebuilt from the entire collection. 
+        Defaults to False.
+        export_csv (bool, optional): Whether the feature store and the training and test sets are to be exported as CSV files
+        too. Defaults to False.
+        force (bool, optional): Whether every stage is to be recomputed, even if its inputs and config ain't changed since it 
+        last ran. Defaults to False.
+    """
     lg.info("Training Pipeline begins now..")
     lg.info(f"Entered the {os.path.basename(__file__)[:-3]}.TrainingPipeline")
 
+    rebuild_feature_store: bool = False
+    export_csv: bool = False
+    force: bool = False
+    stage_cache_config = StageCacheConfig()
+
     def begin(self) -> None:
         """Commences the training pipeline starting from Data Ingestion component followed by Data Validation, Data Transformation,
         Model Training, Model Evaluation and at last, Model Pushing.
@@ -23,24 +41,35 @@ class TrainingPipeline:
             e: Raises exception should any sort of error pops up during the training pipeline flow execution.
         """
         try:
+            # Stages are run within the very process, so they hand their artifacts over in memory
+            ArtifactStore.enable()
+            # Stages whose inputs and config ain't changed since they last ran are skipped, with their cached outputs restored
+            if self.stage_cache_config.use_stage_cache:
+                StageCache.enable(force=self.force)
+
             ######################### DATA INGESTION #######################################
-            ingestion = DataIngestion()
+            ingestion = DataIngestion(
+                rebuild_feature_store=self.rebuild_feature_store, export_csv=self.export_csv)
             ingestion_artifact = ingestion.initiate()
+            ArtifactStore.log_stats(stage="data ingestion")
 
             ######################### DATA VALIDATION ######################################
             validation = DataValidation(
                 data_ingestion_artifact=ingestion_artifact)
             validation_artifact = validation.initiate()
+            ArtifactStore.log_stats(stage="data validation")
 
             ######################### DATA TRANSFORMATION ##################################
             transformation = DataTransformation(
-                data_ingestion_artifact=ingestion_artifact)
+                data_ingestion_artifact=ingestion_artifact, data_validation_artifact=validation_artifact)
             transformation_artifact = transformation.initiate()
+            ArtifactStore.log_stats(stage="data transformation")
 
             ######################### MODEL TRAINING #######################################
             model_training = ModelTraining(
                 data_transformation_artifact=transformation_artifact)
             model_training_artifact = model_training.initiate()
+            ArtifactStore.log_stats(stage="model training")
 
             ######################### MODEL EVALUATION #####################################
             model_evaluation = ModelEvaluation(
@@ -49,21 +78,35 @@ class TrainingPipeline:
                 model_training_artifact=model_training_artifact
             )
             model_evaluation_artifact = model_evaluation.initiate()
+            ArtifactStore.log_stats(stage="model evaluation")
 
             ######################### MODEL PUSHING ########################################
             model_pushing = ModelPushing(
                 data_transformation_artifact=transformation_artifact,
-                model_training_artifact=model_training_artifact
+                model_training_artifact=model_training_artifact,
+                data_validation_artifact=validation_artifact
             )
             model_pushing_artifact = model_pushing.initiate()
+            ArtifactStore.log_stats(stage="model pushing")
             ...
         except Exception as e:
             lg.exception(e)
             raise e
         else:
             lg.info("Training Pipeline ran with success!")
+        finally:
+            ArtifactStore.disable()
+            StageCache.disable()
 
 
 if __name__ == "__main__":
-    training_pipeline = TrainingPipeline()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rebuild_feature_store", action="store_true")
+    parser.add_argument("--export_csv", action="store_true")
+    parser.add_argument("--force", action="store_true",
+                        help="recompute every stage, even if its inputs and config ain't changed since it last ran")
+    parsed_args = parser.parse_args()
+    training_pipeline = TrainingPipeline(
+        rebuild_feature_store=parsed_args.rebuild_feature_store, export_csv=parsed_args.export_csv,
+        force=parsed_args.force)
     training_pipeline.begin()
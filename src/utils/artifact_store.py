@@ -0,0 +1,85 @@
+import os
+import threading
+from src.logger import lg
+from typing import Any, Dict, Optional, Tuple
+
+
+class ArtifactStore:
+    """Shall be used to hand the artifacts (dataframes, arrays and fitted objects) over from one stage to the next within the very
+    process, instead of reloading what the previous stage just wrote. Artifacts are kept keyed by their paths along with the
+    files' mtimes, so that a file rewritten since ain't served stale; disk is there for the persistence only.
+
+    The store stays disabled (and thus empty) unless it's enabled, as done by the training pipeline for its run.
+    """
+    _entries: Dict[str, Tuple[int, Any]] = {}
+    _stats = {"hits": 0, "misses": 0}
+    _enabled = False
+    _lock = threading.Lock()
+
+    @classmethod
+    def enable(cls) -> None:
+        """Enables the store."""
+        cls._enabled = True
+
+    @classmethod
+    def is_enabled(cls) -> bool:
+        """Returns whether the store's enabled i.e. whether an artifact put in it gets to be handed over later on."""
+        return cls._enabled
+
+    @classmethod
+    def disable(cls) -> None:
+        """Disables the store, letting go of all the artifacts it's been holding."""
+        with cls._lock:
+            cls._enabled = False
+            cls._entries.clear()
+
+    @classmethod
+    def put(cls, file_path: str, obj: Any) -> None:
+        """Keeps the live object, as in it's been just written at (or read from) the said path.
+
+        Args:
+            file_path (str): Location of the artifact.
+            obj (Any): Live object of the artifact.
+        """
+        if not cls._enabled:
+            return
+        with cls._lock:
+            cls._entries[os.path.abspath(file_path)] = (os.stat(file_path).st_mtime_ns, obj)
+
+    @classmethod
+    def get(cls, file_path: str) -> Optional[Any]:
+        """Returns the live object of the artifact at the said path, provided that the file ain't been modified since.
+
+        Args:
+            file_path (str): Location of the artifact.
+
+        Returns:
+            Optional[Any]: Live object of the artifact, None if there's none (or if the store's disabled).
+        """
+        if not cls._enabled:
+            return None
+        with cls._lock:
+            entry = cls._entries.get(os.path.abspath(file_path))
+            if entry is not None and os.path.exists(file_path) and entry[0] == os.stat(file_path).st_mtime_ns:
+                cls._stats["hits"] += 1
+                return entry[1]
+            cls._stats["misses"] += 1
+            return None
+
+    @classmethod
+    def log_stats(cls, stage: str, reset: bool = True) -> Dict:
+        """Logs the store's hits and misses accumulated during the said stage.
+
+        Args:
+            stage (str): Name of the stage the stats are to be logged for.
+            reset (bool, optional): Whether to reset the stats afterwards, so that the next stage starts afresh. Defaults to True.
+
+        Returns:
+            Dict: Hits and misses of the store.
+        """
+        with cls._lock:
+            stats = dict(cls._stats, artifacts_held=len(cls._entries))
+            if reset:
+                cls._stats.update(hits=0, misses=0)
+        lg.info(f'Artifact store stats for "{stage}": {stats}')
+        return stats
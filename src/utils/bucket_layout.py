@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+from bson.binary import Binary
+from src.logger import lg
+from typing import Dict, List
+
+
+class BucketCodec:
+    """Shall be used for encoding the sensors data into (and decoding it from) the bucketed columnar document layout, wherein 
+    each document holds `n_rows` consecutive rows with every sensor stored as a packed little-endian float array (missing 
+    values being NaN, which is all the null mask there is), and the target stored as an array of strings.
+
+    Bucket document:
+        {
+            "n_rows": int,
+            "dtype": "<f8" | "<f4",
+            "columns": [column names, in order],
+            "sensors": {sensor: {"values": Binary}, ..},
+            <target>: [str, ..]
+        }
+    """
+
+    @classmethod
+    def encode(cls, df: pd.DataFrame, target: str, bucket_size: int, dtype: str = "<f8") -> List[Dict]:
+        """Encodes the dataframe into bucket documents of (at most) `bucket_size` rows each.
+
+        Args:
+            df (pd.DataFrame): Dataframe whose sensor columns are numeric (missing values being NaN).
+            target (str): Target column name.
+            bucket_size (int): Number of rows per bucket.
+            dtype (str, optional): Little-endian float dtype the sensors are to be packed as. Defaults to "<f8".
+
+        Raises:
+            e: Throws relevant exception if any error pops up while encoding the dataframe.
+
+        Returns:
+            List[Dict]: Bucket documents.
+        """
+        try:
+            columns = list(df.columns)
+            sensor_cols = [col for col in columns if col != target]
+            # Column-major, so that each sensor's bucket slice is contiguous
+            sensors_arr = np.asfortranarray(df[sensor_cols].to_numpy(dtype=dtype))
+            buckets = []
+            for start in range(0, df.shape[0], bucket_size):
+                stop = min(start + bucket_size, df.shape[0])
+                sensors = {}
+                for j, col in enumerate(sensor_cols):
+                    values = sensors_arr[start:stop, j]
+                    sensors[col] = {"values": Binary(values.tobytes())}
+                bucket = {"n_rows": stop - start, "dtype": dtype,
+                          "columns": columns, "sensors": sensors}
+                if target in columns:
+                    bucket[target] = df[target].iloc[start:stop].astype(str).tolist()
+                buckets.append(bucket)
+            return buckets
+            ...
+        except Exception as e:
+            lg.exception(e)
+            raise e
+
+    @classmethod
+    def decode(cls, bucket: Dict, columns: List[str], target: str) -> Dict[str, np.ndarray]:
+        """Decodes the bucket document into column arrays. Sensor arrays are zero-copy (read-only) views over the bucket's
+        buffers, since the missing values are already packed as NaN.
+
+        Args:
+            bucket (Dict): Bucket document.
+            columns (List[str]): Columns that are to be decoded.
+            target (str): Target column name.
+
+        Returns:
+            Dict[str, np.ndarray]: Column name to column array mapping of the bucket.
+        """
+        n_rows, dtype = bucket["n_rows"], np.dtype(bucket["dtype"])
+        arrays = {}
+        for col in columns:
+            if col == target:
+                arrays[col] = np.array(bucket[target], dtype=object)
+            elif col in bucket["sensors"]:
+                arrays[col] = np.frombuffer(
+                    bucket["sensors"][col]["values"], dtype=dtype, count=n_rows)
+            else:
+                arrays[col] = np.full(n_rows, np.nan)
+        return arrays
@@ -1,9 +1,16 @@
 import pymongo
+from bson import ObjectId
 import pandas as pd
+import numpy as np
 from src.CONFIG import Config
-from src.entities.config import DataSourceConfig
+from src.entities.config import DataSourceConfig, BaseConfig
+from src.utils.mongo_client import MongoClientManager
+from src.utils.bucket_layout import BucketCodec
 from src.logger import lg
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
 from dataclasses import dataclass
 
 
@@ -18,20 +25,21 @@ class dBOperations:
     """
     lg.info(f'Entered the "{os.path.basename(__file__)[:-3]}.dBOperations" class')
     data_source_config = DataSourceConfig()
+    target = BaseConfig().target
+    precision = BaseConfig().precision
     client = None
     database = None
     collection = None
 
     def establishConnectionToMongoDB(self):
-        """This method establishes the connection to the MongoDB Cluster.
+        """This method establishes the connection to the MongoDB Cluster, by way of the process-wide shared client.
 
         Raises:
             e: Throws exception if any error pops up while establishing connection to MongoDB.
         """
         try:
             lg.info("Establishing the connection to MongoDB..")
-            connection_url = Config().mongodb_url
-            self.client = pymongo.MongoClient(connection_url)
+            self.client = MongoClientManager.get_client(Config().mongodb_url)
         except Exception as e:
             lg.exception(e)
             raise e
@@ -63,16 +71,358 @@ class dBOperations:
         try:
             self.selectDB()
             lg.info("searching for the collection..")
-            self.collection = self.database[self.data_source_config.collection_name]
+            self.collection = self.database[self.data_source_config.get_collection_name()]
         except Exception as e:
             lg.exception(e)
             raise e
         else:
             lg.info(
-                f'"{self.data_source_config.collection_name}" collection in the database "{self.data_source_config.database_name}" selected successfully!')
+                f'"{self.data_source_config.get_collection_name()}" collection in the database "{self.data_source_config.database_name}" selected successfully!')
 
-    def getDataAsDataFrame(self) -> pd.DataFrame:
-        """This method returns the sensors-streaming-data as dataframe.
+    def getColumnNames(self) -> List[str]:
+        """This method returns the field names of the selected collection (sans `_id`), in the very order they were dumped in.
+
+        Raises:
+            e: Throws exception if any error pops up while fetching the field names of the collection.
+
+        Returns:
+            List[str]: Field names of the collection's documents.
+        """
+        try:
+            sample_doc = self.collection.find_one(projection={"_id": False, "row_hash": False, "row_hashes": False})
+            if sample_doc is None:
+                lg.warning(
+                    f'Looks like the collection "{self.data_source_config.get_collection_name()}" is empty!')
+                return []
+            if self.data_source_config.storage_layout == "bucket":
+                return list(sample_doc["columns"])
+            return list(sample_doc.keys())
+            ...
+        except Exception as e:
+            lg.exception(e)
+            raise e
+
+    def getLatestId(self) -> Optional[ObjectId]:
+        """This method returns the greatest `_id` of the selected collection, that is the `_id` of the latestly inserted document.
+
+        Raises:
+            e: Throws exception if any error pops up while fetching the latest `_id`.
+
+        Returns:
+            Optional[ObjectId]: Latest `_id` of the collection, None if the collection is empty.
+        """
+        try:
+            self.selectCollection()
+            latest_doc = self.collection.find_one(
+                projection={"_id": True}, sort=[("_id", pymongo.DESCENDING)])
+            return None if latest_doc is None else latest_doc["_id"]
+            ...
+        except Exception as e:
+            lg.exception(e)
+            raise e
+
+    def countRows(self, query: Optional[Dict] = None) -> int:
+        """This method returns the number of rows in the (filtered) collection, as in the number of documents for the row layout
+        and the sum of the buckets' `n_rows` for the bucket layout. Without any filter, the row layout's count is an estimate.
+
+        Args:
+            query (Optional[Dict], optional): Filter for the documents to be counted. Defaults to None i.e. all documents.
+
+        Returns:
+            int: Number of rows.
+        """
+        if self.data_source_config.storage_layout == "bucket":
+            pipeline = [] if query is None else [{"$match": query}]
+            pipeline.append({"$group": {"_id": None, "n_rows": {"$sum": "$n_rows"}}})
+            result = list(self.collection.aggregate(pipeline))
+            return 0 if len(result) == 0 else int(result[0]["n_rows"])
+        if query is None:
+            return self.collection.estimated_document_count()
+        return self.collection.count_documents(query)
+
+    def getCastPipeline(self, columns: List[str], query: Optional[Dict] = None, with_ids: bool = False) -> List[Dict]:
+        """This method returns the aggregation pipeline that gets the documents normalized on the server itself, i.e. with the 
+        sensor fields cast into double ("na" becoming null) and the target field cast into string, so that the client receives 
+        numeric BSON that decodes straight into float columns.
+
+        Args:
+            columns (List[str]): Field names that are to be fetched.
+            query (Optional[Dict], optional): Filter for the documents to be fetched. Defaults to None i.e. all documents.
+            with_ids (bool, optional): Whether the `_id`s are to be fetched too, as hex strings. Defaults to False.
+
+        Returns:
+            List[Dict]: Aggregation pipeline.
+        """
+        projection = {"_id": {"$toString": "$_id"}} if with_ids else {"_id": 0}
+        for col in columns:
+            if col == self.target:
+                projection[col] = {"$toString": f"${col}"}
+            else:
+                projection[col] = {"$convert": {
+                    "input": f"${col}", "to": "double", "onError": None, "onNull": None}}
+        pipeline = [] if query is None else [{"$match": query}]
+        pipeline.append({"$project": projection})
+        return pipeline
+
+    def getFingerprint(self, with_hash: bool = False) -> Dict:
+        """This method returns the fingerprint of the selected collection, cheap enough to be computed on every run, by which a
+        local snapshot of the collection can be validated.
+
+        Args:
+            with_hash (bool, optional): Whether the md5 hash of the collection's contents (via the `dbHash` command) is to be 
+            included too. Defaults to False.
+
+        Raises:
+            e: Throws exception if any error pops up while fingerprinting the collection.
+
+        Returns:
+            Dict: Document count, max `_id` and, if asked, hash of the collection.
+        """
+        try:
+            latest_id = self.getLatestId()
+            fingerprint = {
+                "count": self.collection.estimated_document_count(),
+                "max_id": None if latest_id is None else str(latest_id)
+            }
+            if with_hash:
+                collection_name = self.data_source_config.get_collection_name()
+                db_hash = self.database.command("dbHash", collections=[collection_name])
+                fingerprint["hash"] = db_hash["collections"].get(collection_name)
+            return fingerprint
+            ...
+        except Exception as e:
+            lg.exception(e)
+            raise e
+
+    def _getColumnChunks(self, columns: List[str], batch_size: int, query: Optional[Dict] = None,
+                         with_ids: bool = False) -> Iterator[Dict[str, np.ndarray]]:
+        """This method streams the collection in batches of `batch_size` documents and yields each batch as column arrays,
+        sensor columns being parsed into float dtype (with "na" as NaN) and the target column being kept as object dtype.
+
+        With `DataSourceConfig.server_side_cast`, the documents get normalized on the server via an aggregation pipeline, 
+        otherwise they are fetched as they are and parsed on the client. For the bucket layout, each bucket is yielded as it's
+        decoded.
+
+        Args:
+            columns (List[str]): Field names that are to be fetched.
+            batch_size (int): Number of documents per batch.
+            query (Optional[Dict], optional): Filter for the documents to be fetched. Defaults to None i.e. all documents.
+            with_ids (bool, optional): Whether the documents' `_id`s are to be yielded too (as hex strings, under "_id"). 
+            Defaults to False.
+
+        Yields:
+            Iterator[Dict[str, np.ndarray]]: Column name to column array mapping of each batch.
+        """
+        projection = {"_id": with_ids, "row_hash": False, "row_hashes": False}
+        if self.data_source_config.storage_layout == "bucket":
+            # Buckets already hold float arrays, thus are decoded as they come
+            cursor = self.collection.find(
+                query or {}, projection=projection, batch_size=max(1, batch_size // self.data_source_config.bucket_size))
+            for bucket in cursor:
+                arrays = BucketCodec.decode(bucket, columns, self.target)
+                if with_ids:
+                    arrays["_id"] = np.full(bucket["n_rows"], str(bucket["_id"]), dtype=object)
+                yield arrays
+            return
+
+        server_side_cast = self.data_source_config.server_side_cast
+        if server_side_cast:
+            cursor = self.collection.aggregate(
+                self.getCastPipeline(columns, query, with_ids=with_ids), batchSize=batch_size, allowDiskUse=True)
+        else:
+            cursor = self.collection.find(query or {}, projection=projection, batch_size=batch_size)
+        batch = []
+        for doc in cursor:
+            batch.append(doc)
+            if len(batch) == batch_size:
+                yield self._toColumnArrays(batch, columns, is_cast=server_side_cast, with_ids=with_ids)
+                batch = []
+        if len(batch) > 0:
+            yield self._toColumnArrays(batch, columns, is_cast=server_side_cast, with_ids=with_ids)
+
+    def _toColumnArrays(self, docs: List[Dict], columns: List[str], is_cast: bool = False,
+                        with_ids: bool = False) -> Dict[str, np.ndarray]:
+        """This method converts a (bounded) batch of documents into column arrays.
+
+        Args:
+            docs (List[Dict]): Batch of documents.
+            columns (List[str]): Field names that are to be fetched.
+            is_cast (bool, optional): Whether the sensor fields have already been cast into double (or null) on the server. 
+            Defaults to False.
+            with_ids (bool, optional): Whether the documents' `_id`s are to be kept too, as hex strings. Defaults to False.
+
+        Returns:
+            Dict[str, np.ndarray]: Column name to column array mapping of the batch.
+        """
+        arrays = {}
+        if with_ids:
+            arrays["_id"] = np.array([str(doc["_id"]) for doc in docs], dtype=object)
+        for col in columns:
+            values = [doc.get(col) for doc in docs]
+            if col == self.target:
+                arrays[col] = np.array(values, dtype=object)
+            elif is_cast:
+                # None becomes NaN
+                arrays[col] = np.array(values, dtype="float64")
+            else:
+                # "na" (or any unparsable value) is coerced into NaN
+                arrays[col] = pd.to_numeric(
+                    np.array(values, dtype=object), errors="coerce").astype("float64", copy=False)
+        return arrays
+
+    def iterDataAsDataFrames(self, batch_size: Optional[int] = None, query: Optional[Dict] = None) -> Iterator[pd.DataFrame]:
+        """This method streams the sensors-streaming-data as dataframes of at most `batch_size` rows, so as to keep the memory
+        flat no matter how big the collection is.
+
+        Args:
+            batch_size (Optional[int], optional): Number of rows per dataframe. Defaults to `DataSourceConfig.batch_size`.
+            query (Optional[Dict], optional): Filter for the documents to be fetched. Defaults to None i.e. all documents.
+
+        Raises:
+            e: Throws exception if any error pops up while streaming data from MongoDB's database.
+
+        Yields:
+            Iterator[pd.DataFrame]: Bounded-size chunks of the collection as pandas dataframes.
+        """
+        try:
+            self.selectCollection()
+            batch_size = batch_size or self.data_source_config.batch_size
+            columns = self.getColumnNames()
+            lg.info(
+                f'streaming data from the collection "{self.data_source_config.get_collection_name()}" in chunks of {batch_size} documents..')
+            for chunk in self._getColumnChunks(columns, batch_size, query):
+                yield pd.DataFrame(chunk, columns=columns)
+        except Exception as e:
+            lg.exception(e)
+            raise e
+
+    def getPartitionBounds(self, n_partitions: int, query: Optional[Dict] = None) -> List[Tuple[Dict, int]]:
+        """This method splits the `_id` range of the (filtered) collection into `n_partitions` contiguous partitions of roughly 
+        equal document count, via `$bucketAuto`.
+
+        Args:
+            n_partitions (int): Number of partitions to split the collection into.
+            query (Optional[Dict], optional): Filter for the documents to be partitioned. Defaults to None i.e. all documents.
+
+        Raises:
+            e: Throws exception if any error pops up while computing the partitions' bounds.
+
+        Returns:
+            List[Tuple[Dict, int]]: Filter and row count of each partition, ordered by `_id`.
+        """
+        try:
+            pipeline = [] if query is None else [{"$match": query}]
+            # Partitions' counts are to be in rows, which for the bucket layout is the sum of the buckets' `n_rows`
+            row_count = {"$sum": "$n_rows"} if self.data_source_config.storage_layout == "bucket" else {"$sum": 1}
+            pipeline.append({"$bucketAuto": {
+                "groupBy": "$_id", "buckets": n_partitions, "output": {"count": row_count}}})
+            buckets = list(self.collection.aggregate(pipeline, allowDiskUse=True))
+
+            partitions = []
+            for i, bucket in enumerate(buckets):
+                # Upper bound of a bucket is exclusive, except for the very last one
+                upper_op = "$lte" if i == len(buckets) - 1 else "$lt"
+                bounds = {"_id": {"$gte": bucket["_id"]["min"],
+                                  upper_op: bucket["_id"]["max"]}}
+                partition_query = bounds if query is None else {
+                    "$and": [query, bounds]}
+                partitions.append((partition_query, bucket["count"]))
+            return partitions
+            ...
+        except Exception as e:
+            lg.exception(e)
+            raise e
+
+    def _fillRows(
+            self, chunks: Iterator[Dict[str, np.ndarray]], float_cols: List[str], float_arr: np.ndarray, target_arr: np.ndarray,
+            start: int, stop: int, id_arr: Optional[np.ndarray] = None) -> Tuple[int, List[Dict[str, np.ndarray]]]:
+        """This method fills the column chunks into the rows [`start`, `stop`) of the preallocated arrays.
+
+        Args:
+            chunks (Iterator[Dict[str, np.ndarray]]): Column chunks that are to be filled.
+            float_cols (List[str]): Float columns, in the order of `float_arr`'s columns.
+            float_arr (np.ndarray): Preallocated float array.
+            target_arr (np.ndarray): Preallocated target array.
+            start (int): First row to be filled.
+            stop (int): Row before which the filling's gotta stop.
+            id_arr (Optional[np.ndarray], optional): Preallocated `_id` array, should the `_id`s be fetched too. Defaults to None.
+
+        Returns:
+            Tuple[int, List[Dict[str, np.ndarray]]]: Number of rows filled and the chunks' rows that didn't fit (should the 
+            documents have got added since they were counted).
+        """
+        row = start
+        overflow = []
+        for chunk in chunks:
+            n = len(chunk[float_cols[0]] if len(float_cols) > 0 else chunk[self.target])
+            fit = min(n, stop - row)
+            if fit > 0:
+                for j, col in enumerate(float_cols):
+                    float_arr[row:row+fit, j] = chunk[col][:fit]
+                if self.target in chunk:
+                    target_arr[row:row+fit] = chunk[self.target][:fit]
+                if id_arr is not None:
+                    id_arr[row:row+fit] = chunk["_id"][:fit]
+                row += fit
+            if fit < n:
+                overflow.append({col: arr[fit:] for col, arr in chunk.items()})
+        return row - start, overflow
+
+    def _toDataFrame(
+            self, columns: List[str], float_arr: np.ndarray, target_arr: np.ndarray, filled_rows: List[Tuple[int, int]],
+            overflow: List[Dict[str, np.ndarray]], id_arr: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """This method builds the dataframe out of the filled arrays, dropping the rows that didn't get filled and appending the
+        ones that overflowed.
+
+        Args:
+            columns (List[str]): Columns of the dataframe, in order.
+            float_arr (np.ndarray): Filled float array.
+            target_arr (np.ndarray): Filled target array.
+            filled_rows (List[Tuple[int, int]]): First row and number of rows filled for each of the filled regions.
+            overflow (List[Dict[str, np.ndarray]]): Column chunks that didn't fit into the arrays.
+            id_arr (Optional[np.ndarray], optional): Filled `_id` array, should the `_id`s have been fetched too. Defaults to None.
+
+        Returns:
+            pd.DataFrame: Dataframe with `columns` as its columns (followed by "_id", should the `_id`s have been fetched too).
+        """
+        float_cols = [col for col in columns if col != self.target]
+        if sum(n for _, n in filled_rows) < float_arr.shape[0]:
+            rows = np.concatenate(
+                [np.arange(start, start+n) for start, n in filled_rows])
+            float_arr, target_arr = float_arr[rows], target_arr[rows]
+            id_arr = None if id_arr is None else id_arr[rows]
+        if len(overflow) > 0:
+            float_arr = np.concatenate([float_arr] + [np.column_stack(
+                [chunk[col] for col in float_cols]) for chunk in overflow], dtype=float_arr.dtype)
+            target_arr = np.concatenate([target_arr] + [
+                chunk.get(self.target, np.empty(len(chunk[float_cols[0]]), dtype=object)) for chunk in overflow])
+            if id_arr is not None:
+                id_arr = np.concatenate([id_arr] + [chunk["_id"] for chunk in overflow])
+
+        df = pd.DataFrame(float_arr, columns=float_cols, copy=False)
+        if self.target in columns:
+            df.insert(columns.index(self.target), self.target, target_arr)
+        if id_arr is not None:
+            df["_id"] = id_arr
+        return df
+
+    def getDataAsDataFrame(
+            self, batch_size: Optional[int] = None, query: Optional[Dict] = None, n_partitions: Optional[int] = None,
+            with_ids: bool = False) -> pd.DataFrame:
+        """This method returns the sensors-streaming-data as dataframe. Documents are streamed in batches of `batch_size`
+        (sans `_id`, unless asked for) and filled chunk by chunk into preallocated float columns, so that no list of all the 
+        documents nor any object-dtype frame is ever built.
+
+        With `n_partitions` > 1, the `_id` range gets split into as many partitions, each of which is read on its own thread 
+        (sharing the very client) straight into its own rows of the preallocated columns.
+
+        Args:
+            batch_size (Optional[int], optional): Number of documents per round-trip. Defaults to `DataSourceConfig.batch_size`.
+            query (Optional[Dict], optional): Filter for the documents to be fetched. Defaults to None i.e. all documents.
+            n_partitions (Optional[int], optional): Number of partitions to be read in parallel. Defaults to 
+            `DataSourceConfig.read_partitions`.
+            with_ids (bool, optional): Whether the documents' `_id`s are to be fetched too, as the hex strings of the last column 
+            i.e. "_id" (the rows of a bucket sharing its `_id`). Defaults to False.
 
         Raises:
             e: Throws exception if any error pops up while loading data as dataframe from MongoDB's database.
@@ -82,11 +432,53 @@ class dBOperations:
         """
         try:
             self.selectCollection()
+            batch_size = batch_size or self.data_source_config.batch_size
+            n_partitions = n_partitions or self.data_source_config.read_partitions
             lg.info(
-                f'reading data from the collection "{self.data_source_config.collection_name}" of the database "{self.data_source_config.database_name}"..')
-            df = pd.DataFrame(list(self.collection.find()))
+                f'reading data from the collection "{self.data_source_config.get_collection_name()}" of the database "{self.data_source_config.database_name}"..')
+            columns = self.getColumnNames()
+            float_cols = [col for col in columns if col != self.target]
+
+            if n_partitions > 1:
+                partitions = self.getPartitionBounds(n_partitions, query)
+            else:
+                partitions = [(query, self.countRows(query))]
+            offsets = np.cumsum([0] + [count for _, count in partitions])
+
+            # Preallocating the columns (column-major, so that each column is contiguous) as per the counts, in the configured
+            # precision
+            float_arr = np.full((offsets[-1], len(float_cols)), np.nan, dtype=self.precision, order="F")
+            target_arr = np.empty(offsets[-1], dtype=object)
+            id_arr = np.empty(offsets[-1], dtype=object) if with_ids else None
+
+            def read_partition(i: int) -> Tuple[int, List[Dict[str, np.ndarray]]]:
+                partition_query, count = partitions[i]
+                tic = time.perf_counter()
+                n_filled, overflow = self._fillRows(
+                    self._getColumnChunks(columns, batch_size, partition_query, with_ids=with_ids),
+                    float_cols, float_arr, target_arr, start=offsets[i], stop=offsets[i] + count, id_arr=id_arr)
+                elapsed = time.perf_counter() - tic
+                n_read = n_filled + sum(len(chunk[columns[0]]) for chunk in overflow)
+                lg.info(
+                    f"partition {i+1}/{len(partitions)}: {n_read} documents read in {elapsed:.2f}s ({n_read/max(elapsed, 1e-9):.0f} docs/s)")
+                return n_filled, overflow
+
+            if len(partitions) > 1:
+                lg.info(f"reading {len(partitions)} partitions in parallel..")
+                with ThreadPoolExecutor(max_workers=len(partitions)) as executor:
+                    results = list(executor.map(read_partition, range(len(partitions))))
+            elif len(partitions) == 1:
+                results = [read_partition(0)]
+            else:
+                # `$bucketAuto` yields no buckets at all when no documents match, in which case the frame's left empty
+                lg.warning("No documents matched the query, nothing to read!")
+                results = []
             lg.info("data readied as the dataframe!")
-            df.drop(columns=["_id"], inplace=True)
+
+            df = self._toDataFrame(
+                columns, float_arr, target_arr,
+                filled_rows=[(offsets[i], n_filled) for i, (n_filled, _) in enumerate(results)],
+                overflow=[chunk for _, overflow in results for chunk in overflow], id_arr=id_arr)
             lg.info(f"Shape of the data: {df.shape}")
         except Exception as e:
             lg.exception(e)
@@ -0,0 +1,213 @@
+import numpy as np
+from src.logger import lg
+from scipy.stats import ks_2samp, kstwo
+from scipy.spatial.distance import jensenshannon
+from concurrent.futures import ProcessPoolExecutor
+from src.entities.config import DriftConfig
+from src.utils.sketch import KLLSketch
+from typing import Dict, List, Optional, Tuple
+
+
+def ks_statistic(base: np.ndarray, current: np.ndarray, current_weights: Optional[np.ndarray] = None) -> float:
+    """Returns the two-sample KS statistic of the said sorted samples (sans NaNs), the current sample's values being weighed
+    as per `current_weights` (such as of a sketch's items), if passed. The ECDFs' difference can only peak at (or just before) the 
+    current sample's distinct values, so the base ECDF is evaluated only there, in a `searchsorted` pass each.
+    """
+    n_base = len(base)
+    cdf_current = (np.arange(1, len(current) + 1) if current_weights is None else np.cumsum(current_weights)).astype("float64")
+    cdf_current = np.r_[0., cdf_current / cdf_current[-1]]
+    # Positions of the last and the first occurrences of each of the current sample's distinct values
+    last = np.flatnonzero(np.r_[current[1:] != current[:-1], True])
+    first = np.r_[0, last[:-1] + 1]
+    values = current[last]
+    diff_at = np.searchsorted(base, values, side="right") / n_base - cdf_current[last + 1]
+    diff_before = np.searchsorted(base, values, side="left") / n_base - cdf_current[first]
+    return float(max(np.abs(diff_at).max(), np.abs(diff_before).max()))
+
+
+def ks_block(base_block: List[np.ndarray], current_block: List[np.ndarray], base_sorted: bool, exact_max_n: int,
+             base_counts: List[Optional[int]]) -> List[Tuple[float, float, int, int]]:
+    """Computes the two-sample KS statistic of each pair of columns of the block (the NaNs being left out), along with the exact
+    p-value for the small samples (NaN for the rest, which are computed asymptotically afterwards, for all the columns at once).
+    Kept at the module level, so that it can be shipped to the pool's processes.
+
+    The base columns might be samples of larger ones (as in a reference profile), in which case their actual counts are to be 
+    passed, for the p-values to go by.
+
+    Returns:
+        List[Tuple[float, float, int, int]]: Statistic, exact p-value, and the number of non-missing base and current values.
+    """
+    results = []
+    for base, current, base_count in zip(base_block, current_block, base_counts):
+        base = base if base_sorted else np.sort(base[~np.isnan(base)])
+        current = np.sort(current[~np.isnan(current)])
+        n_base, n_current = len(base) if base_count is None else base_count, len(current)
+        if len(base) == 0 or n_current == 0:
+            results.append((np.nan, np.nan, n_base, n_current))
+            continue
+        statistic = ks_statistic(base, current)
+        pvalue = np.nan
+        if max(n_base, n_current) <= exact_max_n and n_base == len(base):
+            pvalue = float(ks_2samp(base, current, method="exact").pvalue)
+        results.append((statistic, pvalue, n_base, n_current))
+    return results
+
+
+class DriftEngine:
+    """Shall be used for testing whether the current data's columns are drawn from the same distributions as the base data's,
+    via the two-sample KS test. Each column is sorted once and the ECDFs are compared in a vectorized `searchsorted` pass, the 
+    columns being tested in blocks over a pool of processes. The missing values are left out of the test and reported 
+    separately, p-values being asymptotic for the large samples (as per `DriftConfig`).
+    """
+    drift_config = DriftConfig()
+
+    @classmethod
+    def ks_test(cls, base: Dict[str, np.ndarray], current: Dict[str, np.ndarray], base_sorted: bool = False,
+                base_counts: Optional[Dict[str, int]] = None) -> Dict[str, Dict]:
+        """Performs the two-sample KS test for each of the base columns against the current column of the same name.
+
+        Args:
+            base (Dict[str, np.ndarray]): Base columns keyed by their names.
+            current (Dict[str, np.ndarray]): Current columns keyed by their names, having all of the base columns.
+            base_sorted (bool, optional): Whether the base columns are already sorted and sans the NaNs. Defaults to False.
+            base_counts (Optional[Dict[str, int]], optional): Actual counts of the non-missing values of the base columns, should
+            they be samples (such as of a reference profile). Defaults to None.
+
+        Raises:
+            e: Raises relevant exception should any sort of error pops up while testing the columns.
+
+        Returns:
+            Dict[str, Dict]: KS statistic, p-value, verdict and the missing ratio of the current column, per column. Columns 
+            missing entirely in either data have NaN as their p-value and are deemed drifted.
+        """
+        try:
+            cols = list(base)
+            blocks = [cols[i: i+cls.drift_config.block_size] for i in range(0, len(cols), cls.drift_config.block_size)]
+            args = [
+                ([base[col] for col in block],
+                 [np.asarray(current[col], dtype=base[col].dtype) for col in block],
+                 base_sorted, cls.drift_config.exact_max_n,
+                 [None if base_counts is None else base_counts[col] for col in block])
+                for block in blocks]
+            if len(blocks) > 1 and cls.drift_config.n_workers > 1:
+                lg.info(f"KS testing {len(cols)} columns in {len(blocks)} blocks over {cls.drift_config.n_workers} processes..")
+                with ProcessPoolExecutor(max_workers=cls.drift_config.n_workers) as executor:
+                    results = [res for block_res in executor.map(ks_block, *zip(*args)) for res in block_res]
+            else:
+                lg.info(f"KS testing {len(cols)} columns..")
+                results = [res for block_args in args for res in ks_block(*block_args)]
+
+            statistics, pvalues, n_base, n_current = np.asarray(results, dtype="float64").reshape(-1, 4).T
+            # Asymptotic p-values (of the exact distribution of the statistic, for the effective sample size) for the rest
+            asymptotic = np.isnan(pvalues) & ~np.isnan(statistics)
+            if asymptotic.any():
+                en = n_base[asymptotic] * n_current[asymptotic] / (n_base[asymptotic] + n_current[asymptotic])
+                pvalues[asymptotic] = np.clip(kstwo.sf(statistics[asymptotic], np.maximum(np.round(en), 1)), 0, 1)
+
+            drift_report = {}
+            for i, col in enumerate(cols):
+                n_rows = len(current[col])
+                drift_report[col] = {
+                    "statistic": float(statistics[i]),
+                    "pvalue": float(pvalues[i]),
+                    "same_distribution": bool(pvalues[i] > cls.drift_config.pvalue_thresh),
+                    "current_missing_ratio": float(1 - n_current[i] / n_rows) if n_rows else 1.}
+            drifted = [col for col, res in drift_report.items() if not res["same_distribution"]]
+            lg.info(f"{len(drifted)} of {len(cols)} columns drifted: {drifted}")
+            return drift_report
+            ...
+        except Exception as e:
+            lg.exception(e)
+            raise e
+
+    @classmethod
+    def ks_test_sketches(cls, base: Dict[str, np.ndarray], base_counts: Dict[str, int], 
+                         sketches: Dict[str, KLLSketch]) -> Dict[str, Dict]:
+        """Performs the approximate two-sample KS test for each of the base columns (sorted samples of a reference profile) 
+        against the `KLLSketch` of the current column of the same name, as in the current data's been streamed.
+
+        The approximate statistic is off the exact one by at most the sum of the sketch's CDF error (`rank_error_bound`) and the 
+        base sample's (1/its size, should it be a sample of a larger column), which is reported as `statistic_error_bound`. So
+        the verdict goes by the bound, rather than by the p-value of the approximate statistic: a column's deemed drifted only 
+        should the statistic less the bound exceed the critical statistic (of the exact test, at the actual counts), and deemed 
+        undrifted only should the statistic plus the bound not exceed it, the verdict being inconclusive (None) otherwise.
+
+        Args:
+            base (Dict[str, np.ndarray]): Sorted base columns (sans NaNs) keyed by their names.
+            base_counts (Dict[str, int]): Actual counts of the non-missing values of the base columns.
+            sketches (Dict[str, KLLSketch]): Sketches of the current columns keyed by their names, having all of the base ones.
+
+        Raises:
+            e: Raises relevant exception should any sort of error pops up while testing the columns.
+
+        Returns:
+            Dict[str, Dict]: KS statistic (along with its error bound and the critical statistic), p-value (of the approximate
+            statistic), verdict and the missing ratio of the current column, per column.
+        """
+        try:
+            lg.info(f"KS testing {len(base)} columns against their sketches..")
+            drift_report = {}
+            for col, base_sample in base.items():
+                sketch = sketches[col]
+                n_base, n_current = base_counts[col], sketch.n
+                statistic, pvalue, critical_statistic = np.nan, np.nan, np.nan
+                error_bound = sketch.rank_error_bound() + (1 / len(base_sample) if n_base > len(base_sample) else 0.)
+                # Columns missing entirely in either data are deemed drifted, as with the exact test
+                same_distribution = False
+                if len(base_sample) > 0 and n_current > 0:
+                    statistic = ks_statistic(base_sample, *sketch.get_weighted_sample())
+                    en = max(round(n_base * n_current / (n_base + n_current)), 1)
+                    pvalue = float(np.clip(kstwo.sf(statistic, en), 0, 1))
+                    critical_statistic = float(kstwo.isf(cls.drift_config.pvalue_thresh, en))
+                    same_distribution = None
+                    if statistic - error_bound > critical_statistic:
+                        same_distribution = False
+                    elif statistic + error_bound <= critical_statistic:
+                        same_distribution = True
+                n_rows = n_current + sketch.n_missing
+                drift_report[col] = {
+                    "statistic": float(statistic),
+                    "statistic_error_bound": float(error_bound),
+                    "critical_statistic": float(critical_statistic),
+                    "pvalue": float(pvalue),
+                    "same_distribution": same_distribution,
+                    "current_missing_ratio": float(sketch.n_missing / n_rows) if n_rows else 1.}
+            drifted = [col for col, res in drift_report.items() if res["same_distribution"] is False]
+            inconclusive = [col for col, res in drift_report.items() if res["same_distribution"] is None]
+            lg.info(f"{len(drifted)} of {len(base)} columns drifted: {drifted}, {len(inconclusive)} inconclusive: {inconclusive}")
+            return drift_report
+            ...
+        except Exception as e:
+            lg.exception(e)
+            raise e
+
+    @classmethod
+    def histogram_drift(cls, columns: List[str], base_counts: np.ndarray, current_counts: np.ndarray) -> Dict[str, Dict]:
+        """Computes the Population Stability Index and the Jensen-Shannon divergence (base 2, so that it lies within [0, 1]) of 
+        each column's current histogram off its base one, for all the columns at once.
+
+        Args:
+            columns (List[str]): Names of the columns.
+            base_counts (np.ndarray): Base bin counts, of shape (len(columns), n_bins).
+            current_counts (np.ndarray): Current bin counts over the very bins, of the same shape.
+
+        Raises:
+            e: Raises relevant exception should any sort of error pops up while computing the metrics.
+
+        Returns:
+            Dict[str, Dict]: PSI and JS divergence per column, NaN for the columns having no values in either data.
+        """
+        try:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                base_props = base_counts / base_counts.sum(axis=1, keepdims=True)
+                current_props = current_counts / current_counts.sum(axis=1, keepdims=True)
+                floored_base = np.maximum(base_props, cls.drift_config.psi_eps)
+                floored_current = np.maximum(current_props, cls.drift_config.psi_eps)
+                psi = ((floored_current - floored_base) * np.log(floored_current / floored_base)).sum(axis=1)
+                js_divergence = jensenshannon(base_props, current_props, axis=1, base=2) ** 2
+            return {
+                col: {"psi": float(psi[i]), "js_divergence": float(js_divergence[i])} for i, col in enumerate(columns)}
+            ...
+        except Exception as e:
+            lg.exception(e)
+            raise e
@@ -3,21 +3,28 @@ from src.logger import lg
 import os
 import pandas as pd
 import numpy as np
-from typing import List, Tuple
-import dill
+import pyarrow as pa
+import pyarrow.parquet as pq
+import scipy.sparse as sp
+from typing import Dict, Iterator, List, Optional, Tuple
+from src.entities.schema import SensorSchema
+from src.utils.artifact_store import ArtifactStore
+from src.utils.serialization import ObjectSerializer
 
 
 class BasicUtils:
     """Shall be used for accessing basic utilities methods."""
 
     @classmethod
-    def configure_float_columns(cls, df: pd.DataFrame, exclude_columns: List, desc: str) -> pd.DataFrame:
-        """Typecasts columns other than the ones in list `exclude_columns` as float dtype.
+    def configure_float_columns(cls, df: pd.DataFrame, exclude_columns: List, desc: str, dtype: str = "float64") -> pd.DataFrame:
+        """Typecasts columns other than the ones in list `exclude_columns` as float dtype, in a single pass and only those that 
+        ain't already of the said dtype.
 
         Args:
             df (pd.DataFrame): Dataframe whose columns gotta be configured.
             exclude_columns (List): List of columns which are not to be typecasted into float dtype.
             desc (str): Description of the said dataframe.
+            dtype (str, optional): Float dtype the columns are to be typecasted into. Defaults to "float64".
 
         Raises:
             e: Throws relevant exception if any error pops while configuring the said columns.
@@ -26,14 +33,13 @@ class BasicUtils:
             pd.DataFrame: Dataframe after its desired columns has been typecasted.
         """
         try:
+            to_be_casted = {col: dtype for col in df.columns if col not in exclude_columns and df[col].dtype != dtype}
+            if len(to_be_casted) == 0:
+                lg.info(f'Columns of the "{desc}" dataframe are already of {dtype} dtype!')
+                return df
             lg.info(
-                f'Typecasting the desired columns of the "{desc}" dataframe into float dtype..')
-            df_numerical = df.drop(columns=exclude_columns)
-            df_numerical = df_numerical.astype('float')
-
-            for col in df.columns:
-                if col not in exclude_columns:
-                    df[col] = df_numerical[col]
+                f'Typecasting {len(to_be_casted)} columns of the "{desc}" dataframe into {dtype} dtype..')
+            df = df.astype(to_be_casted)
 
             lg.info("Typecasting done successfully!")
             return df
@@ -103,7 +109,8 @@ class BasicUtils:
 
     @classmethod
     def save_numpy_array(cls, file_path: str, arr: np.array, desc: str):
-        """Saves the numpy array at the desired `file_path` location.
+        """Saves the numpy array at the desired `file_path` location, as a C-contiguous `.npy` file (so that it can be 
+        memory-mapped as is), or as an uncompressed `.npz` archive should it be a scipy sparse matrix (whatever the extension).
 
         Raises:
             e: Throws relevant exception if any error pops up while saving the given numpy array.
@@ -118,8 +125,15 @@ class BasicUtils:
             # Making sure the dir do exist
             dir = os.path.dirname(file_path)
             os.makedirs(dir, exist_ok=True)
-            with open(file_path, "wb") as f:
-                np.save(f, arr)
+            if sp.issparse(arr):
+                arr = arr.tocsr()
+                with open(file_path, "wb") as f:
+                    sp.save_npz(f, arr, compressed=False)
+            else:
+                arr = np.ascontiguousarray(arr)
+                with open(file_path, "wb") as f:
+                    np.save(f, arr)
+            ArtifactStore.put(file_path, arr)
             lg.info(f'"{desc} array" saved successfully!')
             ...
         except Exception as e:
@@ -127,7 +141,7 @@ class BasicUtils:
             raise e
 
     @classmethod
-    def load_numpy_array(cls, file_path: str, desc: str):
+    def load_numpy_array(cls, file_path: str, desc: str, mmap_mode: Optional[str] = None) -> np.ndarray:
         """Loads the desried numpy array from the desired `file_path` location.
 
         Raises:
@@ -136,9 +150,15 @@ class BasicUtils:
         Args:
             file_path (str): Location from where the numpy array is to be fetched.
             desc (str): Description of the numpy array.
+            mmap_mode (Optional[str], optional): Memory-maps the array in the said mode (e.g. "r") instead of reading it 
+            whole into the RAM, should it be passed (the sparse matrices are read whole regardless). Defaults to None.
         """
         try:
             lg.info(f'Loading the "{desc} Array" from "{file_path}"..')
+            arr = ArtifactStore.get(file_path)
+            if arr is not None:
+                lg.info(f'"{desc} Array" handed over from the artifact store!')
+                return arr
 
             if not os.path.exists(file_path):
                 lg.error(
@@ -146,16 +166,22 @@ class BasicUtils:
                 raise Exception(
                     'Uh Oh! Looks like the said file path or the numpy array doesn\'t even exist!')
             else:
-                lg.info(f'"{desc} Array" loaded successsfully!')
-                return np.load(open(file_path, 'rb'))
+                with open(file_path, "rb") as f:
+                    # The sparse matrices are saved as zip archives
+                    is_sparse = f.read(4) == b"PK\x03\x04"
+                arr = sp.load_npz(file_path) if is_sparse else np.load(file_path, mmap_mode=mmap_mode)
+                ArtifactStore.put(file_path, arr)
+                lg.info(f'"{desc} Array" {"memory-mapped" if mmap_mode and not is_sparse else "loaded"} successsfully!')
+                return arr
             ...
         except Exception as e:
             lg.exception(e)
             raise e
 
     @classmethod
-    def save_object(cls, file_path: str, obj: object, obj_desc: str) -> None:
-        """Saves the desired object at the said desired location.
+    def save_object(cls, file_path: str, obj: object, obj_desc: str, backend: Optional[str] = None) -> None:
+        """Saves the desired object at the said desired location, via the serialization backend configured for its type (see 
+        `SerializationConfig`).
 
         Raises:
             e: Throws relevant exception if any error pops up while saving the desired object.
@@ -164,13 +190,15 @@ class BasicUtils:
             file_path (str): Location where the object is to be stored.
             obj (object): Object that is to be stored.
             obj_desc (str): Object's description.
+            backend (Optional[str], optional): Serialization backend to be used instead of the configured one. Defaults to None.
         """
         try:
             lg.info(f'Saving the "{obj_desc}" at "{file_path}"..')
             obj_dir = os.path.dirname(file_path)
             os.makedirs(obj_dir, exist_ok=True)
-            dill.dump(obj, open(file_path, 'wb'))
-            lg.info(f'"{obj_desc}" saved successfully!')
+            header = ObjectSerializer.dump(obj, file_path, backend=backend)
+            ArtifactStore.put(file_path, obj)
+            lg.info(f'"{obj_desc}" saved successfully via {header["backend"]} (compression: {header["compression"]})!')
             ...
         except Exception as e:
             lg.exception(e)
@@ -178,7 +206,7 @@ class BasicUtils:
 
     @classmethod
     def load_object(cls, file_path: str, obj_desc: str) -> object:
-        """Loads the desired object from the provided location.
+        """Loads the desired object from the provided location, dispatching on the serialization backend recorded along with it.
 
         Raises:
             e: Throws relevant exception if any error pops up while laoding or returning the desired object.
@@ -189,14 +217,20 @@ class BasicUtils:
         """
         try:
             lg.info(f'loading the "{obj_desc}"..')
+            obj = ArtifactStore.get(file_path)
+            if obj is not None:
+                lg.info(f'"{obj_desc}" handed over from the artifact store!')
+                return obj
             if not os.path.exists(file_path):
                 lg.error(
                     'Uh Oh! Looks like the said file path or the object doesn\'t even exist!')
                 raise Exception(
                     'Uh Oh! Looks like the said file path or the object doesn\'t even exist!')
             else:
+                obj = ObjectSerializer.load(file_path)
+                ArtifactStore.put(file_path, obj)
                 lg.info(f'"{obj_desc}" loaded successfully!')
-                return dill.load(open(file_path, 'rb'))
+                return obj
             ...
         except Exception as e:
             lg.exception(e)
@@ -224,3 +258,267 @@ class BasicUtils:
         except Exception as e:
             lg.exception(e)
             raise e
+
+    @classmethod
+    def read_yaml_file(cls, file_path: str, desc: str) -> Optional[dict]:
+        """Loads the data from the `yaml` file at the said location.
+
+        Raises:
+            e: Throws relevant exception if any error pops up.
+
+        Args:
+            file_path (str): Location of the yaml file.
+            desc (str): Description of the file.
+
+        Returns:
+            Optional[dict]: Data loaded from the yaml file, None if the file doesn't exist.
+        """
+        try:
+            lg.info(f"reading the `{desc}` yaml file..")
+            if not os.path.exists(file_path):
+                lg.warning(f'the `{desc}` yaml file doesn\'t exist at "{file_path}"!')
+                return None
+            with open(file_path, "r") as f:
+                return yaml.safe_load(f)
+            ...
+        except Exception as e:
+            lg.exception(e)
+            raise e
+
+    @classmethod
+    def write_dataframe(cls, df: pd.DataFrame, file_path: str, desc: str, compression: Optional[str] = "zstd") -> None:
+        """Writes the dataframe at the said location in the format as per the file's extension i.e. ".parquet", ".feather" 
+        or ".csv" (the columnar ones being typed and compressed).
+
+        Raises:
+            e: Throws relevant exception if any error pops up while writing the dataframe.
+
+        Args:
+            df (pd.DataFrame): Dataframe that is to be written.
+            file_path (str): Location where the dataframe is to be written.
+            desc (str): Description of the dataframe.
+            compression (Optional[str], optional): Compression codec of the columnar formats. Defaults to "zstd".
+        """
+        try:
+            lg.info(f'Writing the "{desc}" dataframe at "{file_path}"..')
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            file_format = os.path.splitext(file_path)[1]
+            if file_format == ".parquet":
+                df.to_parquet(file_path, index=False, compression=compression)
+            elif file_format == ".feather":
+                df.reset_index(drop=True).to_feather(file_path, compression=compression)
+            elif file_format == ".csv":
+                df.to_csv(path_or_buf=file_path, index=None)
+            else:
+                raise Exception(f'Uh Oh! "{file_format}" ain\'t a supported format for the dataframes!')
+            ArtifactStore.put(file_path, df)
+            lg.info(f'"{desc}" dataframe written successfully!')
+            ...
+        except Exception as e:
+            lg.exception(e)
+            raise e
+
+    @classmethod
+    def append_parquet_part(cls, df: pd.DataFrame, dataset_dir: str, desc: str, compression: Optional[str] = "zstd") -> None:
+        """Appends the dataframe to the parquet dataset (a dir of parquet "parts") at the said location as its newest part, lining
+        it up with the columns and the dtypes of the existing parts (if any).
+
+        Raises:
+            e: Throws relevant exception if any error pops up while appending the dataframe.
+
+        Args:
+            df (pd.DataFrame): Dataframe that is to be appended.
+            dataset_dir (str): Location of the parquet dataset.
+            desc (str): Description of the dataset.
+            compression (Optional[str], optional): Compression codec of the part. Defaults to "zstd".
+        """
+        try:
+            os.makedirs(dataset_dir, exist_ok=True)
+            parts = sorted(part for part in os.listdir(dataset_dir) if part.endswith(".parquet"))
+            part_path = os.path.join(dataset_dir, f"part-{len(parts):05d}.parquet")
+            lg.info(f'Appending {df.shape[0]} rows to the "{desc}" dataset as "{part_path}"..')
+            if len(parts) == 0:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+            else:
+                schema = pq.read_schema(os.path.join(dataset_dir, parts[0])).remove_metadata()
+                table = pa.Table.from_pandas(
+                    df.reindex(columns=schema.names), schema=schema, preserve_index=False)
+            pq.write_table(table, part_path, compression=compression)
+            lg.info(f'rows appended to the "{desc}" dataset successfully!')
+            ...
+        except Exception as e:
+            lg.exception(e)
+            raise e
+
+    @classmethod
+    def get_source_fingerprint(cls, file_path: str) -> Dict:
+        """Returns the fingerprint of the said dataframe's file (or of each of the parts of the parquet dataset dir) i.e. their 
+        names, sizes and, for the parquet ones, row counts, which the row indices selected off it are to be checked against."""
+        parts = [file_path] if os.path.isfile(file_path) else [
+            os.path.join(file_path, part) for part in sorted(os.listdir(file_path)) if part.endswith(".parquet")]
+        return {"parts": [
+            {"name": os.path.basename(part), "size": os.path.getsize(part),
+             "n_rows": pq.ParquetFile(part).metadata.num_rows if part.endswith(".parquet") else None}
+            for part in parts]}
+
+    @classmethod
+    def get_index_source_path(cls, index_path: str) -> str:
+        """Returns the location of the fingerprint (of the dataframe the row indices were drawn off) saved next to the said row
+        indices."""
+        return f"{os.path.splitext(index_path)[0]}_source.yaml"
+
+    @classmethod
+    def save_index_source(cls, index_path: str, file_path: str) -> None:
+        """Saves the fingerprint of the dataframe at `file_path` next to the row indices drawn off it."""
+        cls.write_yaml_file(
+            file_path=cls.get_index_source_path(index_path), data=cls.get_source_fingerprint(file_path),
+            desc="Row indices' source fingerprint")
+
+    @classmethod
+    def check_index_source(cls, index_path: str, file_path: str) -> None:
+        """Checks whether the dataframe at `file_path` still holds the very rows the said row indices were drawn off i.e. its 
+        parts back then are still there as they were, the parts appended since being fine, as they only add rows past the
+        indexed ones.
+
+        Raises:
+            Exception: Should the dataframe have been rebuilt or rewritten since the row indices were drawn off it.
+        """
+        source = cls.read_yaml_file(file_path=cls.get_index_source_path(index_path), desc="Row indices' source fingerprint")
+        if source is None:
+            lg.warning(f'there\'s no fingerprint next to "{index_path}", so its rows can\'t be checked against "{file_path}"!')
+            return
+        parts = cls.get_source_fingerprint(file_path)["parts"]
+        if parts[:len(source["parts"])] != source["parts"]:
+            raise Exception(
+                f'Uh Oh! "{file_path}" has been rebuilt or rewritten since the row indices at "{index_path}" were drawn off it, '
+                'so they no longer point to the very rows. Gotta re-run the data ingestion!')
+
+    @classmethod
+    def read_dataframe(cls, file_path: str, desc: str, columns: Optional[List] = None, 
+                       schema: Optional[SensorSchema] = None, index_path: Optional[str] = None) -> pd.DataFrame:
+        """Reads the dataframe from the said location as per the file's extension i.e. ".parquet" (either a file or a dataset 
+        dir), ".feather" or ".csv", all the stages are to read their datasets through this.
+
+        Raises:
+            e: Throws relevant exception if any error pops up while reading the dataframe.
+
+        Args:
+            file_path (str): Location of the dataframe.
+            desc (str): Description of the dataframe.
+            columns (Optional[List], optional): Columns that are to be read, all of them if None. Defaults to None.
+            schema (Optional[SensorSchema], optional): Sensor schema the CSV files are to be parsed as per, their dtypes being
+            inferred if None. Defaults to None.
+            index_path (Optional[str], optional): Location of the `.npy` array of the row positions that are to be selected
+            (in that order) off the dataframe (which is checked to still hold the very rows, via `check_index_source`), the whole
+            of it being returned if None. Defaults to None.
+
+        Returns:
+            pd.DataFrame: Dataframe that's been read.
+        """
+        try:
+            if index_path is not None:
+                cls.check_index_source(index_path, file_path)
+                # The whole dataframe is read (or handed over) once when the artifact store's there for the other subsets to 
+                # reuse it, else only the said columns are
+                df = cls.read_dataframe(
+                    file_path, desc=f"{desc} (source)", columns=None if ArtifactStore.is_enabled() else columns,
+                    schema=schema)
+                rows = cls.load_numpy_array(index_path, desc=f"{desc} row indices", mmap_mode="r")
+                lg.info(f'selecting the {len(rows)} rows of the "{desc}" dataframe..')
+                df = (df if columns is None else df[columns]).iloc[rows]
+                return df.reset_index(drop=True)
+            lg.info(f'reading the "{desc}" dataframe from "{file_path}"..')
+            df = ArtifactStore.get(file_path)
+            if df is not None:
+                lg.info(f'"{desc}" dataframe handed over from the artifact store!')
+                return df if columns is None else df[columns]
+            if not os.path.exists(file_path):
+                lg.error(
+                    'Uh Oh! Looks like the said file path or the dataframe doesn\'t even exist!')
+                raise Exception(
+                    'Uh Oh! Looks like the said file path or the dataframe doesn\'t even exist!')
+            file_format = os.path.splitext(file_path)[1]
+            if file_format == ".parquet":
+                df = pd.read_parquet(file_path, columns=columns)
+            elif file_format == ".feather":
+                df = pd.read_feather(file_path, columns=columns)
+            elif file_format == ".csv" and schema is not None:
+                df = schema.read_csv(file_path, columns=columns)
+            elif file_format == ".csv":
+                df = pd.read_csv(file_path, usecols=columns)
+            else:
+                raise Exception(f'Uh Oh! "{file_format}" ain\'t a supported format for the dataframes!')
+            if columns is None:
+                ArtifactStore.put(file_path, df)
+            lg.info(f'"{desc}" dataframe read with shape: {df.shape}')
+            return df
+            ...
+        except Exception as e:
+            lg.exception(e)
+            raise e
+
+    @classmethod
+    def iter_dataframe_chunks(cls, file_path: str, desc: str, chunk_size: int, columns: Optional[List] = None,
+                              schema: Optional[SensorSchema] = None, index_path: Optional[str] = None) -> Iterator[pd.DataFrame]:
+        """Reads the dataframe from the said location in chunks of at most `chunk_size` rows, so that it needn't ever be held in
+        the memory whole i.e. ".parquet" (either a file or a dataset dir, its parts being read in order) or ".csv" files.
+
+        Args:
+            file_path (str): Location of the dataframe.
+            desc (str): Description of the dataframe.
+            chunk_size (int): Maximum number of rows per chunk.
+            columns (Optional[List], optional): Columns that are to be read, all of them if None. Defaults to None.
+            schema (Optional[SensorSchema], optional): Sensor schema the CSV files are to be parsed as per, their dtypes being
+            inferred if None. Defaults to None.
+            index_path (Optional[str], optional): Location of the `.npy` array of the row positions that are to be selected off
+            the dataframe (a bitmask of a byte per row being held for them, the chunks keeping the file's row order). 
+            Defaults to None.
+
+        Raises:
+            e: Throws relevant exception if any error pops up while reading the dataframe.
+
+        Yields:
+            Iterator[pd.DataFrame]: Chunks of the dataframe.
+        """
+        try:
+            lg.info(f'reading the "{desc}" dataframe from "{file_path}" in chunks of {chunk_size} rows..')
+            file_format = os.path.splitext(file_path)[1]
+            if file_format == ".parquet":
+                parts = [file_path] if os.path.isfile(file_path) else [
+                    os.path.join(file_path, part) for part in sorted(os.listdir(file_path)) if part.endswith(".parquet")]
+                chunks = (
+                    batch.to_pandas() for part in parts
+                    for batch in pq.ParquetFile(part).iter_batches(batch_size=chunk_size, columns=columns))
+                n_rows = sum(pq.ParquetFile(part).metadata.num_rows for part in parts)
+            elif file_format == ".csv":
+                reader = schema.iter_csv if schema is not None else (
+                    lambda path, chunksize, columns: pd.read_csv(path, usecols=columns, chunksize=chunksize))
+                chunks = reader(file_path, chunksize=chunk_size, columns=columns)
+                n_rows = None
+            else:
+                raise Exception(f'Uh Oh! "{file_format}" ain\'t a supported format for reading in chunks!')
+
+            mask = None
+            if index_path is not None:
+                cls.check_index_source(index_path, file_path)
+                rows = cls.load_numpy_array(index_path, desc=f"{desc} row indices", mmap_mode="r")
+                if n_rows is None:
+                    n_rows = int(rows.max()) + 1 if len(rows) else 0
+                mask = np.zeros(n_rows, dtype=bool)
+                mask[rows] = True
+
+            start = 0
+            for chunk in chunks:
+                stop = start + chunk.shape[0]
+                if mask is not None:
+                    # The CSV's mask only runs up to the last selected row, the rows past it being left out
+                    chunk_mask = np.zeros(chunk.shape[0], dtype=bool)
+                    chunk_mask[:max(min(stop, len(mask)) - start, 0)] = mask[start: stop]
+                    chunk = chunk[chunk_mask].reset_index(drop=True)
+                start = stop
+                yield chunk
+            lg.info(f'"{desc}" dataframe read in chunks ({start} rows)!')
+            ...
+        except Exception as e:
+            lg.exception(e)
+            raise e
@@ -0,0 +1,36 @@
+import numpy as np
+import scipy.sparse as sp
+from sklearn.base import BaseEstimator, TransformerMixin
+
+
+class MissingAsSparse(BaseEstimator, TransformerMixin):
+    """Shall be used to keep the missing values as they are, for XGBoost to handle them natively, storing the features as a CSR
+    matrix whose implicit entries are the missing values (as in XGBoost reads them) should they be missing mostly, the zeros 
+    still being stored explicitly, as they ain't missing.
+
+    Note: the decision's made for the whole matrix, as XGBoost takes in a single one (and a CSR one costs 12 bytes per stored
+    value against 8 per cell of a dense float64 one, so storing the mostly-missing sensors alone sparsely ain't gonna save a
+    thing). Since the validation drops the sensors missing more than `missing_thresh` (.3), the matrix the pipeline feeds in is
+    at least 70% dense, so it's stored sparsely only should `missing_thresh` be raised well above `density_thresh`.
+
+    Args:
+        density_thresh (float, optional): The features are stored as a CSR matrix only if the fraction of the non-missing values
+        (of the training set) is below this, as a dense array with NaNs otherwise. Defaults to .5.
+    """
+
+    def __init__(self, density_thresh: float = .5) -> None:
+        self.density_thresh = density_thresh
+
+    def fit(self, X, y=None) -> "MissingAsSparse":
+        X = np.asarray(X)
+        self.n_features_in_ = X.shape[1]
+        self.density_ = float(np.count_nonzero(~np.isnan(X)) / X.size) if X.size else 1.
+        self.sparse_ = self.density_ < self.density_thresh
+        return self
+
+    def transform(self, X):
+        X = np.asarray(X)
+        if not self.sparse_:
+            return X
+        rows, cols = np.nonzero(~np.isnan(X))
+        return sp.csr_matrix((X[rows, cols], (rows, cols)), shape=X.shape)
@@ -0,0 +1,162 @@
+import atexit
+import threading
+import time
+from typing import Dict, Optional
+import pymongo
+from pymongo import monitoring
+from src.CONFIG import Config
+from src.entities.config import MongoClientConfig
+from src.logger import lg
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """Keeps count of the connection pool's events, so that the pool usage (checkouts, time spent waiting for a connection, 
+    etc.) can be logged per stage.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._check_out_started = threading.local()
+        self.reset()
+
+    def reset(self) -> None:
+        """Resets all the counters."""
+        with self._lock:
+            self.checkouts = 0
+            self.checkout_failures = 0
+            self.checkins = 0
+            self.connections_created = 0
+            self.connections_closed = 0
+            self.total_wait_s = 0.0
+            self.max_wait_s = 0.0
+
+    def get_stats(self) -> Dict:
+        """Returns the snapshot of the counters."""
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "checkins": self.checkins,
+                "connections_created": self.connections_created,
+                "connections_closed": self.connections_closed,
+                "total_wait_s": round(self.total_wait_s, 4),
+                "avg_wait_ms": round(1000*self.total_wait_s/max(self.checkouts, 1), 4),
+                "max_wait_ms": round(1000*self.max_wait_s, 4)
+            }
+
+    def connection_check_out_started(self, event) -> None:
+        self._check_out_started.tic = time.perf_counter()
+
+    def connection_checked_out(self, event) -> None:
+        # Older pymongo versions don't report the duration of the checkout
+        wait_s = getattr(event, "duration", None)
+        if wait_s is None:
+            wait_s = time.perf_counter() - getattr(self._check_out_started, "tic", time.perf_counter())
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait_s += wait_s
+            self.max_wait_s = max(self.max_wait_s, wait_s)
+
+    def connection_check_out_failed(self, event) -> None:
+        with self._lock:
+            self.checkout_failures += 1
+
+    def connection_checked_in(self, event) -> None:
+        with self._lock:
+            self.checkins += 1
+
+    def connection_created(self, event) -> None:
+        with self._lock:
+            self.connections_created += 1
+
+    def connection_closed(self, event) -> None:
+        with self._lock:
+            self.connections_closed += 1
+
+    def connection_ready(self, event) -> None:
+        pass
+
+    def pool_created(self, event) -> None:
+        pass
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_cleared(self, event) -> None:
+        pass
+
+    def pool_closed(self, event) -> None:
+        pass
+
+
+class MongoClientManager:
+    """Shall be used to access the process-wide `MongoClient`s, one per connection url, which are lazily created (with the pool
+    sizing and timeouts as configured in `MongoClientConfig`), shared by every stage and closed when the process exits.
+    """
+    mongo_client_config = MongoClientConfig()
+    pool_metrics = PoolMetricsListener()
+    _clients: Dict[str, pymongo.MongoClient] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_client(cls, connection_url: Optional[str] = None) -> pymongo.MongoClient:
+        """Returns the shared `MongoClient` for the given connection url, creating it if there's none as of now.
+
+        Args:
+            connection_url (Optional[str], optional): MongoDB connection url. Defaults to `Config.mongodb_url`.
+
+        Raises:
+            e: Raises relevant exception should any sort of error pops up while creating the client.
+
+        Returns:
+            pymongo.MongoClient: Shared client for the said connection url.
+        """
+        try:
+            connection_url = connection_url or Config().mongodb_url
+            with cls._lock:
+                if connection_url not in cls._clients:
+                    lg.info("creating the shared MongoDB client..")
+                    cls._clients[connection_url] = pymongo.MongoClient(
+                        connection_url,
+                        maxPoolSize=cls.mongo_client_config.max_pool_size,
+                        minPoolSize=cls.mongo_client_config.min_pool_size,
+                        maxIdleTimeMS=cls.mongo_client_config.max_idle_time_ms,
+                        waitQueueTimeoutMS=cls.mongo_client_config.wait_queue_timeout_ms,
+                        connectTimeoutMS=cls.mongo_client_config.connect_timeout_ms,
+                        serverSelectionTimeoutMS=cls.mongo_client_config.server_selection_timeout_ms,
+                        socketTimeoutMS=cls.mongo_client_config.socket_timeout_ms,
+                        event_listeners=[cls.pool_metrics])
+                return cls._clients[connection_url]
+            ...
+        except Exception as e:
+            lg.exception(e)
+            raise e
+
+    @classmethod
+    def log_pool_stats(cls, stage: str, reset: bool = True) -> Dict:
+        """Logs the connection pool's metrics accumulated during the said stage.
+
+        Args:
+            stage (str): Name of the stage the metrics are to be logged for.
+            reset (bool, optional): Whether to reset the metrics afterwards, so that the next stage starts afresh. Defaults to True.
+
+        Returns:
+            Dict: Connection pool's metrics.
+        """
+        stats = cls.pool_metrics.get_stats()
+        lg.info(f'MongoDB connection pool stats for "{stage}": {stats}')
+        if reset:
+            cls.pool_metrics.reset()
+        return stats
+
+    @classmethod
+    def close_all(cls) -> None:
+        """Closes all the shared clients."""
+        with cls._lock:
+            for client in cls._clients.values():
+                client.close()
+            cls._clients.clear()
+
+
+# Making sure the shared clients get closed cleanly at exit
+atexit.register(MongoClientManager.close_all)
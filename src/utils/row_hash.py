@@ -0,0 +1,54 @@
+import hashlib
+import numpy as np
+import pandas as pd
+from src.logger import lg
+
+
+class RowHasher:
+    """Shall be used for computing a stable content hash of each row of the sensors data, irrespective of the columns' order, of 
+    the sensors being stored as numbers or as strings, or of the missing values being "na", null or NaN.
+
+    The hash is a 64-bit BLAKE2b digest of the row's canonical bytes i.e. the sorted column names, the sensors as little-endian
+    float64 (every NaN being the same NaN, and -0.0 being 0.0) and the target as UTF-8, so that it holds across pandas, numpy and
+    platform versions alike (which `pd.util.hash_pandas_object` ain't guaranteed to).
+    """
+
+    @classmethod
+    def compute(cls, df: pd.DataFrame, target: str, dtype: str = "float64") -> np.ndarray:
+        """Returns the 64-bit content hash of each row of the dataframe.
+
+        Args:
+            df (pd.DataFrame): Dataframe whose rows are to be hashed.
+            target (str): Target column name, which is hashed as string, the rest being hashed as float.
+            dtype (str, optional): Precision the sensors are stored at, which they're rounded to before being hashed, so that the
+                rows hashed at load time and the very rows hashed after having been read back hash the same. Defaults to "float64".
+
+        Raises:
+            e: Throws relevant exception if any error pops up while hashing the rows.
+
+        Returns:
+            np.ndarray: int64 hash of each row.
+        """
+        try:
+            columns = sorted(df.columns)
+            sensor_cols = [col for col in columns if col != target]
+            sensors = np.empty((df.shape[0], len(sensor_cols)), dtype="<f8")
+            for j, col in enumerate(sensor_cols):
+                sensors[:, j] = pd.to_numeric(df[col].to_numpy(), errors="coerce").astype(dtype, copy=False)
+            # Canonical NaN and zero, so that the payload bits of a NaN or the sign of a zero don't change the hash
+            sensors[np.isnan(sensors)] = np.nan
+            sensors += 0.0
+            targets = [val.encode() for val in df[target].astype(str)] if target in columns else [b""] * df.shape[0]
+
+            header = hashlib.blake2b("\x1f".join(map(str, columns)).encode(), digest_size=8)
+            digests = []
+            for row, target_val in zip(sensors, targets):
+                row_hash = header.copy()
+                row_hash.update(row.tobytes())
+                row_hash.update(target_val)
+                digests.append(row_hash.digest())
+            return np.frombuffer(b"".join(digests), dtype="<i8").astype(np.int64)
+            ...
+        except Exception as e:
+            lg.exception(e)
+            raise e
@@ -0,0 +1,156 @@
+import io
+import os
+import json
+import struct
+import tempfile
+import importlib
+import dill
+import joblib
+import pyarrow as pa
+from src.entities.config import SerializationConfig
+from typing import Dict, Optional
+
+# Every serialized object's file ends with a small trailer i.e. the JSON header, its length and the magic bytes, so that the
+# payload stays at the very start of the file (as joblib needs it to be, to memory-map the numpy buffers)
+MAGIC = b"APSSER01"
+TRAILER = struct.Struct("<I8s")
+
+
+class DillBackend:
+    """Pickles the objects via dill, which can handle just about anything (lambdas, closures and such)."""
+
+    @classmethod
+    def dumps(cls, obj: object) -> bytes:
+        return dill.dumps(obj)
+
+    @classmethod
+    def loads(cls, payload: bytes, obj_type: str) -> object:
+        return dill.loads(payload)
+
+
+class JoblibBackend:
+    """Pickles the objects via joblib, with the numpy buffers laid out raw, so that they can be memory-mapped on load."""
+
+    @classmethod
+    def dumps(cls, obj: object) -> bytes:
+        buffer = io.BytesIO()
+        joblib.dump(obj, buffer)
+        return buffer.getvalue()
+
+    @classmethod
+    def loads(cls, payload: bytes, obj_type: str) -> object:
+        return joblib.load(io.BytesIO(payload))
+
+
+class XGBoostBackend:
+    """Saves the XGBoost models in XGBoost's native UBJSON format (along with their scikit-learn attributes), which is way
+    faster and smaller than pickling them and stays loadable across XGBoost versions."""
+
+    @classmethod
+    def dumps(cls, obj: object) -> bytes:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            model_path = os.path.join(tmp_dir, "model.ubj")
+            obj.save_model(model_path)
+            with open(model_path, "rb") as f:
+                return f.read()
+
+    @classmethod
+    def loads(cls, payload: bytes, obj_type: str) -> object:
+        module_name, class_name = obj_type.rsplit(".", 1)
+        model = getattr(importlib.import_module(module_name), class_name)()
+        model.load_model(bytearray(payload))
+        return model
+
+
+class ObjectSerializer:
+    """Shall be used to serialize the objects via the backend configured for their type (in `SerializationConfig`), recording
+    the backend and the compression in a header, so that the objects can be loaded back without knowing how they were saved.
+    Files sans the header (i.e. saved via plain dill) are loaded as such.
+    """
+    serialization_config = SerializationConfig()
+    backends = {"dill": DillBackend, "joblib": JoblibBackend, "xgboost": XGBoostBackend}
+
+    @classmethod
+    def get_backend_name(cls, obj: object) -> str:
+        """Returns the name of the backend configured for the object's type (or for any of its base classes)."""
+        for obj_class in type(obj).__mro__:
+            if obj_class.__name__ in cls.serialization_config.backends:
+                return cls.serialization_config.backends[obj_class.__name__]
+        return cls.serialization_config.default_backend
+
+    @classmethod
+    def dump(cls, obj: object, file_path: str, backend: Optional[str] = None, compression: Optional[str] = "config") -> Dict:
+        """Serializes the object into the said file.
+
+        Args:
+            obj (object): Object that is to be serialized.
+            file_path (str): Location where the object is to be stored.
+            backend (Optional[str], optional): Backend to be used, as configured for the object's type if None. Defaults to None.
+            compression (Optional[str], optional): Compression codec i.e. "zstd", "lz4" or None, as configured if "config".
+            Defaults to "config".
+
+        Returns:
+            Dict: Header recorded along with the object.
+        """
+        backend = backend or cls.get_backend_name(obj)
+        compression = cls.serialization_config.compression if compression == "config" else compression
+        header = {
+            "backend": backend,
+            "compression": compression,
+            "type": f"{type(obj).__module__}.{type(obj).__qualname__}"}
+        with open(file_path, "wb") as f:
+            if backend == "joblib" and compression is None:
+                # Dumped straight into the file, so that the numpy buffers can be memory-mapped off it
+                joblib.dump(obj, f)
+                header["payload_size"] = f.tell()
+            else:
+                payload = cls.backends[backend].dumps(obj)
+                header["raw_size"] = len(payload)
+                if compression is not None:
+                    payload = pa.compress(payload, codec=compression, asbytes=True)
+                header["payload_size"] = len(payload)
+                f.write(payload)
+            header_bytes = json.dumps(header).encode()
+            f.write(header_bytes)
+            f.write(TRAILER.pack(len(header_bytes), MAGIC))
+        return header
+
+    @classmethod
+    def read_header(cls, file_path: str) -> Optional[Dict]:
+        """Returns the header recorded along with the object in the said file, None if there's none."""
+        with open(file_path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() < TRAILER.size:
+                return None
+            f.seek(-TRAILER.size, os.SEEK_END)
+            header_size, magic = TRAILER.unpack(f.read(TRAILER.size))
+            if magic != MAGIC:
+                return None
+            f.seek(-(TRAILER.size + header_size), os.SEEK_END)
+            return json.loads(f.read(header_size))
+
+    @classmethod
+    def load(cls, file_path: str, mmap_mode: Optional[str] = "r") -> object:
+        """Loads the object from the said file, dispatching on the backend and the compression recorded in its header.
+
+        Args:
+            file_path (str): Location of the object.
+            mmap_mode (Optional[str], optional): Mode the numpy buffers of the (uncompressed) joblib payloads are to be
+            memory-mapped in, None to read them whole into the RAM. Defaults to "r".
+
+        Returns:
+            object: Loaded object.
+        """
+        header = cls.read_header(file_path)
+        if header is None:
+            with open(file_path, "rb") as f:
+                return dill.load(f)
+        if header["backend"] == "joblib" and header["compression"] is None:
+            # The pickle stream ends before the header, so joblib reads (and maps) the payload alone
+            return joblib.load(file_path, mmap_mode=mmap_mode)
+        with open(file_path, "rb") as f:
+            payload = f.read(header["payload_size"])
+        if header["compression"] is not None:
+            payload = pa.decompress(
+                payload, decompressed_size=header["raw_size"], codec=header["compression"], asbytes=True)
+        return cls.backends[header["backend"]].loads(payload, obj_type=header["type"])
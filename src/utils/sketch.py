@@ -0,0 +1,166 @@
+import numpy as np
+import pandas as pd
+from src.entities.profile import ReferenceProfile
+from typing import Dict, List, Optional, Tuple
+
+
+# Capacity the lower levels of a `KLLSketch` don't shrink below
+MIN_CAPACITY = 8
+
+
+class KLLSketch:
+    """Shall be used as a mergeable quantile sketch (KLL) of a column that's streamed in chunks, along with its missing count,
+    memory staying constant in the number of rows i.e. O(k log(n/k)) values.
+
+    Values are kept in levels, each item of the level h standing in for 2^h values. Each level has its capacity (k at the top,
+    shrinking by 2/3 per level below, at least `MIN_CAPACITY`), but the levels are compacted only once the sketch as a whole is
+    over its total capacity, and then one at a time, the lowest one over its own capacity first i.e. sorted and every other
+    item (from a random offset) promoted to the next level. So a chunk that's added in bulk is halved only as many times as it
+    takes to fit, rather than flushing the lower levels up to the top. Each compaction at the level h shifts the rank of any
+    value by at most 2^h, so the sketch's CDF is within `rank_error_bound()` of the exact one for every value,
+    deterministically. The random offsets make the errors cancel out in expectation though, the typical error being O(1/k).
+
+    Args:
+        k (int, optional): Capacity of the top level, trading the memory off the accuracy. Defaults to 200.
+        seed (Optional[int], optional): Seed of the compactions' offsets. Defaults to None.
+    """
+
+    def __init__(self, k: int = 200, seed: Optional[int] = None) -> None:
+        self.k = k
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        # Rank error (in number of values) accumulated via the compactions
+        self.rank_error = 0
+        self.n = 0
+        self.n_missing = 0
+        self._rng = np.random.default_rng(seed)
+
+    def get_capacity(self, level: int) -> int:
+        """Returns the capacity of the said level, as per the current height of the sketch."""
+        return max(MIN_CAPACITY, int(np.ceil(self.k * (2 / 3) ** (len(self.levels) - level - 1))))
+
+    def compact(self) -> None:
+        """Compacts the levels, one at a time (the lowest one over its capacity), as long as the sketch's over its total 
+        capacity."""
+        while sum(map(len, self.levels)) > sum(map(self.get_capacity, range(len(self.levels)))):
+            level = next(level for level, items in enumerate(self.levels) if len(items) > self.get_capacity(level))
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(self.levels[level])
+            # An odd item out stays put
+            keep = items[:1] if len(items) % 2 else items[:0]
+            items = items[len(keep):]
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], items[self._rng.integers(2)::2]])
+            self.levels[level] = keep
+            self.rank_error += 2 ** level
+
+    def update(self, values: np.ndarray) -> None:
+        """Adds the said values (a chunk of the column) to the sketch, the missing ones being only counted."""
+        values = np.asarray(values, dtype="float64")
+        missing = np.isnan(values)
+        self.n_missing += int(np.count_nonzero(missing))
+        values = values[~missing]
+        self.n += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.compact()
+
+    def merge(self, other: "KLLSketch") -> None:
+        """Merges the other sketch (of another chunk or partition of the very column) into this one."""
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self.n_missing += other.n_missing
+        self.rank_error += other.rank_error
+        self.compact()
+
+    def get_weighted_sample(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the sketch's items sorted, along with their weights (i.e. the number of values each stands in for)."""
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2 ** level, dtype="int64") for level, items in enumerate(self.levels)])
+        order = np.argsort(values, kind="stable")
+        return values[order], weights[order]
+
+    def rank_error_bound(self) -> float:
+        """Returns the deterministic bound of the sketch's CDF error, as a fraction of the values."""
+        return self.rank_error / self.n if self.n else 0.
+
+
+class DataFrameSketch:
+    """Shall be used for sketching a dataframe that's streamed in chunks i.e. a `KLLSketch` (along with the missing count) per 
+    numerical column and the set of categories per categorical one, memory staying constant in the number of rows. Should a 
+    reference profile be passed, the numerical columns are binned over its bin edges too, chunk by chunk.
+
+    Args:
+        k (int, optional): Capacity of the top level of each column's `KLLSketch`. Defaults to 200.
+        seed (Optional[int], optional): Seed of the sketches' compactions. Defaults to None.
+        profile (Optional[ReferenceProfile], optional): Reference profile whose bin edges the columns are to be binned over.
+        Defaults to None.
+    """
+
+    def __init__(self, k: int = 200, seed: Optional[int] = None, profile: Optional[ReferenceProfile] = None) -> None:
+        self.k = k
+        self.seed = seed
+        self.profile = profile
+        self.bin_counts: Dict[str, np.ndarray] = {}
+        self.columns: List[str] = []
+        self.n_rows = 0
+        self.sketches: Dict[str, KLLSketch] = {}
+        self.categories: Dict[str, set] = {}
+        self.n_missing: Dict[str, int] = {}
+
+    def update(self, df: pd.DataFrame) -> None:
+        """Adds the said chunk of the dataframe to the sketch."""
+        for col in df.columns:
+            if col not in self.n_missing:
+                self.columns.append(col)
+                self.n_missing[col] = 0
+            if not pd.api.types.is_numeric_dtype(df[col]):
+                self.categories.setdefault(col, set()).update(map(str, df[col].dropna().unique()))
+                self.n_missing[col] += int(df[col].isna().sum())
+            else:
+                sketch = self.sketches.setdefault(col, KLLSketch(k=self.k, seed=self.seed))
+                n_missing = sketch.n_missing
+                sketch.update(df[col].to_numpy(dtype="float64", na_value=np.nan))
+                self.n_missing[col] += sketch.n_missing - n_missing
+        if self.profile is not None:
+            binned_cols = [col for col in df.columns if col in self.profile.bin_edges]
+            for col, counts in zip(binned_cols, self.profile.get_bin_counts(df, binned_cols)):
+                self.bin_counts[col] = self.bin_counts.get(col, 0) + counts
+        self.n_rows += df.shape[0]
+
+    @property
+    def missing_ratios(self) -> Dict[str, float]:
+        """Fraction of the missing values of each column."""
+        return {col: n_missing / self.n_rows if self.n_rows else 1. for col, n_missing in self.n_missing.items()}
+
+
+class HistogramSketch:
+    """Shall be used for monitoring a dataframe that's streamed in chunks (such as the inputs at the scoring time) against a 
+    reference profile i.e. the bin counts (over the profile's bin edges) and the missing count of each of the profile's 
+    numerical columns, which are but a few integers per column and a vectorized pass per chunk.
+
+    Args:
+        profile (ReferenceProfile): Reference profile whose bin edges the columns are to be binned over.
+        columns (Optional[List[str]], optional): Columns that are to be monitored, all the profile's binned ones if None. 
+        Defaults to None.
+    """
+
+    def __init__(self, profile: ReferenceProfile, columns: Optional[List[str]] = None) -> None:
+        self.profile = profile
+        self.columns = [col for col in (profile.numerical_columns if columns is None else columns) if col in profile.bin_edges]
+        self.n_rows = 0
+        self.bin_counts = np.zeros((len(self.columns), profile.n_bins), dtype="int64")
+        self.n_missing = np.zeros(len(self.columns), dtype="int64")
+
+    def update(self, df: pd.DataFrame) -> None:
+        """Adds the said chunk of the dataframe to the sketch."""
+        self.bin_counts += self.profile.get_bin_counts(df, self.columns)
+        self.n_missing += df[self.columns].isna().sum().to_numpy(dtype="int64")
+        self.n_rows += df.shape[0]
+
+    @property
+    def missing_ratios(self) -> Dict[str, float]:
+        """Fraction of the missing values of each column."""
+        return {
+            col: float(n_missing / self.n_rows) if self.n_rows else 1. for col, n_missing in zip(self.columns, self.n_missing)}
@@ -0,0 +1,77 @@
+import os
+import pandas as pd
+from typing import Dict, Optional
+from src.entities.config import SnapshotCacheConfig
+from src.utils.file_operations import BasicUtils
+from src.logger import lg
+
+
+class SnapshotCache:
+    """Shall be used for keeping the last ingested collection as a local columnar (feather) snapshot keyed by the collection's
+    name, along with the collection's fingerprint it was taken at, so that reruns can read the snapshot instead of the database
+    for as long as the collection stays unchanged.
+
+    Args:
+        collection_key (str): Key of the collection, say "<database>.<collection>".
+    """
+    snapshot_cache_config = SnapshotCacheConfig()
+
+    def __init__(self, collection_key: str) -> None:
+        self.collection_key = collection_key
+        self.snapshot_path = os.path.join(
+            self.snapshot_cache_config.snapshot_dir, f"{collection_key}.feather")
+        self.fingerprint_path = os.path.join(
+            self.snapshot_cache_config.snapshot_dir, f"{collection_key}.yaml")
+
+    def load(self, fingerprint: Dict) -> Optional[pd.DataFrame]:
+        """Returns the snapshot if it's fresh i.e. if it was taken at the very same fingerprint as the given one.
+
+        Args:
+            fingerprint (Dict): Current fingerprint of the collection.
+
+        Raises:
+            e: Raises relevant exception should any sort of error pops up while loading the snapshot.
+
+        Returns:
+            Optional[pd.DataFrame]: The snapshot, None if there's no fresh one.
+        """
+        try:
+            if not os.path.exists(self.snapshot_path):
+                lg.info(f'there\'s no snapshot of "{self.collection_key}" as of now!')
+                return None
+            snapshot_fingerprint = BasicUtils.read_yaml_file(
+                file_path=self.fingerprint_path, desc="Snapshot Fingerprint")
+            if snapshot_fingerprint != fingerprint:
+                lg.info(
+                    f'snapshot of "{self.collection_key}" is stale (taken at {snapshot_fingerprint}, collection now at {fingerprint})!')
+                return None
+            lg.info(f'snapshot of "{self.collection_key}" is fresh, reading it instead of the database..')
+            return pd.read_feather(self.snapshot_path)
+            ...
+        except Exception as e:
+            lg.exception(e)
+            raise e
+
+    def save(self, df: pd.DataFrame, fingerprint: Dict) -> None:
+        """Saves the dataframe as the snapshot taken at the given fingerprint.
+
+        Args:
+            df (pd.DataFrame): Data of the collection.
+            fingerprint (Dict): Fingerprint of the collection the data was read at.
+
+        Raises:
+            e: Raises relevant exception should any sort of error pops up while saving the snapshot.
+        """
+        try:
+            lg.info(f'saving the snapshot of "{self.collection_key}" at "{self.snapshot_path}"..')
+            os.makedirs(self.snapshot_cache_config.snapshot_dir, exist_ok=True)
+            # Dropping the fingerprint first, so that a half-written snapshot is never taken as a fresh one
+            if os.path.exists(self.fingerprint_path):
+                os.remove(self.fingerprint_path)
+            df.reset_index(drop=True).to_feather(self.snapshot_path)
+            BasicUtils.write_yaml_file(
+                file_path=self.fingerprint_path, data=fingerprint, desc="Snapshot Fingerprint")
+            ...
+        except Exception as e:
+            lg.exception(e)
+            raise e
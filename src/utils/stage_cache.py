@@ -0,0 +1,214 @@
+import os
+import time
+import shutil
+import hashlib
+import threading
+import yaml
+from src.logger import lg
+from src.entities.config import StageCacheConfig
+from typing import Dict, List, Optional, Tuple
+
+
+class StageCache:
+    """Shall be used to skip those stages of the training pipeline whose inputs and config ain't changed since they last ran. Each
+    stage's outputs are kept in a content-addressed cache entry, keyed by the digests of the stage's input files along with its
+    params, so that a matching entry's outputs get restored in place of recomputing them.
+
+    The cache stays disabled unless it's enabled, as done by the training pipeline for its run (should `use_stage_cache` be set).
+    Entries are evicted by age and, the least recently used first, by the cache's total size.
+    """
+    stage_cache_config = StageCacheConfig()
+    _enabled = False
+    _force = False
+    # Digests of the files already hashed, keyed by their paths, mtimes and sizes
+    _digests: Dict[Tuple[str, int, int], str] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def enable(cls, force: bool = False) -> None:
+        """Enables the cache.
+
+        Args:
+            force (bool, optional): Whether every stage is to be recomputed regardless (their outputs still being cached for the
+            later runs). Defaults to False.
+        """
+        cls._enabled = True
+        cls._force = force
+
+    @classmethod
+    def disable(cls) -> None:
+        """Disables the cache."""
+        cls._enabled = False
+        cls._force = False
+
+    @classmethod
+    def get_file_digest(cls, file_path: str) -> str:
+        """Returns the sha256 digest of the file's content, or that of each of the files (with their relative paths) within,
+        should it be a dir.
+
+        Args:
+            file_path (str): Location of the file (or dir).
+
+        Returns:
+            str: Hex digest of the content.
+        """
+        if os.path.isdir(file_path):
+            dir_hash = hashlib.sha256()
+            for root, _, files in sorted(os.walk(file_path)):
+                for file in sorted(files):
+                    path = os.path.join(root, file)
+                    dir_hash.update(os.path.relpath(path, file_path).encode())
+                    dir_hash.update(cls.get_file_digest(path).encode())
+            return dir_hash.hexdigest()
+
+        stat = os.stat(file_path)
+        digest_key = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+        with cls._lock:
+            if digest_key in cls._digests:
+                return cls._digests[digest_key]
+        file_hash = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(2**20), b""):
+                file_hash.update(block)
+        with cls._lock:
+            cls._digests[digest_key] = file_hash.hexdigest()
+        return cls._digests[digest_key]
+
+    @classmethod
+    def get_key(cls, stage: str, input_paths: List[Optional[str]], params: Dict) -> str:
+        """Returns the key of the stage's cache entry i.e. the digest of its input files' digests along with its params.
+
+        Args:
+            stage (str): Name of the stage.
+            input_paths (List[Optional[str]]): Input files (or dirs) of the stage, the None ones being skipped.
+            params (Dict): Config values the stage's outputs depend upon.
+
+        Raises:
+            e: Raises relevant exception should any sort of error pops up while hashing the inputs.
+
+        Returns:
+            str: Key of the cache entry.
+        """
+        try:
+            lg.info(f'hashing the inputs and the config of the "{stage}" stage..')
+            key_hash = hashlib.sha256(stage.encode())
+            for file_path in filter(None, input_paths):
+                key_hash.update(cls.get_file_digest(file_path).encode())
+            key_hash.update(yaml.safe_dump(params, sort_keys=True).encode())
+            return key_hash.hexdigest()[:32]
+            ...
+        except Exception as e:
+            lg.exception(e)
+            raise e
+
+    @classmethod
+    def get_params(cls, config: object, exclude_paths: bool = True) -> Dict:
+        """Returns the config's values, sans the paths (which vary with every run's artifact dir) if asked to."""
+        return {
+            key: val for key, val in vars(config).items()
+            if not (exclude_paths and (key.endswith("_dir") or key.endswith("_path")))}
+
+    @classmethod
+    def restore(cls, stage: str, key: str, outputs: Dict[str, str]) -> Optional[Dict]:
+        """Restores the stage's outputs from the matching cache entry (if any) at their said locations.
+
+        Args:
+            stage (str): Name of the stage.
+            key (str): Key of the cache entry.
+            outputs (Dict[str, str]): Locations where the outputs are to be restored at, keyed by their names.
+
+        Raises:
+            e: Raises relevant exception should any sort of error pops up while restoring the outputs.
+
+        Returns:
+            Optional[Dict]: Extras recorded along with the outputs, None if there's no matching entry (or if the cache's disabled
+            or forced).
+        """
+        try:
+            if not cls._enabled or cls._force:
+                return None
+            entry_dir = os.path.join(cls.stage_cache_config.cache_dir, stage, key)
+            entry_file_path = os.path.join(entry_dir, "entry.yaml")
+            if not os.path.exists(entry_file_path):
+                lg.info(f'no cached outputs of the "{stage}" stage for its inputs and config, gotta compute them..')
+                return None
+            with open(entry_file_path, "r") as f:
+                entry = yaml.safe_load(f)
+            if set(outputs) - set(entry["outputs"]):
+                lg.info(f'cached entry of the "{stage}" stage ain\'t got all the outputs, gotta compute them..')
+                return None
+
+            lg.info(f'restoring the cached outputs of the "{stage}" stage (entry "{key}")..')
+            for name, file_path in outputs.items():
+                os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                shutil.copy2(os.path.join(entry_dir, entry["outputs"][name]), file_path)
+            # Marking the entry as recently used
+            os.utime(entry_file_path)
+            lg.info(f'"{stage}" stage skipped, as in its inputs and config ain\'t changed!')
+            return entry.get("extras") or {}
+            ...
+        except Exception as e:
+            lg.exception(e)
+            raise e
+
+    @classmethod
+    def save(cls, stage: str, key: str, outputs: Dict[str, str], extras: Optional[Dict] = None) -> None:
+        """Keeps the stage's outputs in a cache entry keyed by the said key, and then evicts the stale entries.
+
+        Args:
+            stage (str): Name of the stage.
+            key (str): Key of the cache entry.
+            outputs (Dict[str, str]): Locations of the outputs, keyed by their names.
+            extras (Optional[Dict], optional): Extras (such as the scores) to be recorded along with the outputs. Defaults to None.
+
+        Raises:
+            e: Raises relevant exception should any sort of error pops up while caching the outputs.
+        """
+        try:
+            if not cls._enabled:
+                return
+            lg.info(f'caching the outputs of the "{stage}" stage (entry "{key}")..')
+            entry_dir = os.path.join(cls.stage_cache_config.cache_dir, stage, key)
+            tmp_dir = f"{entry_dir}.tmp"
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            os.makedirs(tmp_dir)
+            entry = {"stage": stage, "created_at": time.time(), "outputs": {}, "extras": extras or {}}
+            for name, file_path in outputs.items():
+                entry["outputs"][name] = f"{name}{os.path.splitext(file_path)[1]}"
+                shutil.copy2(file_path, os.path.join(tmp_dir, entry["outputs"][name]))
+            with open(os.path.join(tmp_dir, "entry.yaml"), "w") as f:
+                yaml.safe_dump(entry, f)
+            # Swapping the entry in as a whole, so that a half-written one never gets restored
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            os.replace(tmp_dir, entry_dir)
+            cls.evict(keep=entry_dir)
+            ...
+        except Exception as e:
+            lg.exception(e)
+            raise e
+
+    @classmethod
+    def evict(cls, keep: Optional[str] = None) -> None:
+        """Evicts the entries unused for longer than `max_age_days`, and then the least recently used ones till the cache's total
+        size is within `max_size_mb`, except for the entry `keep` (i.e. the one just saved)."""
+        entries = []
+        cache_dir = cls.stage_cache_config.cache_dir
+        for stage in os.listdir(cache_dir) if os.path.isdir(cache_dir) else []:
+            for key in os.listdir(os.path.join(cache_dir, stage)):
+                entry_dir = os.path.join(cache_dir, stage, key)
+                entry_file_path = os.path.join(entry_dir, "entry.yaml")
+                if not os.path.exists(entry_file_path) or entry_dir == keep:
+                    continue
+                size = sum(os.path.getsize(os.path.join(entry_dir, file)) for file in os.listdir(entry_dir))
+                entries.append((os.path.getmtime(entry_file_path), size, entry_dir))
+
+        now = time.time()
+        total_size = sum(size for _, size, _ in entries)
+        for last_used, size, entry_dir in sorted(entries):
+            too_old = now - last_used > cls.stage_cache_config.max_age_days * 24 * 3600
+            too_big = total_size > cls.stage_cache_config.max_size_mb * 2**20
+            if not (too_old or too_big):
+                continue
+            lg.info(f'evicting the stage cache entry "{entry_dir}" ({"stale" if too_old else "over the size limit"})..')
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total_size -= size
@@ -0,0 +1,35 @@
+import os
+import numpy as np
+import pandas as pd
+from sklearn.impute import SimpleImputer
+from sklearn.preprocessing import OrdinalEncoder
+from sklearn.tree import DecisionTreeClassifier
+from src.CONFIG import ModelRegistryConfig
+from src.pipelines.batch_prediction import BatchPredictionPipeline
+from src.utils.file_operations import BasicUtils
+
+
+def test_prediction_file_carries_every_input_column_along(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    model_registry_config = ModelRegistryConfig(model_registry=str(tmp_path / "saved_models"))
+    monkeypatch.setattr(BatchPredictionPipeline, "model_registry_config", model_registry_config)
+    os.makedirs(model_registry_config.get_latest_dir_path_to_save())
+
+    # Only `aa_000` and `ac_000` were selected as features, `ab_000` being dropped during the validation
+    train_df = pd.DataFrame({"aa_000": np.arange(10.), "ac_000": np.arange(10.) % 3})
+    transformer = SimpleImputer().fit(train_df)
+    model = DecisionTreeClassifier().fit(transformer.transform(train_df), (np.arange(10) >= 5).astype(int))
+    target_enc = OrdinalEncoder().fit([["neg"], ["pos"]])
+    BasicUtils.save_object(model_registry_config.get_latest_transformer_path(), obj=transformer, obj_desc="Transformer")
+    BasicUtils.save_object(model_registry_config.get_latest_model_path(), obj=model, obj_desc="Model")
+    BasicUtils.save_object(model_registry_config.get_latest_target_encoder_path(), obj=target_enc, obj_desc="Target Encoder")
+
+    input_path = tmp_path / "input.csv"
+    input_path.write_text("class,aa_000,ab_000,ac_000\nneg,1,na,0\npos,8,abc,2\nneg,na,07,1\n")
+    prediction_file_path = BatchPredictionPipeline(input_file_path=str(input_path)).initiate()
+
+    pred_df = pd.read_csv(prediction_file_path, dtype=str, keep_default_na=False)
+    assert list(pred_df.columns) == ["class", "aa_000", "ab_000", "ac_000", "prediction"]
+    # The dropped sensor's carried along as it was, "na" values aside
+    assert pred_df["ab_000"].tolist() == ["", "abc", "07"]
+    assert pred_df["prediction"].tolist()[:2] == ["neg", "pos"]
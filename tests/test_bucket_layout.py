@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.utils.bucket_layout import BucketCodec
+
+
+def get_df() -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"class": rng.choice(["neg", "pos"], size=25), "aa_000": rng.normal(size=25),
+                       "ab_000": rng.lognormal(size=25)})
+    df.loc[::3, "aa_000"] = np.nan
+    return df
+
+
+@pytest.mark.parametrize("dtype", ["<f8", "<f4"])
+def test_buckets_round_trip(dtype):
+    df = get_df()
+    buckets = BucketCodec.encode(df, target="class", bucket_size=10, dtype=dtype)
+    assert [bucket["n_rows"] for bucket in buckets] == [10, 10, 5]
+    decoded = pd.concat([pd.DataFrame(BucketCodec.decode(bucket, bucket["columns"], "class")) for bucket in buckets],
+                        ignore_index=True)
+    assert list(decoded.columns) == list(df.columns)
+    assert decoded["class"].tolist() == df["class"].tolist()
+    for col in ["aa_000", "ab_000"]:
+        assert decoded[col].dtype == np.dtype(dtype)
+        np.testing.assert_array_equal(decoded[col], df[col].to_numpy(dtype=dtype))
+
+
+def test_decode_fills_absent_columns_with_nan():
+    bucket = BucketCodec.encode(get_df(), target="class", bucket_size=10)[0]
+    decoded = BucketCodec.decode(bucket, ["aa_000", "zz_000"], "class")
+    assert list(decoded) == ["aa_000", "zz_000"]
+    assert np.isnan(decoded["zz_000"]).all() and len(decoded["zz_000"]) == 10
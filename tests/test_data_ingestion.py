@@ -0,0 +1,76 @@
+import datetime as dt
+import mongomock
+import numpy as np
+import pandas as pd
+import pytest
+from bson import ObjectId
+from src.components.data_ingestion import DataIngestion
+from src.entities.config import FEATURE_STORE_FILE
+from src.utils.db_operations import dBOperations
+from src.utils.file_operations import BasicUtils
+from src.utils.snapshot_cache import SnapshotCache
+
+
+@pytest.fixture
+def collection(monkeypatch, tmp_path):
+    client = mongomock.MongoClient()
+    monkeypatch.setattr(dBOperations, "establishConnectionToMongoDB", lambda self: setattr(self, "client", client))
+    monkeypatch.setattr(dBOperations.data_source_config, "server_side_cast", False)
+    monkeypatch.setattr(dBOperations.data_source_config, "storage_layout", "row")
+    monkeypatch.setattr(DataIngestion.snapshot_cache_config, "use_snapshot_cache", False)
+    config = DataIngestion.data_ingestion_config
+    monkeypatch.setattr(config, "feature_store_file_path", str(tmp_path / "feature_store" / FEATURE_STORE_FILE))
+    monkeypatch.setattr(config, "watermark_file_path", str(tmp_path / "feature_store" / "watermark.yaml"))
+    monkeypatch.setattr(config, "recent_ids_file_path", str(tmp_path / "feature_store" / "recent_ids.npy"))
+    monkeypatch.setattr(config, "watermark_lookback_docs", 10)
+    db_operations = dBOperations()
+    db_operations.selectCollection()
+    return db_operations.collection
+
+
+def get_id(seconds: int, counter: int = 0) -> ObjectId:
+    generated_at = dt.datetime(2026, 1, 1, tzinfo=dt.timezone.utc) + dt.timedelta(seconds=seconds)
+    return ObjectId(ObjectId.from_datetime(generated_at).binary[:4] + counter.to_bytes(8, "big"))
+
+
+def test_documents_committed_out_of_order_get_ingested_once(collection):
+    collection.insert_many([{"_id": get_id(i), "class": "neg", "aa_000": float(i)} for i in range(25)])
+    DataIngestion().update_feature_store()
+    # Committed after the watermark's been read, with a smaller `_id`, among the latest ingested ones
+    collection.insert_one({"_id": get_id(20, counter=1), "class": "pos", "aa_000": 100.})
+    collection.insert_one({"_id": get_id(30), "class": "neg", "aa_000": 30.})
+    DataIngestion().update_feature_store()
+    DataIngestion().update_feature_store()
+
+    df = BasicUtils.read_dataframe(DataIngestion.data_ingestion_config.feature_store_file_path, desc="Feature store")
+    assert sorted(df["aa_000"]) == list(range(25)) + [30., 100.]
+    recent_ids = np.load(DataIngestion.data_ingestion_config.recent_ids_file_path)
+    assert len(recent_ids) == 10 and recent_ids[-1] == str(get_id(30))
+
+
+def test_fresh_snapshot_stands_in_for_the_database(collection, monkeypatch, tmp_path):
+    monkeypatch.setattr(DataIngestion.snapshot_cache_config, "use_snapshot_cache", True)
+    monkeypatch.setattr(SnapshotCache.snapshot_cache_config, "snapshot_dir", str(tmp_path / ".snapshots"))
+    collection.insert_many([{"_id": get_id(i), "class": "neg", "aa_000": float(i)} for i in range(25)])
+    DataIngestion(rebuild_feature_store=True).update_feature_store()
+
+    # Bar the fingerprint, not a single read of the documents
+    monkeypatch.setattr(dBOperations, "getDataAsDataFrame", lambda *args, **kwargs: pytest.fail("read the database"))
+    DataIngestion(rebuild_feature_store=True).update_feature_store()
+    df = BasicUtils.read_dataframe(DataIngestion.data_ingestion_config.feature_store_file_path, desc="Feature store")
+    assert df.shape[0] == 25
+    recent_ids = np.load(DataIngestion.data_ingestion_config.recent_ids_file_path)
+    assert list(recent_ids) == [str(get_id(i)) for i in range(15, 25)]
+
+
+def test_snapshot_sans_ids_gets_read_afresh(collection, monkeypatch, tmp_path):
+    monkeypatch.setattr(DataIngestion.snapshot_cache_config, "use_snapshot_cache", True)
+    monkeypatch.setattr(SnapshotCache.snapshot_cache_config, "snapshot_dir", str(tmp_path / ".snapshots"))
+    collection.insert_many([{"_id": get_id(i), "class": "neg", "aa_000": float(i)} for i in range(25)])
+    DataIngestion(rebuild_feature_store=True).update_feature_store()
+    snapshot_path = next((tmp_path / ".snapshots").glob("*.feather"))
+    pd.read_feather(snapshot_path).drop(columns="_id").to_feather(snapshot_path)
+
+    DataIngestion(rebuild_feature_store=True).update_feature_store()
+    assert "_id" in pd.read_feather(snapshot_path).columns
+    assert len(np.load(DataIngestion.data_ingestion_config.recent_ids_file_path)) == 10
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.components.data_validation import DataValidation
+from src.entities.artifact import DataIngestionArtifact
+from src.entities.profile import ReferenceProfile
+
+
+@pytest.fixture
+def data_validation(tmp_path, monkeypatch):
+    monkeypatch.setattr(DataValidation.data_validation_config, "bin_counts_file_path", str(tmp_path / "bin_counts.npz"))
+    return DataValidation(DataIngestionArtifact(
+        feature_store_file="sensors.parquet", training_file_path="train.parquet", test_file_path="test.parquet"))
+
+
+def test_bin_counts_are_saved_along_with_the_base_ones(data_validation):
+    df = pd.DataFrame({"class": ["neg", "pos"] * 50, "aa_000": np.arange(100.), "ab_000": np.arange(100.) % 7})
+    profile = ReferenceProfile.from_dataframe(df, max_samples=50, n_bins=4, source={"size": 1, "mtime_ns": 2})
+    # `ab_000` was dropped off the test set
+    data_validation.bin_counts = {"train": {"aa_000": np.array([1, 2, 3, 4]), "ab_000": np.array([4, 3, 2, 1])},
+                                  "test": {"aa_000": np.array([5, 6, 7, 8])}}
+    data_validation.save_bin_counts(profile)
+
+    with np.load(data_validation.data_validation_config.bin_counts_file_path) as bin_counts:
+        assert bin_counts["columns"].tolist() == ["aa_000", "ab_000"]
+        assert bin_counts["base"].shape == (2, 4) and bin_counts["bin_edges"].shape == (2, 3)
+        np.testing.assert_array_equal(bin_counts["test"], [[5, 6, 7, 8], [0, 0, 0, 0]])
+
+
+def test_bin_counts_sans_numerical_histograms_are_empty(data_validation):
+    profile = ReferenceProfile.from_dataframe(
+        pd.DataFrame({"class": ["neg", "pos"] * 50}), max_samples=50, n_bins=4, source={"size": 1, "mtime_ns": 2})
+    data_validation.bin_counts = {"train": {}, "test": {}}
+    data_validation.save_bin_counts(profile)
+
+    with np.load(data_validation.data_validation_config.bin_counts_file_path) as bin_counts:
+        assert bin_counts["columns"].tolist() == []
+        for key in ["base", "train", "test"]:
+            assert bin_counts[key].shape == (0, 4)
@@ -0,0 +1,42 @@
+import mongomock
+import numpy as np
+import pytest
+from bson import ObjectId
+from src.utils.db_operations import dBOperations
+
+
+@pytest.fixture
+def db_operations(monkeypatch):
+    client = mongomock.MongoClient()
+    monkeypatch.setattr(dBOperations, "establishConnectionToMongoDB", lambda self: setattr(self, "client", client))
+    monkeypatch.setattr(dBOperations.data_source_config, "server_side_cast", False)
+    monkeypatch.setattr(dBOperations.data_source_config, "storage_layout", "row")
+    db_operations = dBOperations()
+    db_operations.selectCollection()
+    db_operations.collection.insert_many(
+        [{"class": "neg", "aa_000": float(i), "ab_000": "na"} for i in range(10)])
+    return db_operations
+
+
+@pytest.mark.parametrize("n_partitions", [1, 4])
+def test_empty_query_returns_empty_frame_with_the_columns(db_operations, monkeypatch, n_partitions):
+    # mongomock lacks `$bucketAuto`, which yields no buckets at all when no documents match
+    monkeypatch.setattr(db_operations, "getPartitionBounds", lambda n_partitions, query=None: [])
+    df = db_operations.getDataAsDataFrame(query={"_id": {"$gt": ObjectId("f" * 24)}}, n_partitions=n_partitions)
+    assert df.shape == (0, 3)
+    assert list(df.columns) == ["class", "aa_000", "ab_000"]
+    assert df["aa_000"].dtype == db_operations.precision
+
+
+def test_read_fills_the_columns(db_operations):
+    df = db_operations.getDataAsDataFrame(n_partitions=1)
+    assert df.shape == (10, 3)
+    np.testing.assert_array_equal(df["aa_000"], np.arange(10))
+    assert df["ab_000"].isna().all()
+
+
+def test_read_with_ids_keeps_the_ids_as_hex_strings(db_operations):
+    df = db_operations.getDataAsDataFrame(n_partitions=1, with_ids=True)
+    assert list(df.columns) == ["class", "aa_000", "ab_000", "_id"]
+    expected = {str(doc["_id"]): doc["aa_000"] for doc in db_operations.collection.find()}
+    assert dict(zip(df["_id"], df["aa_000"])) == expected
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from scipy.stats import ks_2samp
+from src.utils.drift import DriftEngine
+
+
+def get_columns(n_base: int, n_current: int, n_cols: int = 6, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    base, current = {}, {}
+    for i in range(n_cols):
+        # Rounded, so as to have plenty of ties, and with some of the values missing
+        base[f"c{i}"] = np.round(rng.normal(size=n_base), 1)
+        current[f"c{i}"] = np.round(rng.normal(loc=.05 * i, size=n_current), 1)
+        base[f"c{i}"][rng.random(n_base) < .1] = np.nan
+        current[f"c{i}"][rng.random(n_current) < .2] = np.nan
+    return base, current
+
+
+@pytest.mark.parametrize("n_base, n_current, method", [(300, 200, "exact"), (20000, 5000, "asymp")])
+@pytest.mark.parametrize("n_workers", [1, 2])
+def test_ks_test_matches_ks_2samp(monkeypatch, n_base, n_current, method, n_workers):
+    monkeypatch.setattr(DriftEngine.drift_config, "n_workers", n_workers)
+    monkeypatch.setattr(DriftEngine.drift_config, "block_size", 4)
+    base, current = get_columns(n_base, n_current)
+    report = DriftEngine.ks_test(base, current)
+    for col in base:
+        expected = ks_2samp(base[col][~np.isnan(base[col])], current[col][~np.isnan(current[col])], method=method)
+        assert report[col]["statistic"] == pytest.approx(expected.statistic, abs=1e-12)
+        assert report[col]["pvalue"] == pytest.approx(expected.pvalue, rel=1e-9, abs=1e-300)
+        assert report[col]["same_distribution"] == (expected.pvalue > DriftEngine.drift_config.pvalue_thresh)
+        assert report[col]["current_missing_ratio"] == pytest.approx(np.isnan(current[col]).mean())
+
+
+def test_ks_test_of_presorted_base_matches_unsorted():
+    base, current = get_columns(5000, 3000, n_cols=2)
+    presorted = {col: np.sort(values[~np.isnan(values)]) for col, values in base.items()}
+    report, presorted_report = DriftEngine.ks_test(base, current), DriftEngine.ks_test(presorted, current, base_sorted=True)
+    assert report == presorted_report
+
+
+def test_ks_test_of_missing_column_is_drifted():
+    base, current = get_columns(500, 500, n_cols=1)
+    current["c0"][:] = np.nan
+    report = DriftEngine.ks_test(base, current)
+    assert np.isnan(report["c0"]["pvalue"])
+    assert report["c0"]["same_distribution"] is False
+    assert report["c0"]["current_missing_ratio"] == 1.
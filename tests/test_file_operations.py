@@ -0,0 +1,62 @@
+import os
+import pytest
+import numpy as np
+import pandas as pd
+from src.entities.schema import SensorSchema
+from src.utils.artifact_store import ArtifactStore
+from src.utils.file_operations import BasicUtils
+
+
+def test_iter_dataframe_chunks_csv_with_index_past_the_last_selected_row(tmp_path):
+    df = pd.DataFrame({"class": ["neg"] * 2500, "aa_000": np.arange(2500, dtype="float64")})
+    csv_path, index_path = str(tmp_path / "data.csv"), str(tmp_path / "rows.npy")
+    df.to_csv(csv_path, index=False)
+    rows = np.array([3, 10, 999, 1000, 1010], dtype="int64")
+    np.save(index_path, rows)
+
+    chunks = list(BasicUtils.iter_dataframe_chunks(
+        csv_path, desc="test", chunk_size=1000, schema=SensorSchema.from_header(csv_path, target="class"),
+        index_path=index_path))
+    assert pd.concat(chunks)["aa_000"].tolist() == rows.astype("float64").tolist()
+
+
+def test_row_indices_are_checked_against_their_source(tmp_path):
+    dataset_dir, index_path = str(tmp_path / "sensors.parquet"), str(tmp_path / "split" / "training_index.npy")
+    BasicUtils.append_parquet_part(pd.DataFrame({"aa_000": np.arange(10.)}), dataset_dir=dataset_dir, desc="test")
+    BasicUtils.save_numpy_array(index_path, arr=np.array([1, 5, 9]), desc="test")
+    BasicUtils.save_index_source(index_path, file_path=dataset_dir)
+
+    # Appended rows lie past the indexed ones
+    BasicUtils.append_parquet_part(pd.DataFrame({"aa_000": np.arange(10., 20.)}), dataset_dir=dataset_dir, desc="test")
+    assert BasicUtils.read_dataframe(dataset_dir, desc="test", index_path=index_path)["aa_000"].tolist() == [1., 5., 9.]
+
+    # Rebuilt from scratch, the indices point to other rows
+    for part in os.listdir(dataset_dir):
+        os.remove(os.path.join(dataset_dir, part))
+    BasicUtils.append_parquet_part(pd.DataFrame({"aa_000": np.arange(100., 120.)}), dataset_dir=dataset_dir, desc="test")
+    with pytest.raises(Exception, match="rebuilt or rewritten"):
+        BasicUtils.read_dataframe(dataset_dir, desc="test", index_path=index_path)
+    with pytest.raises(Exception, match="rebuilt or rewritten"):
+        next(BasicUtils.iter_dataframe_chunks(dataset_dir, desc="test", chunk_size=5, index_path=index_path))
+
+
+@pytest.mark.parametrize("store_enabled", [False, True])
+def test_indexed_read_only_parses_the_said_columns_sans_the_artifact_store(tmp_path, monkeypatch, store_enabled):
+    dataset_dir, index_path = str(tmp_path / "sensors.parquet"), str(tmp_path / "split" / "training_index.npy")
+    BasicUtils.append_parquet_part(
+        pd.DataFrame({"aa_000": np.arange(10.), "ab_000": np.arange(10.), "class": ["neg"] * 10}), dataset_dir=dataset_dir,
+        desc="test")
+    BasicUtils.save_numpy_array(index_path, arr=np.array([7, 2]), desc="test")
+    BasicUtils.save_index_source(index_path, file_path=dataset_dir)
+    read_columns, read_parquet = [], pd.read_parquet
+    monkeypatch.setattr(pd, "read_parquet", lambda path, columns=None: read_columns.append(columns) or read_parquet(
+        path, columns=columns))
+    if store_enabled:
+        ArtifactStore.enable()
+    try:
+        df = BasicUtils.read_dataframe(dataset_dir, desc="test", columns=["aa_000", "class"], index_path=index_path)
+    finally:
+        ArtifactStore.disable()
+    assert df.to_dict("list") == {"aa_000": [7., 2.], "class": ["neg", "neg"]}
+    # Whole of it's read only when it's kept for the other subsets
+    assert read_columns == [None if store_enabled else ["aa_000", "class"]]
@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+from src.entities.profile import ReferenceProfile
+
+
+def test_profile_round_trips_through_save_and_load(tmp_path):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "class": rng.choice(["neg", "pos"], size=3000),
+        "aa_000": rng.lognormal(size=3000),
+        "ab_000": np.where(rng.random(3000) < .7, np.nan, rng.normal(size=3000)),
+        "ac_000": np.nan})
+    profile = ReferenceProfile.from_dataframe(df, max_samples=500, n_bins=8, source={"size": 1, "mtime_ns": 2})
+    file_path = tmp_path / "profile" / "base_profile.npz"
+    profile.save(str(file_path))
+    loaded = ReferenceProfile.load(str(file_path))
+
+    for attr in ["columns", "n_rows", "missing_ratios", "counts", "categories", "n_bins", "source"]:
+        assert getattr(loaded, attr) == getattr(profile, attr)
+    assert loaded.numerical_columns == ["aa_000", "ab_000", "ac_000"]
+    for attr in ["samples", "bin_edges", "histograms"]:
+        assert list(getattr(loaded, attr)) == list(getattr(profile, attr))
+        for col, values in getattr(profile, attr).items():
+            np.testing.assert_array_equal(getattr(loaded, attr)[col], values)
+    assert len(loaded.samples["aa_000"]) == 500
+    assert loaded.histograms["aa_000"].sum() == 3000
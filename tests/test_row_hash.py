@@ -0,0 +1,35 @@
+import hashlib
+import numpy as np
+import pandas as pd
+from src.utils.bucket_layout import BucketCodec
+from src.utils.row_hash import RowHasher
+
+
+def get_df() -> pd.DataFrame:
+    return pd.DataFrame({"class": ["neg", "pos", "neg"], "aa_000": [0.1, np.nan, -0.0], "ab_000": [1e300, 2.5, 3.0]})
+
+
+def test_hash_is_canonical_bytes_digest():
+    df = get_df().iloc[:1]
+    row = np.array([0.1, 1e300], dtype="<f8").tobytes() + b"neg"
+    expected = hashlib.blake2b("aa_000\x1fab_000\x1fclass".encode() + row, digest_size=8).digest()
+    assert RowHasher.compute(df, target="class")[0] == np.frombuffer(expected, dtype="<i8")[0]
+
+
+def test_hash_ignores_column_order_representation_and_missing_value_flavour():
+    df = get_df()
+    as_strings = pd.DataFrame({"ab_000": ["1e300", "2.5", "3"], "class": ["neg", "pos", "neg"], "aa_000": ["0.1", "na", "0"]})
+    signalling_nan = np.frombuffer(np.array([0x7ff0000000000001], dtype="<u8").tobytes(), dtype="<f8")[0]
+    other_nan = df.assign(aa_000=[0.1, signalling_nan, 0.0])
+    hashes = RowHasher.compute(df, target="class")
+    np.testing.assert_array_equal(RowHasher.compute(as_strings, target="class"), hashes)
+    np.testing.assert_array_equal(RowHasher.compute(other_nan, target="class"), hashes)
+    assert len(set(hashes)) == 3
+
+
+def test_hash_of_float32_bucket_matches_load_time_hash():
+    df = get_df().assign(ab_000=[1.1, 2.5, 3.3])
+    bucket = BucketCodec.encode(df, target="class", bucket_size=10, dtype="<f4")[0]
+    decoded = pd.DataFrame(BucketCodec.decode(bucket, bucket["columns"], "class"))
+    np.testing.assert_array_equal(RowHasher.compute(decoded, target="class", dtype="<f4"),
+                                  RowHasher.compute(df, target="class", dtype="<f4"))
@@ -0,0 +1,46 @@
+import dill
+import numpy as np
+import pytest
+from sklearn.preprocessing import StandardScaler
+from xgboost import XGBClassifier
+from src.utils.serialization import ObjectSerializer
+
+
+def get_scaler() -> StandardScaler:
+    return StandardScaler().fit(np.random.default_rng(0).normal(size=(200, 5)))
+
+
+@pytest.mark.parametrize("backend", ["joblib", "dill"])
+@pytest.mark.parametrize("compression", [None, "zstd", "lz4"])
+def test_object_round_trips(tmp_path, backend, compression):
+    scaler, file_path = get_scaler(), str(tmp_path / "scaler.pkl")
+    header = ObjectSerializer.dump(scaler, file_path, backend=backend, compression=compression)
+    assert ObjectSerializer.read_header(file_path) == header
+    loaded = ObjectSerializer.load(file_path)
+    assert type(loaded) is StandardScaler
+    np.testing.assert_array_equal(loaded.mean_, scaler.mean_)
+    np.testing.assert_array_equal(loaded.scale_, scaler.scale_)
+
+
+def test_uncompressed_joblib_buffers_are_memory_mapped(tmp_path):
+    file_path = str(tmp_path / "scaler.pkl")
+    ObjectSerializer.dump(get_scaler(), file_path, backend="joblib", compression=None)
+    assert isinstance(ObjectSerializer.load(file_path).mean_, np.memmap)
+    assert not isinstance(ObjectSerializer.load(file_path, mmap_mode=None).mean_, np.memmap)
+
+
+def test_xgboost_model_round_trips_natively(tmp_path):
+    rng = np.random.default_rng(0)
+    X, y = rng.normal(size=(300, 4)), rng.integers(0, 2, size=300)
+    model, file_path = XGBClassifier(n_estimators=5, max_depth=2).fit(X, y), str(tmp_path / "model.pkl")
+    assert ObjectSerializer.dump(model, file_path)["backend"] == "xgboost"
+    loaded = ObjectSerializer.load(file_path)
+    assert type(loaded) is XGBClassifier
+    np.testing.assert_array_equal(loaded.predict_proba(X), model.predict_proba(X))
+
+
+def test_plain_dill_file_sans_header_loads(tmp_path):
+    file_path = tmp_path / "legacy.pkl"
+    file_path.write_bytes(dill.dumps({"a": [1, 2]}))
+    assert ObjectSerializer.read_header(str(file_path)) is None
+    assert ObjectSerializer.load(str(file_path)) == {"a": [1, 2]}
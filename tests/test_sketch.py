@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from scipy.stats import ks_2samp
+from src.utils.drift import DriftEngine, ks_statistic
+from src.utils.sketch import KLLSketch
+
+
+def get_sketch(values: np.ndarray, chunk_size: int, k: int = 200) -> KLLSketch:
+    sketch = KLLSketch(k=k, seed=0)
+    for i in range(0, len(values), chunk_size):
+        sketch.update(values[i: i+chunk_size])
+    return sketch
+
+
+@pytest.mark.parametrize("chunk_size", [16000, 1000, 100])
+def test_sketch_statistic_within_bound_of_ks_2samp(chunk_size):
+    rng = np.random.default_rng(42)
+    base, current = np.sort(rng.lognormal(size=20000)), rng.lognormal(size=16000)
+    sketch = get_sketch(current, chunk_size)
+    statistic = ks_statistic(base, *sketch.get_weighted_sample())
+    assert abs(statistic - ks_2samp(base, current).statistic) <= sketch.rank_error_bound()
+
+
+def test_bulk_update_keeps_the_lower_levels():
+    # A chunk added in bulk is only halved as many times as it takes to fit, as in the sketch ain't flushed up to the top
+    sketch = get_sketch(np.random.default_rng(0).normal(size=16000), chunk_size=16000)
+    assert sum(map(len, sketch.levels)) > 2 * sketch.k
+    assert sketch.rank_error_bound() < .005
+
+
+def test_merge_matches_the_counts():
+    rng = np.random.default_rng(1)
+    values = rng.normal(size=30000)
+    values[::10] = np.nan
+    sketch, other = get_sketch(values[:20000], 1000), get_sketch(values[20000:], 1000)
+    sketch.merge(other)
+    assert sketch.n + sketch.n_missing == len(values)
+    assert sketch.n_missing == np.count_nonzero(np.isnan(values))
+    assert sketch.get_weighted_sample()[1].sum() == sketch.n
+
+
+def test_sketch_verdicts_go_by_the_bound():
+    rng = np.random.default_rng(7)
+    base = np.sort(rng.normal(size=50000))
+    sketches = {
+        "same": get_sketch(rng.normal(size=16000), 16000),
+        "shifted": get_sketch(rng.normal(.2, size=16000), 16000)}
+    report = DriftEngine.ks_test_sketches(
+        base={col: base for col in sketches}, base_counts={col: len(base) for col in sketches}, sketches=sketches)
+    assert report["shifted"]["same_distribution"] is False
+    assert report["same"]["same_distribution"] is not False